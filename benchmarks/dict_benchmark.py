@@ -0,0 +1,409 @@
+"""
+字典纠错基准测试 - 覆盖 1k ~ 1M 条变体、50 ~ 50k 字符的转录文本
+
+用法（在项目根目录执行）：
+
+    python -m benchmarks.dict_benchmark                          # 默认规模：1k / 10k / 100k 变体
+    python -m benchmarks.dict_benchmark --sizes 1000,1000000     # 自定义字典规模（1M 需要数 GB 内存）
+    python -m benchmarks.dict_benchmark --output bench.json      # 结果写入文件
+    python -m benchmarks.dict_benchmark --baseline old.json      # 与上一版本结果对比，回归时返回非 0
+
+流程：
+1. 用真实的 programmer_terms.json 生成黄金语料（每个变体放进固定上下文，期望结果由字典内容直接推出），
+   校验 fix_text 的正确性
+2. 按指定规模生成中英混合的合成字典与转录文本（固定随机种子，结果可复现）
+3. 统计 fix_text / detect_terms_in_text / build_prompt_terms 的吞吐量、p50/p99 延迟和峰值内存，
+   以 JSON 输出，便于在版本之间比对
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from codewhisper import __version__
+from codewhisper.dict_manager import DictionaryManager
+from codewhisper.term_matcher import fold_text
+from codewhisper.utils import get_project_root
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:  # Windows
+    RESOURCE_AVAILABLE = False
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_TEXT_LENGTHS = (50, 500, 5_000, 50_000)
+
+# 黄金语料的上下文：不含任何变体，也不是 ASCII 字母数字（不影响短词边界判断）
+GOLDEN_PREFIX = "今天我们讨论："
+GOLDEN_SUFFIX = "。"
+
+# 合成转录文本的填充语句
+FILLER = (
+    "我们今天先把需求过一遍，", "这个问题下午再同步一下。", "然后看一下线上的情况，",
+    "大家有什么想法可以直接说。", "先按这个方案推进，", "有风险的话提前暴露出来。",
+    "嗯，", "就是说，", "对，", "那个，"
+)
+
+# 常用汉字区段，生成中文变体时使用
+_CJK_START, _CJK_SIZE = 0x4E00, 0x3000
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+# ----------------------------------------------------------------------
+# 数据生成
+# ----------------------------------------------------------------------
+
+def build_golden_corpus(dict_file: str, seed: int = 0, multi_cases: int = 200) -> List[Dict]:
+    """
+    用真实字典生成黄金语料
+
+    期望结果只依赖字典内容（同一折叠变体以字典中先出现的规则为准），与实现无关：
+    - 每个变体单独放进固定上下文
+    - ASCII 变体额外生成一份全大写形式（匹配不区分大小写）
+    - 若干条把多个变体用“，”拼接的长句
+
+    Returns:
+        [{"text": 输入, "expected": 期望输出}, ...]
+    """
+    with open(dict_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    owners: Dict[str, Tuple[str, str]] = {}  # 折叠变体 → (原始变体, 正确术语)
+    for category_data in data.get("categories", {}).values():
+        for term_data in category_data.get("terms", {}).values():
+            correct = term_data.get("correct", "")
+            for variant in term_data.get("variants", []):
+                wrong = variant.get("wrong", "")
+                if wrong:
+                    owners.setdefault(fold_text(wrong), (wrong, correct))
+
+    cases = []
+    for wrong, correct in owners.values():
+        cases.append({
+            "text": f"{GOLDEN_PREFIX}{wrong}{GOLDEN_SUFFIX}",
+            "expected": f"{GOLDEN_PREFIX}{correct}{GOLDEN_SUFFIX}"
+        })
+        if wrong.isascii() and wrong.upper() != wrong:
+            cases.append({
+                "text": f"{GOLDEN_PREFIX}{wrong.upper()}{GOLDEN_SUFFIX}",
+                "expected": f"{GOLDEN_PREFIX}{correct}{GOLDEN_SUFFIX}"
+            })
+
+    rng = random.Random(seed)
+    pairs = list(owners.values())
+    for _ in range(multi_cases if pairs else 0):
+        picked = rng.sample(pairs, min(5, len(pairs)))
+        cases.append({
+            "text": GOLDEN_PREFIX + "，".join(wrong for wrong, _ in picked) + GOLDEN_SUFFIX,
+            "expected": GOLDEN_PREFIX + "，".join(correct for _, correct in picked) + GOLDEN_SUFFIX
+        })
+    return cases
+
+
+def check_golden(manager: DictionaryManager, cases: List[Dict], max_failures: int = 20) -> Dict:
+    """逐条校验黄金语料，返回通过率和部分失败样例"""
+    failures = []
+    failed = 0
+    for case in cases:
+        actual = manager.fix_text(case["text"], accumulate=False)
+        if actual != case["expected"]:
+            failed += 1
+            if len(failures) < max_failures:
+                failures.append({"text": case["text"], "expected": case["expected"], "actual": actual})
+    return {"cases": len(cases), "failed": failed, "failures": failures}
+
+
+def _random_chinese(rng: random.Random, length: int) -> str:
+    return "".join(chr(_CJK_START + rng.randrange(_CJK_SIZE)) for _ in range(length))
+
+
+def _random_word(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(_LETTERS) for _ in range(length))
+
+
+def build_synthetic_dict(size: int, seed: int = 0, variants_per_term: int = 3) -> Dict:
+    """
+    生成指定变体数的中英混合字典（结构与 programmer_terms.json 相同）
+
+    一半术语是英文（变体为空格分隔的“读音拆分”，如 "kube ner tes"），一半是中文（变体为近音汉字）。
+    """
+    rng = random.Random(seed)
+    categories: Dict[str, Dict] = {}
+    seen = set()
+    produced = 0
+    term_index = 0
+    while produced < size:
+        term_index += 1
+        category = categories.setdefault(f"synthetic_{term_index % 16}", {
+            "name": f"合成分类 {term_index % 16}",
+            "description": "基准测试生成",
+            "terms": {}
+        })
+
+        if term_index % 2:
+            parts = [_random_word(rng, rng.randint(2, 6)) for _ in range(rng.randint(1, 3))]
+            correct = "".join(part.capitalize() for part in parts) + str(term_index)
+        else:
+            correct = _random_chinese(rng, rng.randint(2, 4))
+
+        variants = []
+        for _ in range(min(variants_per_term, size - produced)):
+            if term_index % 2:
+                wrong = " ".join(_random_word(rng, rng.randint(2, 6)) for _ in range(rng.randint(1, 3)))
+            else:
+                wrong = _random_chinese(rng, rng.randint(2, 5))
+            key = fold_text(wrong)
+            if key in seen:
+                continue
+            seen.add(key)
+            variants.append({"wrong": wrong, "description": "合成变体"})
+            produced += 1
+
+        if variants:
+            category["terms"][correct] = {"correct": correct, "description": "", "variants": variants}
+
+    return {"version": "bench", "description": f"合成字典（{size} 条变体）", "categories": categories}
+
+
+def build_synthetic_text(dict_data: Dict, length: int, seed: int = 0, hit_every: int = 25) -> str:
+    """生成指定长度的转录文本：填充语句中平均每 hit_every 个字符插入一个字典变体"""
+    rng = random.Random(seed)
+    wrongs = [
+        variant["wrong"]
+        for category_data in dict_data["categories"].values()
+        for term_data in category_data["terms"].values()
+        for variant in term_data["variants"]
+    ]
+    pieces = []
+    total = 0
+    while total < length:
+        piece = rng.choice(FILLER)
+        if wrongs and rng.random() < len(piece) / hit_every:
+            piece += rng.choice(wrongs) + rng.choice(("，", " ", "的"))
+        pieces.append(piece)
+        total += len(piece)
+    return "".join(pieces)[:length]
+
+
+# ----------------------------------------------------------------------
+# 测量
+# ----------------------------------------------------------------------
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def measure(fn: Callable, arg, min_runs: int, min_seconds: float, max_runs: int, chars: int = 0) -> Dict:
+    """
+    重复调用 fn(arg) 统计延迟：至少 min_runs 次且累计至少 min_seconds 秒（最多 max_runs 次）
+
+    峰值内存单独用 tracemalloc 再跑一次测得，避免追踪开销混进延迟。
+    """
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_runs:
+        t0 = time.perf_counter()
+        fn(arg)
+        latencies.append(time.perf_counter() - t0)
+        if len(latencies) >= min_runs and time.perf_counter() - started >= min_seconds:
+            break
+    total = sum(latencies)
+    latencies.sort()
+
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "runs": len(latencies),
+        "mean_ms": round(total / len(latencies) * 1000, 4),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 4),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 4),
+        "calls_per_s": round(len(latencies) / total, 2) if total else None,
+        "peak_bytes": peak
+    }
+    if chars:
+        result["chars_per_s"] = round(chars * len(latencies) / total, 1) if total else None
+    return result
+
+
+def load_manager(dict_file: str) -> Tuple[DictionaryManager, Dict]:
+    """冷启动（编译并写缓存）与热启动（读取预编译产物）各加载一次，记录耗时和峰值内存"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    DictionaryManager(dict_path=dict_file)
+    cold = time.perf_counter() - t0
+    _, cold_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    manager = DictionaryManager(dict_path=dict_file)
+    warm = time.perf_counter() - t0
+
+    return manager, {
+        "cold_s": round(cold, 4),
+        "warm_s": round(warm, 4),
+        "cold_peak_bytes": cold_peak
+    }
+
+
+def bench_size(size: int, text_lengths: List[int], workdir: str, args: argparse.Namespace) -> Dict:
+    """测一个字典规模下的全部指标"""
+    print(f"⏱️  字典规模 {size} ...", file=sys.stderr)
+    dict_data = build_synthetic_dict(size, seed=args.seed)
+    dict_file = os.path.join(workdir, f"synthetic_{size}.json")
+    with open(dict_file, "w", encoding="utf-8") as f:
+        json.dump(dict_data, f, ensure_ascii=False)
+
+    manager, load_stats = load_manager(dict_file)
+    entry = {
+        "dict_size": size,
+        "rules": manager.get_stats()["total_rules"],
+        "load": load_stats,
+        "build_prompt_terms": measure(
+            lambda _: manager.build_prompt_terms(), None, args.min_runs, args.min_seconds, args.max_runs
+        ),
+        "texts": []
+    }
+
+    for length in text_lengths:
+        text = build_synthetic_text(dict_data, length, seed=args.seed + length)
+        fix = measure(
+            lambda t: manager.fix_text(t, accumulate=False), text,
+            args.min_runs, args.min_seconds, args.max_runs, chars=len(text)
+        )
+        fix["replacements"] = len(manager.get_corrections())
+        detect = measure(
+            manager.detect_terms_in_text, text, args.min_runs, args.min_seconds, args.max_runs, chars=len(text)
+        )
+        entry["texts"].append({"length": len(text), "fix_text": fix, "detect_terms_in_text": detect})
+
+    del manager, dict_data
+    return entry
+
+
+def compare_results(current: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """对比两次结果的 p50 与加载耗时，返回超过阈值的回归项"""
+    regressions = []
+
+    def check(label: str, new: Optional[float], old: Optional[float]) -> None:
+        if new is None or not old:
+            return
+        ratio = new / old
+        if ratio > 1.0 + max_regression:
+            regressions.append(f"{label}: {old} → {new}（{ratio:.2f}x）")
+
+    old_sizes = {entry["dict_size"]: entry for entry in baseline.get("results", [])}
+    for entry in current.get("results", []):
+        old = old_sizes.get(entry["dict_size"])
+        if not old:
+            continue
+        size = entry["dict_size"]
+        check(f"[{size}] load.warm_s", entry["load"]["warm_s"], old["load"]["warm_s"])
+        check(f"[{size}] build_prompt_terms.p50_ms",
+              entry["build_prompt_terms"]["p50_ms"], old["build_prompt_terms"]["p50_ms"])
+        old_texts = {text["length"]: text for text in old.get("texts", [])}
+        for text in entry["texts"]:
+            old_text = old_texts.get(text["length"])
+            if not old_text:
+                continue
+            for op in ("fix_text", "detect_terms_in_text"):
+                check(f"[{size}/{text['length']}] {op}.p50_ms", text[op]["p50_ms"], old_text[op]["p50_ms"])
+
+    old_golden = baseline.get("golden", {})
+    new_golden = current.get("golden", {})
+    if new_golden.get("failed", 0) > old_golden.get("failed", 0):
+        regressions.append(f"golden: 失败 {old_golden.get('failed', 0)} → {new_golden['failed']}")
+    return regressions
+
+
+def _parse_ints(value: str) -> List[int]:
+    return [int(float(part)) for part in value.split(",") if part.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CodeWhisper 字典纠错基准测试")
+    parser.add_argument("--sizes", type=_parse_ints, default=list(DEFAULT_SIZES),
+                        help="字典变体数，逗号分隔（默认 1000,10000,100000；最大可到 1000000）")
+    parser.add_argument("--text-lengths", type=_parse_ints, default=list(DEFAULT_TEXT_LENGTHS),
+                        help="转录文本字符数，逗号分隔（默认 50,500,5000,50000）")
+    parser.add_argument("--golden-dict", default=os.path.join(get_project_root(), "dictionaries", "programmer_terms.json"),
+                        help="生成黄金语料用的真实字典")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--min-runs", type=int, default=20, help="每项至少运行次数")
+    parser.add_argument("--max-runs", type=int, default=2000, help="每项最多运行次数")
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="每项至少累计运行秒数")
+    parser.add_argument("--output", help="结果 JSON 文件（默认输出到标准输出）")
+    parser.add_argument("--baseline", help="上一版本的结果 JSON，用于检测性能回归")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="允许的 p50 变慢比例（默认 0.2，即 20%%）")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="cw-bench-")
+    try:
+        print("🧪 校验黄金语料 ...", file=sys.stderr)
+        golden_manager = DictionaryManager(dict_path=args.golden_dict)
+        golden = check_golden(golden_manager, build_golden_corpus(args.golden_dict, seed=args.seed))
+        del golden_manager
+
+        results = [bench_size(size, args.text_lengths, workdir, args) for size in args.sizes]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "version": __version__,
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed
+        },
+        "golden": golden,
+        "results": results
+    }
+    if RESOURCE_AVAILABLE:
+        # ru_maxrss 在 macOS 上单位为字节，Linux 上为 KB
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["meta"]["max_rss_bytes"] = max_rss if sys.platform == "darwin" else max_rss * 1024
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"💾 结果已写入 {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    exit_code = 0
+    if golden["failed"]:
+        print(f"❌ 黄金语料失败 {golden['failed']}/{golden['cases']} 条", file=sys.stderr)
+        exit_code = 1
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.max_regression)
+        for line in regressions:
+            print(f"⚠️  性能回归 {line}", file=sys.stderr)
+        if regressions:
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+拼音模糊匹配基准测试 - 5 万中文术语下每段转录（40 字）的检索耗时必须低于 1 ms
+
+用法（在项目根目录执行，需要安装 pypinyin）：
+
+    python -m benchmarks.phonetic_benchmark                      # 默认 5 万术语，40 / 200 字转录
+    python -m benchmarks.phonetic_benchmark --terms 100000       # 自定义术语数
+    python -m benchmarks.phonetic_benchmark --limit-ms 0.5       # 自定义耗时上限
+
+流程：
+1. 以 pypinyin 自带的词组表为术语（不够时用两个词组拼接补足），固定随机种子，结果可复现
+2. 生成指定长度的转录文本：填充语句中穿插术语，其中一半把某个字换成同音字（应被拼音匹配发现）
+3. 统计 PhoneticIndex.find 的 p50/p99 延迟和索引构建耗时
+
+上限按每 40 字（Whisper 一个分段的典型长度）计：更长的文本按字数等比放宽，
+检索耗时与文本长度成正比，任一文本长度超过上限时返回非 0。
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.dict_benchmark import FILLER, measure
+from codewhisper.phonetic_index import PYPINYIN_AVAILABLE, PhoneticIndex, _HAN_RUN, _pinyin
+
+DEFAULT_TERMS = 50_000
+DEFAULT_TEXT_LENGTHS = (40, 200)
+# 每段转录的平均检索耗时上限（毫秒），按 SEGMENT_CHARS 字计
+DEFAULT_LIMIT_MS = 1.0
+SEGMENT_CHARS = 40
+
+
+def build_terms(count: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """生成 (术语, 分类) 列表：先取真实词组，不够时用两个词组拼接"""
+    from pypinyin.phrases_dict import phrases_dict
+
+    rng = random.Random(seed)
+    phrases = sorted(phrase for phrase in phrases_dict if _HAN_RUN.fullmatch(phrase))
+    rng.shuffle(phrases)
+    terms = phrases[:count]
+    seen = set(terms)
+    while len(terms) < count:
+        term = rng.choice(phrases)[:2] + rng.choice(phrases)[:2]
+        if term not in seen:
+            seen.add(term)
+            terms.append(term)
+    return [(term, f"bench_{k % 16}") for k, term in enumerate(terms)]
+
+
+def _homophones(terms: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """术语用字中，带声调读音相同的字互为同音字"""
+    by_reading: Dict[str, List[str]] = {}
+    for ch in sorted({ch for term, _ in terms for ch in term}):
+        by_reading.setdefault(_pinyin(ch)[0][0], []).append(ch)
+    return {ch: chars for chars in by_reading.values() if len(chars) > 1 for ch in chars}
+
+
+def build_texts(terms: List[Tuple[str, str]], length: int, count: int, seed: int = 0) -> List[str]:
+    """生成转录文本：每段穿插若干术语，其中一半换掉一个同音字"""
+    rng = random.Random(seed)
+    homophones = _homophones(terms)
+    texts = []
+    for _ in range(count):
+        pieces = []
+        total = 0
+        while total < length:
+            piece = rng.choice(FILLER)
+            term = rng.choice(terms)[0]
+            if rng.random() < 0.5:
+                pos = rng.randrange(len(term))
+                others = [ch for ch in homophones.get(term[pos], ()) if ch != term[pos]]
+                if others:
+                    term = term[:pos] + rng.choice(others) + term[pos + 1:]
+            piece += term + rng.choice(("，", "。", "的"))
+            pieces.append(piece)
+            total += len(piece)
+        texts.append("".join(pieces)[:length])
+    return texts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CodeWhisper 拼音模糊匹配基准测试")
+    parser.add_argument("--terms", type=int, default=DEFAULT_TERMS, help="术语数（默认 50000）")
+    parser.add_argument("--text-lengths", type=lambda v: [int(x) for x in v.split(",") if x.strip()],
+                        default=list(DEFAULT_TEXT_LENGTHS), help="转录文本字符数，逗号分隔（默认 40,200）")
+    parser.add_argument("--texts", type=int, default=50, help="每种长度的文本条数")
+    parser.add_argument("--max-distance", type=int, default=1, help="允许近似的音节数")
+    parser.add_argument("--limit-ms", type=float, default=DEFAULT_LIMIT_MS,
+                        help=f"每段 {SEGMENT_CHARS} 字转录的平均耗时上限（毫秒）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--min-runs", type=int, default=20, help="每项至少运行次数")
+    parser.add_argument("--max-runs", type=int, default=200, help="每项最多运行次数")
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="每项至少累计运行秒数")
+    args = parser.parse_args(argv)
+
+    if not PYPINYIN_AVAILABLE:
+        print("❌ 未安装 pypinyin，无法运行拼音基准测试", file=sys.stderr)
+        return 2
+
+    terms = build_terms(args.terms, seed=args.seed)
+    t0 = time.perf_counter()
+    index = PhoneticIndex(terms)
+    build_s = time.perf_counter() - t0
+    print(f"⏱️  索引构建 {build_s:.2f}s（{len(index)} 个术语）", file=sys.stderr)
+
+    results = []
+    exit_code = 0
+    for length in args.text_lengths:
+        texts = build_texts(terms, length, args.texts, seed=args.seed + length)
+        # 先把文本用字的读音缓存起来，与常驻服务的稳定状态一致
+        for text in texts:
+            index.find(text, max_distance=args.max_distance)
+
+        def find_all(batch: List[str]) -> int:
+            return sum(len(index.find(text, max_distance=args.max_distance)) for text in batch)
+
+        stats = measure(find_all, texts, args.min_runs, args.min_seconds, args.max_runs)
+        per_text_ms = stats["mean_ms"] / len(texts)
+        limit_ms = args.limit_ms * max(1.0, length / SEGMENT_CHARS)
+        results.append({
+            "length": length,
+            "texts": len(texts),
+            "hits": find_all(texts),
+            "per_text_ms": round(per_text_ms, 4),
+            "limit_ms": round(limit_ms, 3),
+            "batch": stats,
+        })
+        if per_text_ms >= limit_ms:
+            print(f"❌ {length} 字转录平均 {per_text_ms:.3f} ms，超过上限 {limit_ms:g} ms", file=sys.stderr)
+            exit_code = 1
+
+    print(json.dumps({"terms": len(index), "build_s": round(build_s, 3), "results": results},
+                     ensure_ascii=False, indent=2))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+推理精度基准测试 - 对比 fp32 / int8 / bf16 的权重内存、实时率和相对 FP32 的准确率
+
+用法（在项目根目录执行，需要安装 torch 和 openai-whisper）：
+
+    python -m benchmarks.precision_benchmark --audio fixtures/                 # 目录下的全部音频
+    python -m benchmarks.precision_benchmark --audio a.wav b.wav --model small
+    python -m benchmarks.precision_benchmark --audio fixtures/ --precisions fp32,int8 --max-cer 0.05
+
+流程：
+1. 每种精度各构造一个 CodeWhisper（CPU），先预热，再逐段转录全部音频
+2. 记录权重内存（int8 为打包后的量化权重）、总推理耗时和实时率（推理耗时 / 音频时长）
+3. 以 FP32 的输出为参照，计算其他精度的字错误率（CER，忽略空白和标点）；
+   超过 --max-cer 时返回非 0
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from codewhisper import __version__
+from codewhisper.audio_buffer import AudioBuffer
+from codewhisper.precision import PRECISIONS
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3", ".m4a")
+
+# 计算 CER 前去掉的空白与标点
+_IGNORED_CHARS = re.compile(r"[\s，。！？、；：,.!?;:\"'“”‘’()（）]+")
+
+
+def collect_audio(paths: List[str]) -> List[str]:
+    """展开目录，返回排序后的音频文件列表"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    files.append(os.path.join(path, name))
+        else:
+            files.append(path)
+    return files
+
+
+def char_error_rate(reference: str, hypothesis: str) -> float:
+    """字错误率：编辑距离 / 参照文本长度（忽略空白和标点）"""
+    ref = _IGNORED_CHARS.sub("", reference)
+    hyp = _IGNORED_CHARS.sub("", hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_char in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_char in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_char != hyp_char))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def bench_precision(precision: str, model_name: str, audios: List[AudioBuffer], language: str) -> Dict:
+    """用指定精度转录全部音频，返回内存、耗时、实时率和每段文本"""
+    from codewhisper.transcriber import CodeWhisper
+
+    print(f"⏱  {precision}: 加载模型并预热 ...", file=sys.stderr)
+    whisper = CodeWhisper(model_name=model_name, precision=precision, warmup=True)
+
+    texts = []
+    started = time.perf_counter()
+    for audio in audios:
+        result = whisper.transcribe(
+            audio, language=language, verbose=False, fix_programmer_terms=False, learn_user_terms=False,
+        )
+        texts.append(result["text"])
+    wall = time.perf_counter() - started
+
+    stats = whisper.get_inference_stats()
+    report = {
+        "precision": stats["precision"],
+        "requested": precision,
+        "device": stats["device"],
+        "model_memory_mb": stats["model_memory_mb"],
+        "load_seconds": round(sum(whisper.startup_times.values()), 2),
+        "audio_seconds": round(sum(audio.duration for audio in audios), 2),
+        "wall_seconds": round(wall, 2),
+        "compute_seconds": round(stats["compute_seconds"], 2),
+        "rtf": stats["rtf"],
+        "texts": texts,
+    }
+    del whisper
+    gc.collect()
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CodeWhisper 推理精度基准测试")
+    parser.add_argument("--audio", nargs="+", required=True, help="音频文件或目录（作为固定的评测集）")
+    parser.add_argument("--model", default="medium", help="Whisper 模型名（默认 medium）")
+    parser.add_argument("--precisions", default=",".join(PRECISIONS),
+                        help=f"要测试的精度，逗号分隔（默认 {','.join(PRECISIONS)}）")
+    parser.add_argument("--language", default="zh", help="转录语言（默认 zh）")
+    parser.add_argument("--max-cer", type=float, default=0.05,
+                        help="相对 FP32 允许的最大平均字错误率（默认 0.05）")
+    parser.add_argument("--output", help="结果 JSON 文件（默认输出到标准输出）")
+    args = parser.parse_args(argv)
+
+    precisions = [p.strip() for p in args.precisions.split(",") if p.strip()]
+    unknown = [p for p in precisions if p not in PRECISIONS]
+    if unknown:
+        parser.error(f"不支持的精度: {', '.join(unknown)}")
+    if "fp32" not in precisions:
+        # 准确率以 FP32 为参照
+        precisions.insert(0, "fp32")
+
+    files = collect_audio(args.audio)
+    if not files:
+        parser.error("没有找到音频文件")
+    audios = [AudioBuffer.from_file(path) for path in files]
+
+    results = {precision: bench_precision(precision, args.model, audios, args.language) for precision in precisions}
+
+    reference = results["fp32"]["texts"]
+    for precision, result in results.items():
+        cers = [char_error_rate(ref, hyp) for ref, hyp in zip(reference, result["texts"])]
+        result["cer_vs_fp32"] = round(sum(cers) / len(cers), 4)
+        result["max_cer_vs_fp32"] = round(max(cers), 4)
+        result["files"] = [
+            {"path": path, "cer_vs_fp32": round(cer, 4), "text": text}
+            for path, cer, text in zip(files, cers, result.pop("texts"))
+        ]
+
+    report = {
+        "meta": {
+            "version": __version__,
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "model": args.model,
+            "files": len(files),
+        },
+        "results": list(results.values()),
+    }
+
+    for result in report["results"]:
+        print(
+            f"  {result['requested']:>5} → {result['precision']:<5} 权重 {result['model_memory_mb']:>8.1f} MB  "
+            f"RTF {result['rtf']}  CER(相对 FP32) {result['cer_vs_fp32']:.2%}",
+            file=sys.stderr,
+        )
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"💾 结果已写入 {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    exit_code = 0
+    for result in report["results"]:
+        if result["cer_vs_fp32"] > args.max_cer:
+            print(f"❌ {result['requested']} 相对 FP32 的字错误率 {result['cer_vs_fp32']:.2%} 超过 {args.max_cer:.2%}",
+                  file=sys.stderr)
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+音频缓冲 - 一次解码，在静音判断、分帧能量、梅尔谱等各个环节之间共享
+"""
+
+from functools import cached_property
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from .audio_io import SAMPLE_RATE, load_audio
+
+# Whisper 每个解码窗口的长度（30 秒）
+CHUNK_SECONDS = 30
+N_SAMPLES = CHUNK_SECONDS * SAMPLE_RATE
+
+
+class AudioBuffer:
+    """
+    单次请求的解码后音频
+
+    持有 16 kHz 单声道 float32 采样，派生数据（强度统计、分帧能量、对数梅尔谱、补齐后的梅尔谱）
+    在第一次用到时计算并缓存；同一请求里的静音判断和 VAD 复用同一份强度统计与分帧能量，音频文件只解码一次。
+
+    梅尔谱目前只有批量转录（transcribe_batch）用到：单条转录把采样直接交给 whisper.transcribe，
+    由 Whisper 在内部自行计算梅尔谱，不经过这里的缓存。
+
+    对象只在一个请求内使用，不做跨线程同步。
+    """
+
+    def __init__(self, samples: np.ndarray, sample_rate: int = SAMPLE_RATE, source: Optional[str] = None):
+        """
+        Args:
+            samples: 一维 float32 采样（连续的 float32 数组直接引用，不复制）
+            sample_rate: 采样率，必须为 16 kHz（其他采样率请用 from_file / audio_io.resample 转换）
+            source: 来源文件路径（仅用于日志）
+        """
+        if sample_rate != SAMPLE_RATE:
+            raise ValueError(f"AudioBuffer 只接受 {SAMPLE_RATE} Hz 的采样，收到 {sample_rate} Hz")
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim > 1:
+            if samples.ndim == 2 and 1 in samples.shape:
+                samples = samples.reshape(-1)
+            else:
+                raise ValueError(f"只支持单声道音频，收到的数组形状为 {samples.shape}")
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.source = source
+        self._frame_energies: Dict[Tuple[int, int], np.ndarray] = {}
+        self._zero_crossings: Dict[Tuple[int, int], np.ndarray] = {}
+        self._mels: Dict[Tuple, object] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "AudioBuffer":
+        """解码音频文件（进程内解码并重采样到 16 kHz 单声道）"""
+        return cls(load_audio(path), source=path)
+
+    @classmethod
+    def from_input(cls, audio: Union["AudioBuffer", str, np.ndarray, bytes, bytearray, memoryview]) -> "AudioBuffer":
+        """
+        把转录输入统一成 AudioBuffer：已是 AudioBuffer 时原样返回（保留已缓存的结果），
+        路径会被解码，bytes / memoryview 等缓冲区按 float32 原始采样解释
+        """
+        if isinstance(audio, AudioBuffer):
+            return audio
+        if isinstance(audio, str):
+            return cls.from_file(audio)
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            audio = np.frombuffer(audio, dtype=np.float32)
+        return cls(audio)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __repr__(self) -> str:
+        source = f", source={self.source!r}" if self.source else ""
+        return f"AudioBuffer({self.duration:.2f}s{source})"
+
+    @property
+    def duration(self) -> float:
+        """时长（秒）"""
+        return len(self.samples) / self.sample_rate
+
+    @cached_property
+    def level_stats(self) -> Tuple[float, float, float]:
+        """(时长, RMS, 峰值)，用于快速判断“几乎静音”的输入"""
+        if len(self.samples) == 0:
+            return 0.0, 0.0, 0.0
+        rms = float(np.sqrt(np.mean(np.square(self.samples), dtype=np.float64)))
+        peak = float(np.max(np.abs(self.samples)))
+        return self.duration, rms, peak
+
+    def frame_energies(self, frame_length: int = 400, hop_length: int = 160) -> np.ndarray:
+        """
+        分帧能量（每帧的均方值），默认 25 ms 帧长、10 ms 帧移
+
+        不足一帧的尾部补零后算作一帧。
+
+        Returns:
+            float32 数组，长度为帧数
+        """
+        key = (frame_length, hop_length)
+        cached = self._frame_energies.get(key)
+        if cached is not None:
+            return cached
+
+        samples = self._padded_for_frames(frame_length, hop_length)
+        if len(samples) == 0:
+            energies = np.zeros(0, dtype=np.float32)
+        else:
+            frames = np.lib.stride_tricks.sliding_window_view(samples, frame_length)[::hop_length]
+            energies = np.einsum("ij,ij->i", frames, frames, dtype=np.float32) / frame_length
+        self._frame_energies[key] = energies
+        return energies
+
+    def zero_crossing_rates(self, frame_length: int = 400, hop_length: int = 160) -> np.ndarray:
+        """
+        分帧过零率（帧内相邻采样符号变化的比例），分帧方式与 frame_energies 一致
+
+        先对整段音频算一次符号变化的前缀和，每帧的过零数是两个前缀和之差，不需要展开帧矩阵。
+
+        Returns:
+            float32 数组，长度为帧数
+        """
+        key = (frame_length, hop_length)
+        cached = self._zero_crossings.get(key)
+        if cached is not None:
+            return cached
+
+        samples = self._padded_for_frames(frame_length, hop_length)
+        if len(samples) == 0:
+            rates = np.zeros(0, dtype=np.float32)
+        else:
+            signs = np.signbit(samples)
+            # crossings[i]：采样 0..i 之间的符号变化次数
+            crossings = np.concatenate([[0], np.cumsum(signs[1:] != signs[:-1], dtype=np.int64)])
+            starts = np.arange(0, len(samples) - frame_length + 1, hop_length)
+            rates = ((crossings[starts + frame_length - 1] - crossings[starts]) / (frame_length - 1)).astype(np.float32)
+        self._zero_crossings[key] = rates
+        return rates
+
+    def _padded_for_frames(self, frame_length: int, hop_length: int) -> np.ndarray:
+        """尾部补零到整帧（不足一帧的尾部算作一帧）"""
+        samples = self.samples
+        if len(samples) == 0:
+            return samples
+        n_frames = 1 + max(0, -(-(len(samples) - frame_length) // hop_length))
+        padded_len = (n_frames - 1) * hop_length + frame_length
+        if padded_len > len(samples):
+            samples = np.concatenate([samples, np.zeros(padded_len - len(samples), dtype=np.float32)])
+        return samples
+
+    def log_mel(self, n_mels: int = 80, device=None):
+        """对数梅尔谱（Whisper 的特征，不补齐；需要安装 openai-whisper）"""
+        return self._mel(n_mels, 0, device)
+
+    def padded_mel(self, n_mels: int = 80, device=None):
+        """
+        尾部补齐 30 秒静音后的对数梅尔谱，与 whisper.transcribe 内部使用的特征一致，
+        按 30 秒窗口切片后可直接送入解码器（批量转录使用）
+        """
+        return self._mel(n_mels, N_SAMPLES, device)
+
+    def _mel(self, n_mels: int, padding: int, device):
+        key = (n_mels, padding, str(device) if device is not None else None)
+        mel = self._mels.get(key)
+        if mel is None:
+            # 延迟导入：只做静音判断 / VAD 时不需要加载 torch
+            from whisper.audio import log_mel_spectrogram
+            mel = log_mel_spectrogram(self.samples, n_mels, padding=padding, device=device)
+            self._mels[key] = mel
+        return mel
@@ -0,0 +1,128 @@
+"""
+音频解码 - 进程内用 soundfile 解码 WAV/FLAC/OGG 等格式，NumPy 多相滤波重采样到 16 kHz 单声道
+
+whisper.load_audio 每次调用都会启动一个 ffmpeg 子进程，短音频的开销几乎全在进程创建上；
+这里只有 soundfile 读不了的格式（如 m4a、mp4）才回退到 ffmpeg。
+"""
+
+import subprocess
+from functools import lru_cache
+from math import gcd
+from typing import Tuple
+
+import numpy as np
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except (ImportError, OSError):
+    # OSError：python 包已安装但系统缺少 libsndfile
+    SOUNDFILE_AVAILABLE = False
+
+# Whisper 模型要求的采样率
+SAMPLE_RATE = 16000
+
+# 每次计算的输出采样数，限制重采样时的临时内存
+_RESAMPLE_BLOCK = 1 << 15
+
+
+def load_audio(path: str, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    读取音频文件，返回单声道 float32 数组（取值 -1 ~ 1）
+
+    优先在进程内用 soundfile 解码，失败时回退到 ffmpeg 子进程（与 whisper.load_audio 相同的输出）。
+
+    Args:
+        path: 音频文件路径
+        sr: 目标采样率
+
+    Returns:
+        一维 float32 数组
+    """
+    if SOUNDFILE_AVAILABLE:
+        try:
+            audio, file_sr = sf.read(path, dtype="float32", always_2d=True)
+        except RuntimeError:
+            # soundfile 不认识的格式（LibsndfileError 是 RuntimeError 的子类），交给 ffmpeg
+            pass
+        else:
+            # 多声道取平均混成单声道（与 ffmpeg -ac 1 一致）
+            mono = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1, dtype=np.float32)
+            return resample(mono, file_sr, sr)
+    return _load_audio_ffmpeg(path, sr)
+
+
+def _load_audio_ffmpeg(path: str, sr: int) -> np.ndarray:
+    """用 ffmpeg 解码（soundfile 不支持的格式）"""
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr), "-"
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"音频解码失败: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    多相滤波重采样（等价于先插零上采样、低通滤波、再抽取，但只计算需要输出的点）
+
+    Args:
+        audio: 一维 float32 数组
+        orig_sr: 原采样率
+        target_sr: 目标采样率
+
+    Returns:
+        重采样后的一维 float32 数组，长度为 ceil(len(audio) * target_sr / orig_sr)
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if orig_sr == target_sr or audio.size == 0:
+        return audio
+
+    g = gcd(orig_sr, target_sr)
+    up, down = target_sr // g, orig_sr // g
+    phases, delay = _polyphase_filter(up, down)
+    taps = phases.shape[1]
+
+    n_out = -(-len(audio) * up // down)
+    # 左侧补 taps-1 个零，使第 s 个窗口恰好覆盖 x[s-taps+1 .. s]；右侧补足滤波器延迟
+    padded = np.concatenate([
+        np.zeros(taps - 1, dtype=np.float32),
+        audio,
+        np.zeros(taps + delay // up + 1, dtype=np.float32),
+    ])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, taps)
+
+    out = np.empty(n_out, dtype=np.float32)
+    for block_start in range(0, n_out, _RESAMPLE_BLOCK):
+        m = np.arange(block_start, min(block_start + _RESAMPLE_BLOCK, n_out), dtype=np.int64)
+        t = m * down + delay
+        # y[m] = Σk h[t%up + k·up] · x[t//up - k]
+        out[block_start:block_start + len(m)] = np.einsum("ij,ij->i", windows[t // up], phases[t % up])
+    return out
+
+
+@lru_cache(maxsize=16)
+def _polyphase_filter(up: int, down: int) -> Tuple[np.ndarray, int]:
+    """
+    设计 Kaiser 窗低通滤波器并拆成多相形式（按采样率比缓存）
+
+    Returns:
+        (phases, delay)：phases[p] 为第 p 相的系数（已按窗口顺序反转），delay 为滤波器群延迟（上采样后的点数）
+    """
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    n = np.arange(-half_len, half_len + 1, dtype=np.float64)
+    cutoff = 1.0 / max_rate
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), 5.0) * up
+
+    taps = -(-len(h) // up)
+    padded = np.zeros(taps * up, dtype=np.float64)
+    padded[:len(h)] = h
+    # phases[p, k] = h[p + k·up]；窗口里 x 按时间正序排列，系数反转后逐点相乘即可
+    phases = padded.reshape(taps, up).T[:, ::-1]
+    phases = np.ascontiguousarray(phases, dtype=np.float32)
+    phases.setflags(write=False)  # 缓存共享，禁止修改
+    return phases, half_len
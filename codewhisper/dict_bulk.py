@@ -0,0 +1,120 @@
+"""
+批量修正 - 把大量文本（历史转录、JSONL 语料）分块交给进程池修正，结果按输入顺序流式产出
+
+每个工作进程在初始化时拿到同一份匹配源快照，之后只传递文本分块；
+输入按需读取、在途分块数有上限，内存占用与语料大小无关。
+"""
+
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .console import debug
+from .dict_matching import apply_corrections
+
+# 批量修正的工作进程持有的匹配源快照（进程池初始化时注入一次）
+_worker_sources: Optional[Tuple] = None
+_worker_phonetic: Optional[Tuple] = None
+
+
+def _init_bulk_worker(sources: Tuple, phonetic: Optional[Tuple] = None) -> None:
+    global _worker_sources, _worker_phonetic
+    _worker_sources = sources
+    _worker_phonetic = phonetic
+
+
+def _fix_chunk(texts: List[str]) -> List[Tuple[str, List[Dict]]]:
+    return [apply_corrections(text, _worker_sources, _worker_phonetic) for text in texts]
+
+
+def _iter_chunks(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def correct_texts(texts: Iterable[str], sources: Tuple, phonetic: Optional[Tuple] = None,
+                  workers: Optional[int] = None, chunk_size: int = 64) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    按匹配源快照批量修正文本，结果按输入顺序逐条产出
+
+    Args:
+        texts: 文本序列，可以是生成器
+        sources: 匹配源快照
+        phonetic: 拼音模糊匹配配置（见 apply_corrections），为 None 时不做拼音匹配
+        workers: 工作进程数，默认 CPU 核数；<=1 时在当前进程内顺序处理
+        chunk_size: 每个任务包含的文本条数
+
+    Yields:
+        (修正后的文本, 该文本的修正记录)
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = _iter_chunks(texts, max(1, chunk_size))
+
+    if workers <= 1:
+        for chunk in chunks:
+            for text in chunk:
+                yield apply_corrections(text, sources, phonetic)
+        return
+
+    # 最多保持 workers * 4 个分块在途：既能喂饱进程池，又不会提前读完整个输入
+    max_pending = workers * 4
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_bulk_worker,
+                             initargs=(sources, phonetic)) as pool:
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(_fix_chunk, chunk))
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # 调用方提前停止迭代时，取消尚未开始的任务
+            for future in pending:
+                future.cancel()
+
+
+def correct_jsonl(input_path: str, output_path: str, sources: Tuple, phonetic: Optional[Tuple] = None,
+                  text_field: str = "text", workers: Optional[int] = None, chunk_size: int = 64) -> int:
+    """
+    流式修正 JSONL 语料：逐行读取、并行修正、按原顺序逐行写出
+
+    每行是一个 JSON 对象（纯字符串行也可以），输出时 text_field 替换为修正后的文本，
+    并附加 "corrections" 字段记录本行的修正详情。
+
+    Returns:
+        处理的行数
+    """
+    records = deque()
+
+    def _texts() -> Iterator[str]:
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    record = {text_field: record}
+                records.append(record)
+                yield record.get(text_field) or ""
+
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as out:
+        for fixed_text, corrections in correct_texts(_texts(), sources, phonetic, workers, chunk_size):
+            record = records.popleft()
+            record[text_field] = fixed_text
+            record["corrections"] = corrections
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+
+    debug(f"✓ 批量修正完成: {count} 行 → {output_path}")
+    return count
@@ -0,0 +1,87 @@
+"""
+预编译字典缓存 - 把解析、排序好的规则表和自动机序列化到用户缓存目录
+
+字典 JSON 每次启动都要解析、转义、排序并构建自动机，规则多时要几百毫秒。
+这里以 JSON 内容的 SHA-256 为键保存一份 pickle 产物，内容不变时直接反序列化：
+
+    ~/.cache/codewhisper/compiled/programmer_terms-<路径哈希>.compiled.pkl
+
+产物文件头带魔数、版本号和字典内容哈希，读取时先校验文件头再 unpickle，
+过期的产物和来历不明的文件都不会被反序列化。
+"""
+
+import hashlib
+import os
+import pickle
+import struct
+from typing import Dict, Optional
+
+from .console import debug
+
+# 预编译字典产物的文件后缀与格式版本（规则结构变化时递增版本号，旧产物自动失效）
+COMPILED_SUFFIX = ".compiled.pkl"
+COMPILED_VERSION = 2
+# 产物文件头：魔数 + 版本 + 字典内容的 SHA-256，反序列化之前先校验，过期或来历不明的文件不会被 unpickle
+COMPILED_MAGIC = b"CWDICTC\0"
+_COMPILED_HEADER = struct.Struct("<8sI32s")
+
+
+def compiled_path(dict_file: str) -> str:
+    """
+    预编译产物路径：放在当前用户的缓存目录（CODEWHISPER_CACHE_DIR，默认 ~/.cache/codewhisper/compiled），
+    不与可能被他人写入的字典目录放在一起；文件名带字典绝对路径的哈希，不同位置的同名字典互不覆盖
+    """
+    root = os.environ.get("CODEWHISPER_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "codewhisper"
+    )
+    stem = os.path.splitext(os.path.basename(dict_file))[0]
+    key = hashlib.sha256(os.path.abspath(dict_file).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(root, "compiled", f"{stem}-{key}{COMPILED_SUFFIX}")
+
+
+def load_compiled(dict_file: str, digest: str) -> Optional[Dict]:
+    """读取预编译产物；不存在、版本不符或哈希不一致时返回 None"""
+    path = compiled_path(dict_file)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(_COMPILED_HEADER.size)
+            if len(header) != _COMPILED_HEADER.size:
+                return None
+            magic, version, source_hash = _COMPILED_HEADER.unpack(header)
+            # 先校验文件头，再反序列化：只有本版本为同一份字典内容写出的产物才会被 unpickle
+            if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+                return None
+            if source_hash != bytes.fromhex(digest):
+                debug("♻️ 字典内容已变化，重新构建预编译字典")
+                return None
+            compiled = pickle.load(f)
+    except Exception as e:
+        debug(f"⚠️  预编译字典读取失败，将重新构建: {e}")
+        return None
+
+    if not isinstance(compiled, dict) or compiled.get("hash") != digest:
+        return None
+    return compiled
+
+
+def save_compiled(dict_file: str, compiled: Dict) -> None:
+    """原子写入预编译产物（先写临时文件再替换），写失败不影响正常使用"""
+    path = compiled_path(dict_file)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(_COMPILED_HEADER.pack(COMPILED_MAGIC, COMPILED_VERSION, bytes.fromhex(compiled["hash"])))
+            pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        debug(f"💾 预编译字典已保存: {path}")
+    except Exception as e:
+        debug(f"⚠️  保存预编译字典失败: {e}")
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except Exception:
+            pass
@@ -0,0 +1,157 @@
+"""
+字典增量日志 - 以追加写的方式记录术语增删，稍后再合并回主字典文件
+
+主字典（如 programmer_terms.json）体积较大，每添加一个术语就整体重写既慢又容易与其他进程冲突。
+这里把每次编辑写成一行 JSON 追加到同目录的 *.delta.jsonl：
+
+    {"op": "add", "wrong": "瑞迪斯", "correct": "Redis", "category": "other", "description": "..."}
+    {"op": "remove", "wrong": "瑞迪斯"}
+
+单行通过一次 O_APPEND 写入，多进程同时追加也不会互相覆盖；
+merge_deltas() 把日志合并进主字典（原子替换）后清空日志。
+"""
+
+import json
+import os
+from typing import Dict, List, Tuple
+
+from .console import debug
+from .term_matcher import fold_text
+
+DELTA_SUFFIX = ".delta.jsonl"
+MERGING_SUFFIX = ".merging"
+
+
+def delta_path(dict_file: str) -> str:
+    """增量日志路径：programmer_terms.json → programmer_terms.delta.jsonl"""
+    base, _ = os.path.splitext(dict_file)
+    return base + DELTA_SUFFIX
+
+
+def append_delta(dict_file: str, op: Dict) -> None:
+    """
+    追加一条编辑记录（单次 write，O_APPEND 保证多进程追加时不交叉）
+
+    Args:
+        dict_file: 主字典文件路径
+        op: 编辑记录，至少包含 "op" 和 "wrong"
+    """
+    line = (json.dumps(op, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(delta_path(dict_file), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, line)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_deltas(path: str, offset: int = 0) -> Tuple[List[Dict], int]:
+    """
+    从指定偏移读取完整的编辑记录
+
+    只消费到最后一个换行符为止，另一进程正在写入的半行留到下次再读。
+
+    Returns:
+        (编辑记录列表, 新的偏移量)
+    """
+    if not os.path.exists(path):
+        return [], 0
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read()
+
+    last_newline = chunk.rfind(b"\n")
+    if last_newline < 0:
+        return [], offset
+
+    ops = []
+    for raw_line in chunk[:last_newline].split(b"\n"):
+        raw_line = raw_line.strip()
+        if not raw_line:
+            continue
+        try:
+            op = json.loads(raw_line.decode("utf-8"))
+        except ValueError:
+            debug(f"⚠️  跳过无法解析的增量记录: {raw_line[:80]!r}")
+            continue
+        if isinstance(op, dict) and op.get("op") in ("add", "remove") and op.get("wrong"):
+            ops.append(op)
+
+    return ops, offset + last_newline + 1
+
+
+def read_pending_deltas(dict_file: str) -> List[Dict]:
+    """读取尚未合并进主字典的全部编辑记录（含正在合并中的日志）"""
+    path = delta_path(dict_file)
+    merging_ops, _ = read_deltas(path + MERGING_SUFFIX)
+    ops, _ = read_deltas(path)
+    return merging_ops + ops
+
+
+def apply_delta_to_data(data: Dict, op: Dict) -> None:
+    """把一条编辑记录应用到字典 JSON 数据（分类 → 术语 → 变体）上"""
+    key = fold_text(op["wrong"])
+    categories = data.setdefault("categories", {})
+
+    # 先从所有术语里摘掉同一变体，add 时相当于“更新”
+    for category_data in categories.values():
+        for term_data in category_data.get("terms", {}).values():
+            variants = term_data.get("variants", [])
+            kept = [v for v in variants if fold_text(v.get("wrong", "")) != key]
+            if len(kept) != len(variants):
+                term_data["variants"] = kept
+
+    if op["op"] != "add":
+        return
+
+    correct_term = op.get("correct", "")
+    description = op.get("description", "")
+    category_data = categories.setdefault(op.get("category") or "other", {})
+    terms = category_data.setdefault("terms", {})
+    term_data = terms.setdefault(correct_term, {
+        "correct": correct_term,
+        "description": description,
+        "variants": []
+    })
+    term_data.setdefault("variants", []).append({
+        "wrong": op["wrong"],
+        "description": description
+    })
+
+
+def merge_deltas(dict_file: str) -> int:
+    """
+    把增量日志合并进主字典文件
+
+    先把日志改名为 *.merging（改名之后的新编辑会写进新的日志，不会丢失），
+    合并后原子替换主字典，最后删除 *.merging。
+
+    Returns:
+        合并的编辑记录条数
+    """
+    path = delta_path(dict_file)
+    merging_path = path + MERGING_SUFFIX
+
+    # 上次合并中途退出时残留 *.merging：先合并它，新日志留到下一次
+    if os.path.exists(path) and not os.path.exists(merging_path):
+        os.replace(path, merging_path)
+    ops, _ = read_deltas(merging_path)
+    if not ops:
+        if os.path.exists(merging_path):
+            os.remove(merging_path)
+        return 0
+
+    with open(dict_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for op in ops:
+        apply_delta_to_data(data, op)
+
+    tmp_path = f"{dict_file}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, dict_file)
+    os.remove(merging_path)
+
+    debug(f"💾 已合并 {len(ops)} 条字典增量到 {dict_file}")
+    return len(ops)
@@ -0,0 +1,206 @@
+"""
+字典分层 - 团队 / 个人 / 领域包各自一层，按优先级叠加在主字典之上
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional, Set
+
+from .utils import get_project_root
+from .console import debug, warn
+from .term_matcher import TermMatcher
+
+# 主字典所在层的名字；其他层（团队、个人、领域包）的规则会带上 "layer" 字段
+BASE_LAYER = "base"
+
+
+class DictLayersMixin:
+    """
+    DictionaryManager 的字典分层部分
+
+    每层一个独立编译的自动机，同一变体由优先级最高的层生效，其余层按模式编号屏蔽。
+    依赖 DictionaryManager 的规则表（_add_to_tables / _remove_from_tables / _effective_rule）、
+    编译产物读取（_read_compiled）以及 _lock / stats。
+    """
+
+    def _init_layers(self, dict_path: Optional[str], base_priority: int) -> None:
+        """只有主字典一层，并生成第一份匹配源快照"""
+        self._layers: Dict[str, Dict] = {
+            BASE_LAYER: {"name": BASE_LAYER, "path": dict_path, "priority": base_priority,
+                         "seq": 0, "enabled": True, "compiled": None}
+        }
+        self._shadowed: Dict[str, Set[str]] = {BASE_LAYER: set()}  # 层名 → 被更高优先级层覆盖的变体
+        self._refresh_sources()
+
+    def _refresh_sources(self) -> None:
+        """
+        整体替换匹配源快照：按层优先级从高到低排列，主字典层包含主自动机和增量自动机
+
+        编辑线程只替换引用、不原地修改，转录线程拿到的始终是一致的快照。
+        """
+        sources = []
+        shadows = []  # 每个匹配源：(不含层覆盖的屏蔽编号, 被更高优先级层覆盖的变体)，纠错档案据此重新判定覆盖
+        for layer in self._active_layers():
+            shadowed = frozenset(self._shadowed.get(layer["name"], ()))
+            if layer["name"] == BASE_LAYER:
+                sources.append((self.matcher, self._pattern_rules,
+                                self._removed_ids | self._mask_ids(self.matcher, shadowed)))
+                shadows.append((self._removed_ids, shadowed))
+                sources.append((self._edit_matcher, self._edit_rules,
+                                self._mask_ids(self._edit_matcher, shadowed)))
+                shadows.append((frozenset(), shadowed))
+            else:
+                compiled = layer["compiled"]
+                sources.append((compiled["matcher"], compiled["pattern_rules"],
+                                self._mask_ids(compiled["matcher"], shadowed)))
+                shadows.append((frozenset(), shadowed))
+        # 两者一起替换，档案计算拿到的匹配源与覆盖信息总是同一个快照
+        self._source_shadows = (tuple(sources), tuple(shadows))
+        self._sources = self._source_shadows[0]
+
+    @staticmethod
+    def _mask_ids(matcher: TermMatcher, keys: Iterable[str]) -> frozenset:
+        """把被覆盖的变体换算成该自动机里的模式编号"""
+        ids = (matcher.pattern_id(key) for key in keys)
+        return frozenset(pattern_id for pattern_id in ids if pattern_id >= 0)
+
+    def add_layer(self, name: str, path: str, priority: int = 10, enabled: bool = True) -> bool:
+        """
+        注册一个字典层（如团队词库、个人词库、医疗/法律领域包）
+
+        同一错误变体出现在多层时，优先级数值大的层生效；优先级相同时先注册的层生效。
+        每层单独编译并缓存产物，未启用的层不会读取文件。
+
+        Args:
+            name: 层名（不能与已有层重名）
+            path: 字典文件路径，相对路径以项目根目录为基准
+            priority: 优先级，主字典层默认为 0
+            enabled: 是否立即启用（启用时才加载）
+
+        Returns:
+            注册（以及需要时的加载）是否成功
+        """
+        with self._lock:
+            if name in self._layers:
+                warn(f"❌ 字典层已存在: {name}")
+                return False
+            if not os.path.isabs(path):
+                path = os.path.join(get_project_root(), path)
+            self._layers[name] = {
+                "name": name,
+                "path": path,
+                "priority": priority,
+                "seq": max(layer["seq"] for layer in self._layers.values()) + 1,
+                "enabled": False,
+                "compiled": None
+            }
+            self._shadowed[name] = set()
+            return self.enable_layer(name) if enabled else True
+
+    def remove_layer(self, name: str) -> bool:
+        """注销一个字典层（主字典层不能注销）"""
+        with self._lock:
+            if name == BASE_LAYER or name not in self._layers:
+                return False
+            self.disable_layer(name)
+            del self._layers[name]
+            del self._shadowed[name]
+            return True
+
+    def enable_layer(self, name: str) -> bool:
+        """
+        启用字典层：首次启用时才加载（优先使用预编译产物），之后只切换开关
+
+        只有本层的规则参与合并：归并进规则表，并按本层的变体重新判定归属，
+        其他层的自动机不需要重建。
+        """
+        with self._lock:
+            layer = self._layers.get(name)
+            if layer is None:
+                warn(f"❌ 字典层不存在: {name}")
+                return False
+            if layer["enabled"]:
+                return True
+
+            if layer["compiled"] is None:
+                if not os.path.exists(layer["path"]):
+                    warn(f"❌ 字典层文件不存在: {layer['path']}")
+                    return False
+                try:
+                    compiled = self._read_compiled(layer["path"])
+                except Exception as e:
+                    warn(f"❌ 加载字典层失败: {name} ({e})")
+                    return False
+                if compiled.get("packed"):
+                    # 紧凑字典的规则按需解码，解码时带上层名
+                    compiled["replacements"] = compiled["pattern_rules"] = compiled["pattern_rules"].with_layer(name)
+                else:
+                    for rule in compiled["replacements"]:
+                        rule["layer"] = name
+                layer["compiled"] = compiled
+
+            layer["enabled"] = True
+            self._add_to_tables(layer["compiled"]["replacements"])
+            for key in layer["compiled"]["matcher"].keys():
+                self._update_owner(key)
+            self._refresh_sources()
+            self.stats["total_rules"] = len(self.replacements)
+            debug(f"✓ 已启用字典层: {name}（{len(layer['compiled']['pattern_rules'])} 个变体）")
+            return True
+
+    def disable_layer(self, name: str) -> bool:
+        """停用字典层（编译结果保留在内存中，再次启用时无需重新加载）"""
+        with self._lock:
+            layer = self._layers.get(name)
+            if name == BASE_LAYER or layer is None or not layer["enabled"]:
+                return False
+
+            layer["enabled"] = False
+            self._remove_from_tables([rule for rule in self._rules_list() if rule.get("layer") == name])
+            self._shadowed[name] = set()
+            for key in layer["compiled"]["matcher"].keys():
+                self._update_owner(key)
+            self._refresh_sources()
+            self.stats["total_rules"] = len(self.replacements)
+            debug(f"✓ 已停用字典层: {name}")
+            return True
+
+    def list_layers(self) -> List[Dict]:
+        """列出全部字典层（按生效优先级排序）"""
+        layers = sorted(self._layers.values(), key=lambda layer: (-layer["priority"], layer["seq"]))
+        return [
+            {
+                "name": layer["name"],
+                "path": layer["path"] if layer["name"] != BASE_LAYER else self._dict_file,
+                "priority": layer["priority"],
+                "enabled": layer["enabled"],
+                "loaded": layer["name"] == BASE_LAYER or layer["compiled"] is not None,
+                "shadowed": len(self._shadowed[layer["name"]])
+            }
+            for layer in layers
+        ]
+
+    def _active_layers(self) -> List[Dict]:
+        """已启用的层，按优先级从高到低（同优先级先注册的在前）"""
+        return sorted(
+            (layer for layer in self._layers.values() if layer["enabled"]),
+            key=lambda layer: (-layer["priority"], layer["seq"])
+        )
+
+    def _layer_has(self, layer: Dict, key: str) -> bool:
+        """某一层当前是否定义了该变体"""
+        if layer["name"] == BASE_LAYER:
+            return self._effective_rule(key) is not None
+        return key in layer["compiled"]["matcher"]
+
+    def _update_owner(self, key: str) -> None:
+        """重新判定变体归属：定义了该变体的最高优先级层生效，其余层屏蔽它"""
+        owner_found = False
+        for layer in self._active_layers():
+            shadowed = self._shadowed[layer["name"]]
+            if not self._layer_has(layer, key):
+                shadowed.discard(key)
+            elif owner_found:
+                shadowed.add(key)
+            else:
+                shadowed.discard(key)
+                owner_found = True
@@ -2,50 +2,267 @@
 字典管理器 - 管理中文社区开发者术语字典和文本修正
 """
 
+import hashlib
+import heapq
 import json
 import os
 import re
-from typing import Dict, List, Optional, Set
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from .utils import get_project_root
 from .console import debug, warn
+from .term_matcher import TermMatcher, fold_text, is_ascii_alnum
+from .packed_dict import (PACKED_SUFFIX, PackedRules, open_packed_dict, packed_path, source_path,
+                          write_packed_dict)
+from .phonetic_index import PYPINYIN_AVAILABLE, PhoneticIndex
+from .dict_matching import apply_corrections, find_matches, map_offsets
+from .dict_bulk import correct_jsonl, correct_texts
+from .dict_cache import COMPILED_VERSION, load_compiled, save_compiled
+from .dict_layers import BASE_LAYER, DictLayersMixin
+from .dict_tenants import DictTenantsMixin
+from .dict_delta import (
+    MERGING_SUFFIX,
+    append_delta,
+    delta_path,
+    merge_deltas as merge_delta_log,
+    read_deltas,
+    read_pending_deltas,
+)
 
+# 增量编辑的规则数超过该值时，把增量规则并回主自动机（摊销一次全量构建）
+EDIT_FOLD_THRESHOLD = 256
+# 增量日志超过该大小时自动合并回主字典文件
+DELTA_MERGE_BYTES = 64 * 1024
 
-class DictionaryManager:
+# 默认纠错档案：所有分类都生效
+ALL_PROFILE = "all"
+
+# 最近修正记录的环形缓冲大小
+CORRECTIONS_HISTORY = 1000
+
+
+class DictionaryManager(DictLayersMixin, DictTenantsMixin):
     """管理术语字典"""
 
-    def __init__(self, dict_path: Optional[str] = None):
+    def __init__(self, dict_path: Optional[str] = None, phonetic: bool = False,
+                 phonetic_min_confidence: float = 0.85, phonetic_autocorrect: bool = False,
+                 layers: Optional[List[Dict]] = None,
+                 base_priority: int = 0, profiles: Optional[Dict[str, Dict]] = None,
+                 profile: str = ALL_PROFILE, telemetry: bool = True,
+                 history_size: int = CORRECTIONS_HISTORY):
         """
         初始化字典管理器
 
         Args:
             dict_path: 字典文件路径，如果为None则使用默认字典，支持后期其他行业如律师、医生专用术语改造 todo
+            phonetic: 是否启用拼音模糊匹配（默认关闭，需要安装 pypinyin），启用后只标记候选、不改写文本
+            phonetic_min_confidence: 拼音模糊匹配的置信度阈值
+            phonetic_autocorrect: 启用拼音模糊匹配时，是否让 fix_text 直接改写读音接近术语的片段（默认关闭）
+            layers: 叠加在主字典之上的字典层，每项为 add_layer 的参数，
+                如 {"name": "team", "path": "dictionaries/team_terms.json", "priority": 10}
+            base_priority: 主字典所在层的优先级
+            profiles: 纠错档案定义，档案名 → {"include": [分类...]} 或 {"exclude": [分类...]}，
+                如 {"student": {"exclude": ["work_terms"]}}
+            profile: 默认使用的纠错档案（"all" 表示全部分类）
+            telemetry: 是否统计每条规则的命中、替换次数和扫描耗时
+            history_size: 最近修正记录的保留条数（环形缓冲，长期运行内存不增长）
         """
         self.dict_path = dict_path
-        self.replacements = self._load_dict()
+        self.replacements: List[Dict] = []
+        self.matcher = TermMatcher()
+        self._pattern_rules: List[Dict] = []
+        self._categories: Dict[str, int] = {}
+        self._terms: List[str] = []
         self.stats = {
-            "total_rules": len(self.replacements),
-            "replacements_made": 0
+            "total_rules": 0,
+            "replacements_made": 0,
+            "scans": 0,
+            "scan_time_ms": 0.0
         }
-        self.corrections = []  # 记录每次修正的详情
+        self._history_size = history_size
+        self.corrections: deque = deque(maxlen=history_size)  # 最近的修正详情（环形缓冲）
+
+        # 规则级统计：(变体, 正确术语) → [分类, 命中, 替换, 同文跳过, 分摊的扫描耗时(ms)]
+        self._telemetry = telemetry
+        self._rule_stats: Dict[Tuple[str, str], List] = {}
+
+        # 增量编辑：主自动机只读，删除的变体用编号屏蔽，新增/修改的变体放进一个小自动机
+        self._lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self._removed_ids: frozenset = frozenset()
+        self._edits: Dict[str, Dict] = {}
+        self._edit_matcher = TermMatcher()
+        self._edit_rules: List[Dict] = []
+        self._term_counts: Optional[Counter] = None
+        self._term_index_cache: Optional[Tuple] = None
+
+        # 字典分层：每层一个独立编译的自动机，同一变体由优先级最高的层生效，其余层按编号屏蔽
+        self._init_layers(dict_path, base_priority)
+
+        # 纠错档案：按分类屏蔽模式编号，共用同一份编译好的自动机；每个档案的匹配源按快照缓存
+        self._profiles: Dict[str, Tuple[Optional[frozenset], frozenset]] = {ALL_PROFILE: (None, frozenset())}
+        self._profile = ALL_PROFILE
+        self._profile_cache: Dict[str, Tuple] = {}  # 档案名 → (匹配源快照, 屏蔽后的匹配源, 屏蔽的分类)
+        self._category_ids_cache: Dict[int, Tuple] = {}  # id(模式编号→规则) → (规则列表, 分类 → 模式编号)
+        self._profile_terms_cache: Dict[str, Tuple] = {}  # 档案名 → (规则表, 提示词)
+        for name, spec in (profiles or {}).items():
+            self.define_profile(name, **spec)
+
+        # 租户覆盖层：多个用户共用主字典，每个用户只保存自己的少量规则，查找时叠加在最前面
+        self._init_tenants()
+
+        # 文件监听：记录主字典与增量日志的状态，只应用变化的部分
+        self._dict_file: Optional[str] = None
+        self._dict_hash: Optional[str] = None
+        self._dict_stat: Optional[Tuple] = None
+        # 解析失败的主字典内容哈希：内容不变时不再重复解析和告警，文件再次变化后重试
+        self._dict_failed_hash: Optional[str] = None
+        self._packed = False  # 主字典是否为内存映射的紧凑格式（只读，编辑只走增量日志）
+        self._delta_state: Tuple[Optional[int], int] = (None, 0)  # (inode, 已读偏移)
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
 
-    def _load_dict(self) -> List[Dict]:
-        """加载字典，优先使用自定义路径，否则使用默认路径"""
+        self._load_dict()
+        self.stats["total_rules"] = len(self.replacements)
+
+        for layer in layers or []:
+            self.add_layer(**layer)
+        self.set_profile(profile)
+
+        # 拼音模糊匹配：索引在首次使用时构建，术语变化后自动重建
+        self._phonetic_enabled = False
+        self._phonetic_autocorrect = False
+        self._phonetic_min_confidence = phonetic_min_confidence
+        self._phonetic_cache: Optional[Tuple] = None
+        if phonetic:
+            self.enable_phonetic(autocorrect=phonetic_autocorrect)
+
+    def _load_dict(self) -> None:
+        """
+        加载字典，优先使用自定义路径，否则使用默认路径
+
+        用户缓存目录里保存一份预编译产物（以 JSON 内容哈希为键），
+        哈希一致时直接反序列化产物，跳过 JSON 解析、正则转义、排序和自动机构建。
+        """
         # 确定字典文件路径
         dict_file = self._get_dict_file_path()
 
         if not dict_file or not os.path.exists(dict_file):
             warn(f"❌ 字典文件不存在: {dict_file}")
-            return []
+            return
 
         try:
-            with open(dict_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                debug(f"✓ 已加载字典: {dict_file}")
-                return self._parse_dict(data)
+            compiled = self._read_compiled(dict_file)
+            self._apply_compiled(compiled)
+            self._packed = bool(compiled.get("packed"))
+            self._dict_file = dict_file
+            self._dict_hash = compiled["hash"]
+            self._dict_stat = self._file_stat(dict_file)
         except Exception as e:
             warn(f"❌ 加载字典失败: {e}")
-            return []
+            return
+
+        # 回放尚未合并进主字典的增量编辑
+        try:
+            path = delta_path(dict_file)
+            merging_ops, _ = read_deltas(path + MERGING_SUFFIX)
+            ops, offset = read_deltas(path)
+            for op in merging_ops + ops:
+                self._apply_op(op)
+            if merging_ops or ops:
+                debug(f"✓ 已回放 {len(merging_ops) + len(ops)} 条字典增量")
+            self._delta_state = (self._file_inode(path), offset)
+        except Exception as e:
+            warn(f"❌ 读取字典增量失败: {e}")
+
+    def _read_compiled(self, dict_file: str) -> Dict:
+        """
+        读取字典文件对应的编译结果：哈希一致时直接用预编译产物，否则重新构建并缓存
+
+        紧凑字典（*.cwdict）直接内存映射，规则和术语都在映射的数组上按需解码。
+        同目录下有同名 JSON 字典时比对内容哈希：JSON 合并过增量日志而紧凑字典没有跟着重新生成，
+        日志里的编辑已经不在了，继续用旧文件会丢掉这些编辑，所以先按 JSON 重新生成。
+        """
+        if dict_file.endswith(PACKED_SUFFIX):
+            packed = open_packed_dict(dict_file, self._make_rule)
+            source = source_path(dict_file)
+            if os.path.exists(source):
+                with open(source, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                if digest != packed.source_hash:
+                    warn(f"⚠️  紧凑字典与 {source} 不一致，按 JSON 重新生成: {dict_file}")
+                    self._write_packed_from(source, dict_file)
+                    packed = open_packed_dict(dict_file, self._make_rule)
+            debug(f"✓ 已映射紧凑字典: {dict_file}")
+            return {
+                "version": COMPILED_VERSION,
+                "hash": packed.source_hash,
+                "replacements": packed.rules,
+                "matcher": packed.matcher,
+                "pattern_rules": packed.rules,
+                "categories": dict(packed.categories),
+                "terms": packed.terms,
+                "packed": True,
+            }
+
+        with open(dict_file, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+
+        compiled = load_compiled(dict_file, digest)
+        if compiled is None:
+            data = json.loads(raw.decode('utf-8'))
+            compiled = self._compile(data, digest)
+            save_compiled(dict_file, compiled)
+            debug(f"✓ 已加载字典: {dict_file}")
+        else:
+            debug(f"✓ 已加载预编译字典: {dict_file}")
+        return compiled
+
+    def _write_packed_from(self, json_file: str, output: str) -> None:
+        """按 JSON 字典文件的当前内容生成紧凑字典（不经过内存中的规则，与其他进程的编辑无关）"""
+        compiled = self._read_compiled(json_file)
+        write_packed_dict(output, compiled["matcher"], compiled["pattern_rules"], compiled["hash"])
+        debug(f"💾 已重新生成紧凑字典: {output}")
+
+    def _compile(self, data: Dict, digest: str) -> Dict:
+        """从字典 JSON 构建全部运行期结构（规则表、自动机、分类表、术语表）"""
+        replacements = self._parse_dict(data)
+        matcher, pattern_rules = self._build_matcher(replacements)
+
+        categories: Dict[str, int] = {}
+        for rule in replacements:
+            cat = rule.get("category", "unknown")
+            categories[cat] = categories.get(cat, 0) + 1
+
+        terms = sorted({rule['correct'] for rule in replacements if rule.get('correct')})
+
+        return {
+            "version": COMPILED_VERSION,
+            "hash": digest,
+            "replacements": replacements,
+            "matcher": matcher,
+            "pattern_rules": pattern_rules,
+            "categories": categories,
+            "terms": terms,
+        }
+
+    def _apply_compiled(self, compiled: Dict) -> None:
+        """把预编译产物装载为当前字典状态"""
+        self.replacements = compiled["replacements"]
+        self.matcher = compiled["matcher"]
+        self._pattern_rules = compiled["pattern_rules"]
+        self._categories = compiled["categories"]
+        self._terms = compiled["terms"]
+        self._removed_ids = frozenset()
+        self._edits = {}
+        self._edit_matcher = TermMatcher()
+        self._edit_rules = []
+        self._term_counts = None
+        self._refresh_sources()
 
     def _get_dict_file_path(self) -> Optional[str]:
         """获取字典文件路径"""
@@ -58,6 +275,34 @@ class DictionaryManager:
         default_path = os.path.join(root, 'dictionaries', 'programmer_terms.json')
         return default_path if os.path.exists(default_path) else None
 
+    @staticmethod
+    def _make_rule(wrong_text: str, correct_text: str, category_name: str) -> Dict:
+        """根据一个错误变体构建一条替换规则"""
+        # 构建正则表达式：短词（≤3字符）添加边界，防止子串误匹配
+        # 例如：避免 "Cat" 被误纠正为 "TomCat"
+        # 长词不用边界，保留原有的灵活性，能匹配格式不固定的内容（如 "Spring Boat"）
+        escaped_text = re.escape(wrong_text)
+
+        # 判断是否为短词（仅包含字母/数字，长度≤3）
+        boundary = bool(re.match(r'^[a-zA-Z0-9]+$', wrong_text)) and len(wrong_text) <= 3
+        if boundary:
+            # 使用前后瞻断言，支持中文环境
+            # (?<![a-zA-Z0-9]) 确保前面不是字母或数字
+            # (?![a-zA-Z0-9]) 确保后面不是字母或数字
+            # 这样可以匹配：中文TPR、TPR，、TPR。等场景
+            regex_pattern = r'(?<![a-zA-Z0-9])' + escaped_text + r'(?![a-zA-Z0-9])'
+        else:
+            regex_pattern = escaped_text
+
+        return {
+            'wrong': regex_pattern,
+            'variant': wrong_text,  # 原始错误文本，供自动机匹配
+            'boundary': boundary,  # 是否需要短词边界判断
+            'correct': correct_text,
+            'category': category_name,
+            'wrong_len': len(wrong_text)  # 记录原始长度，用于排序
+        }
+
     def _parse_dict(self, data: List[Dict]) -> List[Dict]:
         """解析字典数据"""
         rules = []
@@ -68,28 +313,7 @@ class DictionaryManager:
                 for variant in term_data.get("variants", []):
                     wrong_text = variant.get("wrong", "")
                     correct_text = term_data.get("correct", "")
-
-                    # 构建正则表达式：短词（≤3字符）添加边界，防止子串误匹配
-                    # 例如：避免 "Cat" 被误纠正为 "TomCat"
-                    # 长词不用边界，保留原有的灵活性，能匹配格式不固定的内容（如 "Spring Boat"）
-                    escaped_text = re.escape(wrong_text)
-
-                    # 判断是否为短词（仅包含字母/数字，长度≤3）
-                    if re.match(r'^[a-zA-Z0-9]+$', wrong_text) and len(wrong_text) <= 3:
-                        # 使用前后瞻断言，支持中文环境
-                        # (?<![a-zA-Z0-9]) 确保前面不是字母或数字
-                        # (?![a-zA-Z0-9]) 确保后面不是字母或数字
-                        # 这样可以匹配：中文TPR、TPR，、TPR。等场景
-                        regex_pattern = r'(?<![a-zA-Z0-9])' + escaped_text + r'(?![a-zA-Z0-9])'
-                    else:
-                        regex_pattern = escaped_text
-
-                    rules.append({
-                        'wrong': regex_pattern,
-                        'correct': correct_text,
-                        'category': category_name,
-                        'wrong_len': len(wrong_text)  # 记录原始长度，用于排序
-                    })
+                    rules.append(self._make_rule(wrong_text, correct_text, category_name))
 
         # 按错误文本长度降序排序，先匹配长的，避免短词覆盖长词
         # 例如：先匹配 "code review" (11字符) 再匹配 "Code" (4字符)
@@ -98,156 +322,1069 @@ class DictionaryManager:
 
         return rules
 
-    def fix_text(self, text: str, accumulate: bool = True) -> str:
+    def _build_matcher(self, rules: List[Dict]) -> Tuple[TermMatcher, List[Dict]]:
+        """
+        把所有错误变体编译进一个大小写折叠的 Aho-Corasick 自动机
+
+        折叠后相同的变体共享一个模式，规则列表已按长度降序排好，
+        所以每个模式只保留最先出现的那条规则（与逐条正则时“先到先得”一致）。
+
+        Returns:
+            (自动机, 模式编号 -> 规则)
+        """
+        matcher = TermMatcher()
+        pattern_rules: List[Dict] = []
+
+        for rule in rules:
+            variant = rule.get("variant", "")
+            if not variant:
+                continue
+            pattern_id = matcher.add(variant)
+            if pattern_id == len(pattern_rules):
+                pattern_rules.append(rule)
+
+        matcher.build()
+        return matcher, pattern_rules
+
+    def export_packed(self, output: Optional[str] = None) -> str:
+        """
+        把主字典层当前生效的规则导出为可内存映射的紧凑字典（*.cwdict）
+
+        之后用 DictionaryManager(dict_path="xxx.cwdict") 打开，加载只需映射文件，
+        同一台机器上的多个进程共享同一份物理内存。
+
+        Args:
+            output: 输出路径，默认与主字典同名、后缀为 .cwdict
+
+        Returns:
+            输出路径
+        """
+        with self._lock:
+            if not self._dict_file:
+                raise ValueError("未加载字典文件，无法导出紧凑字典")
+            if self._edits or self._removed_ids or not isinstance(self.matcher, TermMatcher):
+                base_rules = [rule for rule in self.replacements if rule.get("layer", BASE_LAYER) == BASE_LAYER]
+                matcher, pattern_rules = self._build_matcher(base_rules)
+            else:
+                matcher, pattern_rules = self.matcher, self._pattern_rules
+            output = output or packed_path(self._dict_file)
+            write_packed_dict(output, matcher, pattern_rules, self._dict_hash)
+            debug(f"💾 已导出紧凑字典: {output}（{len(pattern_rules)} 个变体）")
+            return output
+
+    def fix_text(self, text: str, accumulate: bool = True, profile: Optional[str] = None,
+                 tenant: Optional[str] = None) -> str:
         """
         修正文本中的开发者术语，CodeWhisper术语纠正的核心算法
 
+        所有错误变体预先编译为一个 Aho-Corasick 自动机，文本只扫描一遍即可找到全部命中，
+        再按长词优先挑出互不重叠的匹配，最后一次性拼接出修正后的文本。
+
         Args:
             text: 经录音后待纠正的文本
             accumulate: 是否累积修正记录。
                 True  → 将本次修正追加到已有记录之后，用于连续多次调用时保留完整的修正历史。
                 False → 调用前清空历史记录，仅保留本次修正结果，适合单次处理或独立批次分析。
+            profile: 本次使用的纠错档案，为 None 时使用 set_profile() 设定的默认档案
+            tenant: 租户（用户）标识，该租户的私有规则优先于共享字典生效
 
         Returns:
             修正后的文本
         """
+        text, corrections = self.correct_text(text, profile, tenant)
+
         # 如果手动设置追加记录为false，则清空之前的历史记录
-        if not accumulate:
-            self.corrections = []  # 清空上次的修正记录
-
-        replacement_count = 0
-        replaced_positions = set()  # 记录已替换的文本位置，防止重复替换
-
-        for item in self.replacements:
-            pattern = item["wrong"]
-            replacement = item["correct"]
-            category = item.get("category", "unknown") # unknown兜底，防止没有这个类
-
-            # 使用正则表达式查找所有匹配，case-insensitive
-            matches = list(re.finditer(pattern, text, flags=re.IGNORECASE))
-
-            if matches:
-                # 记录需要替换的位置和内容
-                replacements_to_make = []
-
-                for match in matches:
-                    start, end = match.span()
-
-                    # 检查这个位置是否已经被替换过
-                    position_occupied = any(
-                        (start >= rstart and start < rend) or
-                        (end > rstart and end <= rend) or
-                        (start <= rstart and end >= rend)
-                        for rstart, rend in replaced_positions
-                    )
-
-                    if not position_occupied:
-                        replacements_to_make.append((start, end, match.group()))
-
-                if replacements_to_make:
-                    # 检查第一个匹配，判断是否真的需要替换
-                    first_match_text = replacements_to_make[0][2]
-
-                    # 只有匹配的文本和目标替换文本不同时，才进行替换
-                    if first_match_text != replacement:
-                        # 从后往前替换，避免位置偏移
-                        for start, end, matched_text in reversed(replacements_to_make):
-                            text = text[:start] + replacement + text[end:]
-                            replaced_positions.add((start, start + len(replacement)))
-
-                            self.corrections.append({
-                                "wrong": matched_text,
-                                "correct": replacement,
-                                "category": category
-                            })
-                            replacement_count += 1
-
-                        # 显示第一个匹配的原始文本（真实捕获的内容）
-                        debug(f" 🔧替换: '{first_match_text}' → '{replacement}' ({category})")
-                    # else: 如果一样，跳过替换，不打印日志
-
-        self.stats["replacements_made"] += replacement_count
+        if accumulate:
+            self.corrections.extend(corrections)
+        else:
+            # 整体替换，不修改其他线程可能正在读取的旧记录
+            self.corrections = deque(corrections, maxlen=self._history_size)
         return text
 
-    def get_stats(self) -> Dict:
-        """获取统计信息"""
-        return self.stats
+    def correct_text(self, text: str, profile: Optional[str] = None,
+                     tenant: Optional[str] = None) -> Tuple[str, List[Dict]]:
+        """
+        修正文本并返回本次的修正记录，不改动 self.corrections（可被多个线程同时调用）
+
+        只读取当前规则快照，共享状态中只有 replacements_made 计数会在锁内累加。
+
+        Args:
+            text: 待修正文本
+            profile: 本次使用的纠错档案，为 None 时使用默认档案（每次请求可以不同）
+            tenant: 租户（用户）标识，为 None 或没有私有规则时只使用共享字典
+
+        Returns:
+            (修正后的文本, 修正记录列表)
+        """
+        sources, masked_categories = self._profile_sources(profile, tenant)
+        telemetry = {} if self._telemetry else None
+        started = time.perf_counter()
+        text, corrections = apply_corrections(text, sources, self._phonetic_config(masked_categories), telemetry)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        for correction in corrections:
+            debug(f" 🔧替换: '{correction['wrong']}' → '{correction['correct']}' ({correction['category']})")
+
+        if corrections or telemetry is not None:
+            with self._stats_lock:
+                self.stats["replacements_made"] += len(corrections)
+                if telemetry is not None:
+                    self._record_telemetry(telemetry, elapsed_ms)
+        return text, corrections
+
+    def _record_telemetry(self, telemetry: Dict, elapsed_ms: float) -> None:
+        """把一次调用的规则计数并入累计统计（调用方持有 _stats_lock）"""
+        self.stats["scans"] += 1
+        self.stats["scan_time_ms"] += elapsed_ms
+        if not telemetry:
+            return
+
+        # 一遍扫描同时匹配所有规则，单条规则的耗时无法单独测量：按命中次数分摊本次扫描耗时
+        total_hits = sum(entry[1] for entry in telemetry.values()) or 1
+        for rule, matches, replaced, same_text in telemetry.values():
+            key = (rule.get("variant", ""), rule.get("correct", ""))
+            counters = self._rule_stats.get(key)
+            if counters is None:
+                counters = self._rule_stats[key] = [rule.get("category", "unknown"), 0, 0, 0, 0.0]
+            counters[1] += matches
+            counters[2] += replaced
+            counters[3] += same_text
+            counters[4] += elapsed_ms * matches / total_hits
+
+    def fix_segments(self, segments: List[Dict], profile: Optional[str] = None,
+                     tenant: Optional[str] = None) -> Tuple[str, List[Dict]]:
+        """
+        一次性修正所有分段：拼接后只扫描一遍，再按下标映射把修正结果写回各分段
+
+        跨分段的术语（如 "post gres" | " sql"）也能命中，替换结果归属于它开始的分段。
+        每个分段会写回修正后的 text，以及在拼接文本中的位置 char_start / char_end，
+        时间戳（start / end）保持不变，与修正后的术语对齐。
+
+        Args:
+            segments: Whisper 的分段列表（原地修改）
+            profile: 使用的纠错档案，为 None 时使用默认档案
+            tenant: 租户（用户）标识
+
+        Returns:
+            (修正后的拼接文本, 修正记录列表)
+        """
+        texts = [segment.get("text", "") for segment in segments]
+        joined = "".join(texts)
+        corrected, corrections = self.correct_text(joined, profile, tenant)
+
+        boundaries = [0]
+        for piece in texts:
+            boundaries.append(boundaries[-1] + len(piece))
+        mapped = map_offsets(corrections, boundaries) if corrections else boundaries
+
+        for i, segment in enumerate(segments):
+            segment["text"] = corrected[mapped[i]:mapped[i + 1]]
+            segment["char_start"] = mapped[i]
+            segment["char_end"] = mapped[i + 1]
+        return corrected, corrections
+
+    def enable_phonetic(self, min_confidence: Optional[float] = None, autocorrect: bool = False) -> bool:
+        """
+        启用拼音模糊匹配
+
+        拼音匹配不看上下文，“期间”“其间”这类读音相同的正常用词也会命中，所以默认只标记候选
+        （转录结果的 phonetic_candidates，或直接调用 find_phonetic_candidates），由人确认后再加进字典；
+        autocorrect=True 时 fix_text 才会直接改写这些片段。
+
+        Args:
+            min_confidence: 置信度阈值（0~1），None 表示沿用当前值
+            autocorrect: 是否自动改写读音接近术语的片段
+
+        Returns:
+            是否启用成功（未安装 pypinyin 时返回 False）
+        """
+        if not PYPINYIN_AVAILABLE:
+            warn("⚠️  pypinyin 库未安装，无法启用拼音模糊匹配")
+            warn("📦 请运行: pip install pypinyin")
+            return False
+        if min_confidence is not None:
+            self._phonetic_min_confidence = min_confidence
+        self._phonetic_enabled = True
+        self._phonetic_autocorrect = autocorrect
+        return True
+
+    def disable_phonetic(self) -> None:
+        """关闭拼音模糊匹配"""
+        self._phonetic_enabled = False
+        self._phonetic_autocorrect = False
+
+    @property
+    def phonetic_enabled(self) -> bool:
+        """是否启用了拼音模糊匹配（标记候选或自动改写）"""
+        return self._phonetic_enabled
+
+    @property
+    def phonetic_autocorrect(self) -> bool:
+        """拼音模糊匹配是否会直接改写文本"""
+        return self._phonetic_enabled and self._phonetic_autocorrect
+
+    def _phonetic_index(self) -> PhoneticIndex:
+        """拼音索引，以术语表对象为缓存键，术语变化后重建"""
+        terms = self._terms
+        cached = self._phonetic_cache
+        if cached is not None and cached[0] is terms:
+            return cached[1]
+
+        term_categories: Dict[str, str] = {}
+        for rule in self.replacements:
+            term_categories.setdefault(rule["correct"], rule.get("category", "unknown"))
+        index = PhoneticIndex((term, term_categories.get(term, "unknown")) for term in terms)
+        debug(f"✓ 拼音索引已构建: {len(index)} 个中文术语")
+
+        self._phonetic_cache = (terms, index)
+        return index
+
+    def _phonetic_config(self, masked_categories: frozenset = frozenset()
+                         ) -> Optional[Tuple[PhoneticIndex, float, frozenset]]:
+        """修正文本时的拼音匹配配置，只有开启自动改写时才返回"""
+        if not self.phonetic_autocorrect:
+            return None
+        return self._phonetic_index(), self._phonetic_min_confidence, masked_categories
+
+    def find_phonetic_candidates(self, text: str, min_confidence: Optional[float] = None) -> List[Dict]:
+        """
+        标记文本中与术语读音接近、但字典尚未收录的片段（不修改文本，可用于发现新变体）
+
+        这是拼音模糊匹配的默认用法：精确规则已经命中的位置会被跳过；无论是否启用拼音模糊匹配都可以调用。
+
+        Returns:
+            [{"start", "end", "wrong", "correct", "category", "confidence"}, ...]
+        """
+        if not PYPINYIN_AVAILABLE or not text:
+            return []
+        if min_confidence is None:
+            min_confidence = self._phonetic_min_confidence
+
+        occupied = bytearray(len(text))
+        for start, end, _ in find_matches(text, self._sources):
+            occupied[start:end] = b"\x01" * (end - start)
+
+        return [
+            {
+                "start": start,
+                "end": end,
+                "wrong": text[start:end],
+                "correct": term,
+                "category": category,
+                "confidence": confidence
+            }
+            for start, end, term, category, confidence
+            in self._phonetic_index().find(text, min_confidence, occupied=occupied)
+        ]
+
+    def fix_texts(self, texts: Iterable[str], workers: Optional[int] = None,
+                  chunk_size: int = 64, profile: Optional[str] = None) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        批量修正大量文本（如字典更新后重跑历史转录），结果按输入顺序逐条产出
+
+        不修改 corrections / stats 等共享状态；取一次当前的匹配源快照交给 dict_bulk，
+        批量处理期间的字典编辑不影响本批结果。
+
+        Args:
+            texts: 文本序列，可以是生成器
+            workers: 工作进程数，默认 CPU 核数；<=1 时在当前进程内顺序处理
+            chunk_size: 每个任务包含的文本条数
+            profile: 使用的纠错档案，为 None 时使用默认档案
+
+        Yields:
+            (修正后的文本, 该文本的修正记录)
+        """
+        sources, masked_categories = self._profile_sources(profile)
+        phonetic = self._phonetic_config(masked_categories)
+        return correct_texts(texts, sources, phonetic, workers, chunk_size)
+
+    def fix_jsonl(self, input_path: str, output_path: str, text_field: str = "text",
+                  workers: Optional[int] = None, chunk_size: int = 64, profile: Optional[str] = None) -> int:
+        """
+        流式修正 JSONL 语料（格式见 dict_bulk.correct_jsonl），返回处理的行数
+        """
+        sources, masked_categories = self._profile_sources(profile)
+        phonetic = self._phonetic_config(masked_categories)
+        return correct_jsonl(input_path, output_path, sources, phonetic, text_field, workers, chunk_size)
+
+    def get_stats(self, detail: bool = False) -> Dict:
+        """
+        获取统计信息（返回副本）
+
+        Args:
+            detail: 是否附带每条规则的统计（rules 字段，见 get_rule_stats）
+        """
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["scan_time_ms"] = round(stats["scan_time_ms"], 3)
+        if detail:
+            stats["rules"] = self.get_rule_stats()
+        return stats
+
+    def get_rule_stats(self, sort_by: str = "matches", limit: Optional[int] = None,
+                       include_unused: bool = False) -> List[Dict]:
+        """
+        每条规则的累计统计
+
+        - matches: 自动机命中次数（含因短词边界、与更长的词重叠而未采用的命中）
+        - replacements: 实际替换次数
+        - same_text: 命中文本与正确术语相同而跳过的次数
+        - scan_time_ms: 按命中次数分摊到该规则的扫描耗时（命中越多、越常与其他词重叠的规则越“贵”）
+
+        拼音模糊匹配产生的修正没有变体，variant 为空。
+
+        Args:
+            sort_by: 排序字段（降序）
+            limit: 只返回前若干条
+            include_unused: 是否包含当前生效但从未命中的规则（便于清理无用规则）
+        """
+        with self._stats_lock:
+            rows = {
+                key: {
+                    "variant": key[0],
+                    "correct": key[1],
+                    "category": counters[0],
+                    "matches": counters[1],
+                    "replacements": counters[2],
+                    "same_text": counters[3],
+                    "scan_time_ms": round(counters[4], 4)
+                }
+                for key, counters in self._rule_stats.items()
+            }
+
+        if include_unused:
+            for _, pattern_rules, masked_ids in self._sources:
+                for pattern_id, rule in enumerate(pattern_rules):
+                    key = (rule.get("variant", ""), rule.get("correct", ""))
+                    if pattern_id in masked_ids or key in rows:
+                        continue
+                    rows[key] = {
+                        "variant": key[0],
+                        "correct": key[1],
+                        "category": rule.get("category", "unknown"),
+                        "matches": 0,
+                        "replacements": 0,
+                        "same_text": 0,
+                        "scan_time_ms": 0.0
+                    }
+
+        result = sorted(rows.values(), key=lambda row: row.get(sort_by, 0), reverse=True)
+        return result[:limit] if limit is not None else result
+
+    def reset_stats(self) -> None:
+        """清空修正计数和规则级统计（规则总数保留）"""
+        with self._stats_lock:
+            self.stats.update({"replacements_made": 0, "scans": 0, "scan_time_ms": 0.0})
+            self._rule_stats = {}
+        self.corrections = deque(maxlen=self._history_size)
+
+    def dump_stats(self, path: str) -> None:
+        """
+        把统计信息写入 JSON 文件：总体统计、每条规则的统计（含从未命中的规则）和最近的修正记录
+
+        Args:
+            path: 输出文件路径
+        """
+        report = {
+            "stats": self.get_stats(),
+            "rules": self.get_rule_stats(include_unused=True),
+            "recent_corrections": self.get_corrections()
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        debug(f"💾 字典统计已写入: {path}")
 
     def get_corrections(self) -> List[Dict]:
-        """获取最近一次修正的详细列表"""
-        return self.corrections
+        """获取最近的修正详细列表（最多保留 history_size 条）"""
+        return list(self.corrections)
 
     def list_categories(self):
         """列出所有分类"""
-        categories = {}
-        for rule in self.replacements:
-            cat = rule.get("category", "unknown")
-            if cat not in categories:
-                categories[cat] = 0
-            categories[cat] += 1
-        return categories
+        return dict(self._categories)
 
-    def build_prompt_terms(self) -> str:
+    def build_prompt_terms(self, profile: Optional[str] = None, tenant: Optional[str] = None) -> str:
         """
         从字典动态生成 Whisper 提示词
 
         提取字典中所有术语（correct 字段），生成逗号分隔的提示词字符串。
         这样可以让 Whisper 在转录时优先识别编程术语，无需手动维护术语列表。
 
+        Args:
+            profile: 纠错档案，只取该档案启用的分类中的术语；为 None 时使用默认档案
+            tenant: 租户（用户）标识，该租户私有规则中的术语追加在共享术语之后
+
         Returns:
             逗号分隔的术语字符串，如 "Python, JavaScript, MySQL, Docker, ..."
         """
-        terms = set()
+        profile = self._profile if profile is None else profile
+        prompt_terms = self._shared_prompt_terms(profile)
+        overlay = self.get_tenant(tenant) if tenant is not None else None
+        if not overlay:
+            return prompt_terms
 
-        for rule in self.replacements:
-            correct_term = rule.get('correct', '')
-            if correct_term and correct_term not in terms:
-                terms.add(correct_term)
+        include, exclude = self._get_profile(profile)
+        shared = set(prompt_terms.split(", ")) if prompt_terms else set()
+        extra = sorted({
+            rule["correct"] for rule in overlay.rules()
+            if rule["correct"] not in shared and self._category_enabled(rule["category"], include, exclude)
+        })
+        return ", ".join(([prompt_terms] if prompt_terms else []) + extra)
 
-        # 返回逗号分隔的术语列表
-        # 排序后可以保证稳定性，限制数量避免 prompt 过长
-        prompt_terms = ", ".join(sorted(terms))
+    def _shared_prompt_terms(self, profile: str) -> str:
+        """共享字典在某个纠错档案下的提示词术语"""
+        if profile == ALL_PROFILE:
+            # 术语表在字典编译时已去重并排序，保证稳定性
+            return ", ".join(self._terms)
+
+        # 规则表按写时复制更新，以其身份判断缓存是否过期
+        replacements = self.replacements
+        cached = self._profile_terms_cache.get(profile)
+        if cached is not None and cached[0] is replacements:
+            return cached[1]
+        include, exclude = self._get_profile(profile)
+        terms = sorted({
+            rule["correct"] for rule in replacements
+            if rule.get("correct") and self._category_enabled(rule.get("category", "unknown"), include, exclude)
+        })
+        prompt_terms = ", ".join(terms)
+        self._profile_terms_cache[profile] = (replacements, prompt_terms)
         return prompt_terms
 
+    def _term_index(self) -> Tuple[TermMatcher, List[List[str]], List[Tuple[bool, bool]]]:
+        """
+        术语检测索引：把所有去重后的 correct 术语编进一个大小写折叠的自动机
+
+        术语表按写时复制更新，这里以术语表对象本身作为缓存键，术语变化后自动重建。
+
+        Returns:
+            (自动机, 模式编号 -> 术语列表, 模式编号 -> (首字符需边界, 尾字符需边界))
+        """
+        terms = self._terms
+        cached = self._term_index_cache
+        if cached is not None and cached[0] is terms:
+            return cached[1]
+
+        matcher = TermMatcher()
+        term_groups: List[List[str]] = []
+        edges: List[Tuple[bool, bool]] = []
+        for term in terms:
+            pattern_id = matcher.add(term)
+            if pattern_id == len(term_groups):
+                term_groups.append([term])
+                # 术语首尾是 ASCII 字母/数字时才需要边界，中文首尾可直接贴着其他字符
+                edges.append((is_ascii_alnum(term[0]), is_ascii_alnum(term[-1])))
+            else:
+                term_groups[pattern_id].append(term)
+        matcher.build()
+
+        index = (matcher, term_groups, edges)
+        self._term_index_cache = (terms, index)
+        return index
+
+    def _detect_with_index(self, text: str, index) -> Set[str]:
+        """用给定的术语索引扫描一段文本"""
+        matcher, term_groups, edges = index
+        detected_terms = set()
+        if not text:
+            return detected_terms
+
+        text_len = len(text)
+        for start, end, pattern_id in matcher.iter_matches(fold_text(text)):
+            need_left, need_right = edges[pattern_id]
+            # ASCII 边界：避免 "Go" 命中 "Google"、"Java" 命中 "JavaScript"
+            if need_left and start > 0 and is_ascii_alnum(text[start - 1]):
+                continue
+            if need_right and end < text_len and is_ascii_alnum(text[end]):
+                continue
+            detected_terms.update(term_groups[pattern_id])
+
+        return detected_terms
+
     def detect_terms_in_text(self, text: str) -> Set[str]:
         """
         检测文本中出现的术语（用于学习用户习惯）
 
+        基于术语索引单遍扫描，大小写不敏感，英文术语要求前后不是字母或数字。
+
         Args:
             text: 转录后的文本
 
         Returns:
             检测到的术语集合（correct 形式）
         """
-        detected_terms = set()
+        return self._detect_with_index(text, self._term_index())
 
-        for rule in self.replacements:
-            correct_term = rule.get('correct', '')
-            if not correct_term:
-                continue
+    def detect_terms_in_texts(self, texts: Iterable[str]) -> Counter:
+        """
+        批量检测术语，统计每个术语出现在多少段文本中（用于挖掘历史转录的术语频次）
 
-            # 检查文本中是否包含该术语（大小写不敏感）
-            # 使用简单的包含检查，避免复杂的正则
-            if correct_term.lower() in text.lower():
-                detected_terms.add(correct_term)
+        Args:
+            texts: 文本序列，可以是生成器（逐条消费，不会整体读入内存）
 
-        return detected_terms
+        Returns:
+            术语 → 出现该术语的文本数
+        """
+        index = self._term_index()
+        frequencies: Counter = Counter()
+        for text in texts:
+            frequencies.update(self._detect_with_index(text, index))
+        return frequencies
 
-    def get_detected_terms_from_corrections(self) -> Set[str]:
+    def get_detected_terms_from_corrections(self, corrections: Optional[List[Dict]] = None) -> Set[str]:
         """
         从最近的修正记录中获取被修正的术语
 
         这个方法用于获取用户在本次转录中实际使用的术语。
         当某个术语被修正（wrong → correct），说明用户提到了它。
 
+        Args:
+            corrections: 指定的修正记录（如某次请求自己的记录），为 None 时使用最近的修正记录
+
         Returns:
             被修正的术语集合（correct 形式）
         """
         detected_terms = set()
 
-        for correction in self.corrections:
+        for correction in (self.corrections if corrections is None else corrections):
             correct_term = correction.get('correct', '')
             if correct_term:
                 detected_terms.add(correct_term)
 
         return detected_terms
+
+    # ------------------------------------------------------------------
+    # 增量编辑：在内存中增删改规则，无需重建全部规则
+    # ------------------------------------------------------------------
+
+    def add_rule(self, wrong: str, correct: str, category: str = "other",
+                 description: str = "", persist: bool = False) -> bool:
+        """
+        新增一条变体规则；变体已存在且指向其他术语时视为更新
+
+        Args:
+            wrong: 错误变体
+            correct: 正确术语
+            category: 所属分类，默认 other
+            description: 变体说明（写入增量日志，合并时带入主字典）
+            persist: 是否追加写入增量日志，供其他进程和下次启动使用
+
+        Returns:
+            规则是否发生了变化（完全相同的规则已存在时返回 False）
+        """
+        if not wrong or not correct:
+            raise ValueError("错误变体和正确术语都不能为空")
+
+        with self._lock:
+            changed = self._apply_op({"op": "add", "wrong": wrong, "correct": correct, "category": category})
+            if changed and persist:
+                self._persist_op({
+                    "op": "add",
+                    "wrong": wrong,
+                    "correct": correct,
+                    "category": category,
+                    "description": description
+                })
+            return changed
+
+    def update_rule(self, wrong: str, correct: str, category: Optional[str] = None,
+                    description: str = "", persist: bool = False) -> bool:
+        """
+        修改变体对应的正确术语（category 为 None 时沿用原分类）
+
+        Returns:
+            规则是否发生了变化
+        """
+        with self._lock:
+            if category is None:
+                current = self._effective_rule(fold_text(wrong))
+                category = current.get("category", "other") if current else "other"
+            return self.add_rule(wrong, correct, category, description, persist)
+
+    def remove_rule(self, wrong: str, persist: bool = False) -> bool:
+        """
+        删除一个错误变体（所有分类中折叠后相同的变体都会被删除）
+
+        Returns:
+            是否删除了规则
+        """
+        with self._lock:
+            changed = self._apply_op({"op": "remove", "wrong": wrong})
+            if changed and persist:
+                self._persist_op({"op": "remove", "wrong": wrong})
+            return changed
+
+    def merge_deltas(self) -> int:
+        """把增量日志合并回主字典文件，返回合并条数"""
+        with self._lock:
+            if not self._dict_file or self._packed:
+                # 紧凑字典只读：增量日志与同名 JSON 字典共用，由加载 JSON 的进程合并
+                return 0
+            merged = merge_delta_log(self._dict_file)
+            if merged:
+                # 主字典已包含这些编辑，内存规则无需变化，只记下新文件的哈希
+                with open(self._dict_file, 'rb') as f:
+                    self._dict_hash = hashlib.sha256(f.read()).hexdigest()
+                self._dict_stat = self._file_stat(self._dict_file)
+                # 同名紧凑字典与增量日志共用，日志清空后必须跟着重新生成，否则从紧凑字典打开会丢掉这些编辑
+                output = packed_path(self._dict_file)
+                if os.path.exists(output):
+                    try:
+                        self._write_packed_from(self._dict_file, output)
+                    except Exception as e:
+                        # 生成失败时下次打开紧凑字典会发现哈希不一致并重新生成
+                        warn(f"❌ 重新生成紧凑字典失败: {e}")
+            return merged
+
+    def _persist_op(self, op: Dict) -> None:
+        """追加写入增量日志，日志过大时顺手合并回主字典"""
+        if not self._dict_file:
+            warn("❌ 未加载字典文件，编辑仅在内存中生效")
+            return
+
+        append_delta(self._dict_file, op)
+        try:
+            if os.path.getsize(delta_path(self._dict_file)) >= DELTA_MERGE_BYTES:
+                self.merge_deltas()
+        except Exception as e:
+            warn(f"❌ 合并字典增量失败: {e}")
+
+    def _apply_op(self, op: Dict) -> bool:
+        """在内存中应用一条编辑记录"""
+        key = fold_text(op.get("wrong", ""))
+        if not key:
+            return False
+
+        if op.get("op") == "remove":
+            changed = self._drop_key(key)
+        else:
+            rule = self._make_rule(op["wrong"], op.get("correct", ""), op.get("category") or "other")
+            changed = self._set_rule(key, rule)
+
+        if changed:
+            self._refresh_sources()
+            self.stats["total_rules"] = len(self.replacements)
+        return changed
+
+    def _effective_rule(self, key: str) -> Optional[Dict]:
+        """获取折叠后变体当前生效的规则"""
+        if key in self._edits:
+            return self._edits[key]
+        pattern_id = self.matcher.pattern_id(key)
+        if pattern_id >= 0 and pattern_id not in self._removed_ids:
+            return self._pattern_rules[pattern_id]
+        return None
+
+    def _effective_rules(self) -> Dict[str, Dict]:
+        """当前生效的全部规则：折叠后变体 → 规则"""
+        rules = {
+            self.matcher.key(pattern_id): rule
+            for pattern_id, rule in enumerate(self._pattern_rules)
+            if pattern_id not in self._removed_ids
+        }
+        rules.update(self._edits)
+        return rules
+
+    def _set_rule(self, key: str, rule: Dict) -> bool:
+        """新增或替换一条规则，只重建增量自动机"""
+        current = self._effective_rule(key)
+        if current is not None and (current["correct"], current["category"]) == (rule["correct"], rule["category"]):
+            return False
+        if current is not None:
+            self._drop_key(key)
+
+        self._edits[key] = rule
+        if len(self._edits) > EDIT_FOLD_THRESHOLD:
+            self._add_to_tables([rule])
+            self._fold_edits()
+        else:
+            self._rebuild_edit_matcher()
+            self._add_to_tables([rule])
+        self._update_owner(key)
+        return True
+
+    def _drop_key(self, key: str) -> bool:
+        """删除一个折叠后变体：增量规则直接移除，主自动机中的规则按编号屏蔽"""
+        if key in self._edits:
+            del self._edits[key]
+            self._rebuild_edit_matcher()
+        else:
+            pattern_id = self.matcher.pattern_id(key)
+            if pattern_id < 0 or pattern_id in self._removed_ids:
+                return False
+            self._removed_ids = self._removed_ids | {pattern_id}
+
+        key_len = len(key)
+        dropped = [
+            rule for rule in self._rules_list()
+            if rule["wrong_len"] == key_len and rule.get("layer", BASE_LAYER) == BASE_LAYER
+            and fold_text(rule["variant"]) == key
+        ]
+        self._remove_from_tables(dropped)
+        self._update_owner(key)
+        return True
+
+    def _add_to_tables(self, rules: List[Dict]) -> None:
+        """
+        把已按长度降序排好的规则归并进规则表（稳定归并，同长度时已有规则在前），并更新分类表与术语表
+
+        规则表、分类表、术语表都按写时复制更新，避免其他线程遍历时看到半成品。
+        """
+        if not rules:
+            return
+        term_counts = self._ensure_term_counts()
+        self.replacements = list(heapq.merge(self._rules_list(), rules, key=lambda rule: -rule["wrong_len"]))
+
+        categories = dict(self._categories)
+        new_terms = []
+        for rule in rules:
+            cat = rule.get("category", "unknown")
+            categories[cat] = categories.get(cat, 0) + 1
+            correct_term = rule.get("correct", "")
+            if correct_term:
+                term_counts[correct_term] += 1
+                if term_counts[correct_term] == 1:
+                    new_terms.append(correct_term)
+        self._categories = categories
+        if new_terms:
+            self._terms = list(heapq.merge(self._terms, sorted(new_terms)))
+
+    def _remove_from_tables(self, rules: List[Dict]) -> None:
+        """从规则表、分类表、术语表中移除指定规则（按对象身份）"""
+        if not rules:
+            return
+        term_counts = self._ensure_term_counts()
+        rule_ids = {id(rule) for rule in rules}
+        self.replacements = [rule for rule in self._rules_list() if id(rule) not in rule_ids]
+
+        categories = dict(self._categories)
+        gone_terms = set()
+        for rule in rules:
+            cat = rule.get("category", "unknown")
+            categories[cat] -= 1
+            if not categories[cat]:
+                del categories[cat]
+            correct_term = rule.get("correct", "")
+            if correct_term:
+                term_counts[correct_term] -= 1
+                if term_counts[correct_term] <= 0:
+                    del term_counts[correct_term]
+                    gone_terms.add(correct_term)
+        self._categories = categories
+        if gone_terms:
+            self._terms = [term for term in self._terms if term not in gone_terms]
+
+    def _rules_list(self) -> List[Dict]:
+        """
+        可按对象身份增删的规则表
+
+        紧凑字典的规则表是按需解码的只读序列，第一次编辑时才展开成列表（之后的编辑与 JSON 字典相同）。
+        """
+        if not isinstance(self.replacements, list):
+            self.replacements = list(self.replacements)
+        return self.replacements
+
+    def _ensure_term_counts(self) -> Counter:
+        """术语引用计数（首次编辑时才统计，启动路径不付出这部分开销）"""
+        if self._term_counts is None:
+            self._term_counts = Counter(
+                rule["correct"] for rule in self.replacements if rule.get("correct")
+            )
+        return self._term_counts
+
+    def _rebuild_edit_matcher(self) -> None:
+        """只用增量规则重建小自动机（规模与编辑数成正比，与主字典大小无关）"""
+        self._edit_matcher = TermMatcher(self._edits.keys())
+        self._edit_rules = list(self._edits.values())
+
+    def _fold_edits(self) -> None:
+        """增量规则过多时，用当前主字典层的规则重建主自动机并清空增量"""
+        base_rules = [rule for rule in self.replacements if rule.get("layer", BASE_LAYER) == BASE_LAYER]
+        self.matcher, self._pattern_rules = self._build_matcher(base_rules)
+        self._removed_ids = frozenset()
+        self._edits = {}
+        self._edit_matcher = TermMatcher()
+        self._edit_rules = []
+        debug(f"♻️ 已将增量规则并入主自动机，共 {len(self._pattern_rules)} 个变体")
+
+    # ------------------------------------------------------------------
+    # 纠错档案：运行时按分类启用/停用规则，不重新解析或编译字典
+    # ------------------------------------------------------------------
+
+    def define_profile(self, name: str, include: Optional[Iterable[str]] = None,
+                       exclude: Optional[Iterable[str]] = None) -> None:
+        """
+        定义（或覆盖）一个纠错档案
+
+        Args:
+            name: 档案名，如 "student"
+            include: 只启用这些分类（为 None 时表示全部分类）
+            exclude: 在 include 的基础上再停用这些分类
+        """
+        if name == ALL_PROFILE:
+            raise ValueError(f"纠错档案 {ALL_PROFILE} 是内置档案，不能重新定义")
+        self._profiles[name] = (
+            frozenset(include) if include is not None else None,
+            frozenset(exclude or ())
+        )
+        self._profile_cache.pop(name, None)
+        self._profile_terms_cache.pop(name, None)
+
+    def set_profile(self, name: str) -> None:
+        """切换默认纠错档案（只是改一个名字，切换本身没有开销）"""
+        self._get_profile(name)
+        self._profile = name
+
+    def get_profile(self) -> str:
+        """当前默认纠错档案"""
+        return self._profile
+
+    def list_profiles(self) -> Dict[str, Dict]:
+        """列出全部纠错档案及其启用的分类"""
+        categories = self._categories
+        return {
+            name: {
+                "include": sorted(include) if include is not None else None,
+                "exclude": sorted(exclude),
+                "active_categories": sorted(
+                    cat for cat in categories if self._category_enabled(cat, include, exclude)
+                )
+            }
+            for name, (include, exclude) in self._profiles.items()
+        }
+
+    def _get_profile(self, name: str) -> Tuple[Optional[frozenset], frozenset]:
+        profile = self._profiles.get(name)
+        if profile is None:
+            raise ValueError(f"未知的纠错档案: {name}")
+        return profile
+
+    @staticmethod
+    def _category_enabled(category: str, include: Optional[frozenset], exclude: frozenset) -> bool:
+        return (include is None or category in include) and category not in exclude
+
+    def _profile_sources(self, profile: Optional[str] = None,
+                         tenant: Optional[str] = None) -> Tuple[Tuple, frozenset]:
+        """
+        获取纠错档案对应的匹配源：在当前快照的屏蔽编号上再叠加停用分类的模式编号
+
+        结果按匹配源快照缓存，规则没有变化时每次请求只是一次字典查找。
+        指定租户时，把该租户的小自动机放在最前面：同一变体两边都命中时位置、长度相同，
+        排在前面的租户规则胜出，共享字典不需要为每个租户单独屏蔽。
+
+        Returns:
+            (匹配源, 停用的分类)
+        """
+        profile = self._profile if profile is None else profile
+        sources, masked_categories = self._shared_profile_sources(profile)
+
+        if tenant is None:
+            return sources, masked_categories
+        overlay_source = self._tenant_source(tenant, *self._get_profile(profile))
+        if overlay_source is None:
+            return sources, masked_categories
+        return (overlay_source,) + sources, masked_categories
+
+    def _shared_profile_sources(self, profile: str) -> Tuple[Tuple, frozenset]:
+        """
+        共享字典（各层）在某个纠错档案下的匹配源
+
+        层覆盖在分类过滤之后按档案重新判定：高优先级层的变体所属分类被停用时，
+        低优先级层同一变体的规则不再被它屏蔽，仍然生效。
+        """
+        sources, shadows = self._source_shadows
+        if profile == ALL_PROFILE:
+            return sources, frozenset()
+
+        cached = self._profile_cache.get(profile)
+        if cached is not None and cached[0] is sources:
+            return cached[1], cached[2]
+
+        include, exclude = self._get_profile(profile)
+        masked_sources = []
+        masked_categories = set()
+        live_ids = set()
+        for (matcher, pattern_rules, _), (base_ids, shadowed) in zip(sources, shadows):
+            live_ids.add(id(pattern_rules))
+            masked_ids = set(base_ids)
+            for category, ids in self._category_ids(pattern_rules).items():
+                if not self._category_enabled(category, include, exclude):
+                    masked_ids.update(ids)
+                    masked_categories.add(category)
+            # 只有在本档案下仍然生效的更高优先级规则才覆盖本层的同一变体
+            for key in shadowed:
+                pattern_id = matcher.pattern_id(key)
+                if pattern_id >= 0 and any(self._source_defines(source, key) for source in masked_sources):
+                    masked_ids.add(pattern_id)
+            masked_sources.append((matcher, pattern_rules, frozenset(masked_ids)))
+        # 已被替换的增量规则表不再需要分类索引（其他请求可能同时写入，遍历副本）
+        for key in [key for key in list(self._category_ids_cache) if key not in live_ids]:
+            self._category_ids_cache.pop(key, None)
+
+        # 拼音模糊匹配的结果没有模式编号，按分类过滤；把当前字典里所有停用分类都算上
+        masked_categories.update(
+            cat for cat in self._categories if not self._category_enabled(cat, include, exclude)
+        )
+        result = (tuple(masked_sources), frozenset(masked_categories))
+        self._profile_cache[profile] = (sources,) + result
+        return result
+
+    @staticmethod
+    def _source_defines(source: Tuple, key: str) -> bool:
+        """匹配源里该变体是否存在且未被屏蔽"""
+        matcher, _, masked_ids = source
+        pattern_id = matcher.pattern_id(key)
+        return pattern_id >= 0 and pattern_id not in masked_ids
+
+    def _category_ids(self, pattern_rules: List[Dict]) -> Dict[str, frozenset]:
+        """某个自动机的 分类 → 模式编号 索引（每个规则表只统计一次）"""
+        cached = self._category_ids_cache.get(id(pattern_rules))
+        if cached is not None and cached[0] is pattern_rules:
+            return cached[1]
+        if isinstance(pattern_rules, PackedRules):
+            # 紧凑字典直接扫描分类列，不解码规则
+            index = pattern_rules.category_index()
+        else:
+            groups: Dict[str, Set[int]] = {}
+            for pattern_id, rule in enumerate(pattern_rules):
+                groups.setdefault(rule.get("category", "unknown"), set()).add(pattern_id)
+            index = {category: frozenset(ids) for category, ids in groups.items()}
+        self._category_ids_cache[id(pattern_rules)] = (pattern_rules, index)
+        return index
+
+    # ------------------------------------------------------------------
+    # 文件监听：其他进程修改字典或追加增量时，只应用变化的部分
+    # ------------------------------------------------------------------
+
+    def start_watching(self, interval: float = 0.05) -> None:
+        """
+        启动后台线程轮询字典文件与增量日志
+
+        Args:
+            interval: 轮询间隔（秒），默认 50ms
+        """
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+
+        self._watch_stop.clear()
+
+        def _watch() -> None:
+            while not self._watch_stop.wait(interval):
+                try:
+                    self.check_for_updates()
+                except Exception as e:
+                    warn(f"❌ 字典热更新失败: {e}")
+
+        self._watch_thread = threading.Thread(target=_watch, name="cw-dict-watch", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self) -> None:
+        """停止文件监听线程"""
+        self._watch_stop.set()
+        if self._watch_thread:
+            self._watch_thread.join(timeout=1.0)
+        self._watch_thread = None
+
+    def check_for_updates(self) -> int:
+        """
+        检查主字典和增量日志是否有变化，并增量应用
+
+        Returns:
+            本次生效的规则变化数
+        """
+        with self._lock:
+            if not self._dict_file:
+                return 0
+
+            changes = 0
+            if self._file_stat(self._dict_file) != self._dict_stat:
+                changes += self._sync_dict_file()
+
+            path = delta_path(self._dict_file)
+            inode = self._file_inode(path)
+            last_inode, offset = self._delta_state
+            if inode is None:
+                self._delta_state = (None, 0)
+            else:
+                # 日志被合并改名后会出现新文件，从头读取
+                if inode != last_inode:
+                    offset = 0
+                ops, offset = read_deltas(path, offset)
+                for op in ops:
+                    changes += int(self._apply_op(op))
+                self._delta_state = (inode, offset)
+
+            if changes:
+                debug(f"🔄 字典热更新: {changes} 条规则变化")
+            return changes
+
+    def _sync_dict_file(self) -> int:
+        """
+        主字典被其他进程修改：与当前规则比对，只应用差异
+
+        读取前先记下文件状态，解析并应用成功后才更新 _dict_stat：编辑器非原子保存时可能读到写了一半的文件，
+        解析失败后下一轮轮询仍会看到状态变化并重新读取。
+        """
+        stat = self._file_stat(self._dict_file)
+        if self._packed:
+            # 紧凑字典是整体重新生成的只读文件，已映射的旧文件在重启前继续使用
+            self._dict_stat = stat
+            warn(f"⚠️  紧凑字典已重新生成，重启后生效: {self._dict_file}")
+            return 0
+        with open(self._dict_file, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest == self._dict_hash:
+            self._dict_stat = stat
+            return 0
+        if digest == self._dict_failed_hash:
+            return 0
+
+        try:
+            data = json.loads(raw.decode('utf-8'))
+        except ValueError:
+            self._dict_failed_hash = digest
+            raise
+
+        # 目标状态 = 新的主字典 + 尚未合并的增量
+        target: Dict[str, Dict] = {}
+        for rule in self._parse_dict(data):
+            if rule["variant"]:
+                target.setdefault(fold_text(rule["variant"]), rule)
+        for op in read_pending_deltas(self._dict_file):
+            key = fold_text(op["wrong"])
+            if op["op"] == "remove":
+                target.pop(key, None)
+            else:
+                target[key] = self._make_rule(op["wrong"], op.get("correct", ""), op.get("category") or "other")
+
+        changes = 0
+        current = self._effective_rules()
+        for key in current:
+            if key not in target:
+                changes += int(self._drop_key(key))
+        for key, rule in target.items():
+            changes += int(self._set_rule(key, rule))
+
+        self._dict_hash = digest
+        self._dict_stat = stat
+        self._dict_failed_hash = None
+        self._refresh_sources()
+        self.stats["total_rules"] = len(self.replacements)
+        return changes
+
+    @staticmethod
+    def _file_stat(path: str) -> Optional[Tuple]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    @staticmethod
+    def _file_inode(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_ino
+        except OSError:
+            return None
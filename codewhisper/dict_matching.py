@@ -0,0 +1,175 @@
+"""
+字典匹配与修正 - 在匹配源快照上做单遍扫描、挑选不重叠的命中并拼出修正后的文本
+
+这里的函数只读传入的快照，不碰 DictionaryManager 的任何共享状态，
+既供管理器在多线程中调用，也供批量修正的工作进程直接使用。
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .phonetic_index import PhoneticIndex
+from .term_matcher import fold_text, is_ascii_alnum
+
+
+def find_matches(text: str, sources: Tuple, telemetry: Optional[Dict] = None) -> List[Tuple[int, int, Dict]]:
+    """
+    单遍扫描找出所有命中，并按“长词优先、规则顺序优先、位置靠前优先”挑出互不重叠的匹配
+
+    所有命中都在原文上一次性挑选，先选中的区间会挡住与它重叠的其他命中：
+    - 更长的命中总是优先，与层的优先级无关
+    - 同样长的命中按匹配源顺序（高优先级层在前），同一匹配源内按规则顺序
+    - 替换结果与原文相同的命中（如 "REST" 命中 rest→REST）同样占住区间，
+      所以 "租KPRESTABLISHED" 中先选中的 "REST" 会挡住等长的 "租KPR"，原文保持不变
+    - 每次替换都基于原文位置，替换结果不会再被其他规则匹配
+
+    Args:
+        text: 待匹配文本
+        sources: 匹配源快照，每项为 (自动机, 模式编号 -> 规则, 屏蔽的模式编号)，越靠前优先级越高
+        telemetry: 本次调用的规则计数，id(规则) → [规则, 命中, 替换, 同文跳过]；为 None 时不统计
+
+    Returns:
+        按起始位置排序的 (start, end, rule) 列表
+    """
+    if not text or not any(rules for _, rules, _ in sources):
+        return []
+
+    folded = fold_text(text)
+    text_len = len(text)
+    candidates = []
+
+    for layer, (matcher, pattern_rules, masked_ids) in enumerate(sources):
+        for start, end, pattern_id in matcher.iter_matches(folded):
+            if pattern_id in masked_ids:
+                continue
+            rule = pattern_rules[pattern_id]
+            if telemetry is not None:
+                _count_rule(telemetry, rule, 1)
+
+            # 短词边界：前后都不能是字母或数字，防止子串误匹配（如 "Cat" 命中 "TomCat"）
+            if rule.get("boundary"):
+                if start > 0 and is_ascii_alnum(text[start - 1]):
+                    continue
+                if end < text_len and is_ascii_alnum(text[end]):
+                    continue
+
+            candidates.append((-(end - start), layer, pattern_id, start, end))
+
+    # 长词优先；同长度按规则顺序（主字典在前、增量在后）；同一规则按出现位置从左到右
+    candidates.sort()
+
+    occupied = bytearray(text_len)
+    selected = []
+    for _, layer, pattern_id, start, end in candidates:
+        if any(occupied[start:end]):
+            continue
+        occupied[start:end] = b"\x01" * (end - start)
+        selected.append((start, end, sources[layer][1][pattern_id]))
+
+    selected.sort(key=lambda x: x[0])
+    return selected
+
+
+def _count_rule(telemetry: Dict, rule: Dict, slot: int) -> None:
+    entry = telemetry.get(id(rule))
+    if entry is None:
+        entry = telemetry[id(rule)] = [rule, 0, 0, 0]
+    entry[slot] += 1
+
+
+def apply_corrections(text: str, sources: Tuple,
+                      phonetic: Optional[Tuple[PhoneticIndex, float, Optional[frozenset]]] = None,
+                      telemetry: Optional[Dict] = None) -> Tuple[str, List[Dict]]:
+    """
+    按匹配源快照修正一段文本，不读写任何共享状态（可在多线程、多进程中并发调用）
+
+    Args:
+        text: 待修正文本
+        sources: 匹配源快照
+        phonetic: (拼音索引, 置信度阈值, 屏蔽的分类)，为 None 时不做拼音模糊匹配
+        telemetry: 本次调用的规则计数（见 find_matches），为 None 时不统计
+
+    Returns:
+        (修正后的文本, 本段文本的修正记录)
+    """
+    corrections = []
+    pieces = []
+    last_end = 0
+
+    matches = find_matches(text, sources, telemetry)
+    if phonetic is not None and text:
+        # 精确规则优先，拼音模糊匹配只在剩余位置上进行
+        occupied = bytearray(len(text))
+        for start, end, _ in matches:
+            occupied[start:end] = b"\x01" * (end - start)
+        index, min_confidence, masked_categories = phonetic
+        for start, end, term, category, confidence in index.find(text, min_confidence, occupied=occupied):
+            if masked_categories and category in masked_categories:
+                continue
+            rule = {"correct": term, "category": category, "confidence": confidence}
+            if telemetry is not None:
+                _count_rule(telemetry, rule, 1)
+            matches.append((start, end, rule))
+        matches.sort(key=lambda x: x[0])
+
+    for start, end, rule in matches:
+        matched_text = text[start:end]
+        replacement = rule["correct"]
+
+        # 匹配的文本和目标替换文本相同时，保留原文（该位置仍被占用，短词不会再命中）
+        if matched_text == replacement:
+            if telemetry is not None:
+                _count_rule(telemetry, rule, 3)
+            continue
+        if telemetry is not None:
+            _count_rule(telemetry, rule, 2)
+
+        pieces.append(text[last_end:start])
+        pieces.append(replacement)
+        last_end = end
+
+        correction = {
+            "wrong": matched_text,
+            "correct": replacement,
+            "category": rule.get("category", "unknown"),  # unknown兜底，防止没有这个类
+            "start": start,  # 在原文中的位置，用于把下标映射到修正后的文本
+            "end": end
+        }
+        if "confidence" in rule:
+            correction["confidence"] = rule["confidence"]  # 拼音模糊匹配的置信度
+        corrections.append(correction)
+
+    if corrections:
+        pieces.append(text[last_end:])
+        text = "".join(pieces)
+
+    return text, corrections
+
+
+def map_offsets(corrections: List[Dict], positions: Iterable[int]) -> List[int]:
+    """
+    把原文中的下标映射到修正后文本中的下标（一次线性扫描）
+
+    落在某处替换内部的下标映射到替换结果的末尾，即整个替换归属于它开始的那一段。
+
+    Args:
+        corrections: apply_corrections 返回的修正记录（按位置排序，带 start/end）
+        positions: 递增的原文下标
+
+    Returns:
+        对应的修正后下标
+    """
+    mapped = []
+    delta = 0
+    i = 0
+    count = len(corrections)
+    for pos in positions:
+        while i < count and corrections[i]["end"] <= pos:
+            correction = corrections[i]
+            delta += len(correction["correct"]) - (correction["end"] - correction["start"])
+            i += 1
+        if i < count and corrections[i]["start"] < pos:
+            correction = corrections[i]
+            mapped.append(correction["start"] + delta + len(correction["correct"]))
+        else:
+            mapped.append(pos + delta)
+    return mapped
@@ -0,0 +1,79 @@
+"""
+租户覆盖层 - 一个进程服务多个用户，每个用户只额外保存自己的术语
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+from .tenant_overlay import TenantOverlay
+
+
+class DictTenantsMixin:
+    """
+    DictionaryManager 的租户部分
+
+    每个租户一个 TenantOverlay，查找时作为最高优先级的匹配源叠加在共享字典之前，
+    共享字典不做任何复制。依赖 DictionaryManager 的 _make_rule 以及 _lock。
+    """
+
+    def _init_tenants(self) -> None:
+        """还没有任何租户"""
+        self._tenants: Dict[str, TenantOverlay] = {}
+
+    def _tenant_source(self, tenant_id: str, include: Optional[frozenset],
+                       exclude: frozenset) -> Optional[Tuple]:
+        """租户在某个分类过滤下的匹配源，租户不存在或没有生效的规则时返回 None"""
+        overlay = self._tenants.get(tenant_id)
+        return overlay.source(include, exclude) if overlay is not None else None
+
+    def add_tenant(self, tenant_id: str, rules: Optional[Iterable[Dict]] = None) -> TenantOverlay:
+        """
+        注册一个租户（已存在时直接返回），不复制共享字典，没有私有规则时几乎不占内存
+
+        Args:
+            tenant_id: 租户（用户）标识
+            rules: 初始的私有规则，每项为 {"wrong": 错误变体, "correct": 正确术语, "category": 分类}
+
+        Returns:
+            该租户的覆盖层
+        """
+        with self._lock:
+            overlay = self._tenants.get(tenant_id)
+            if overlay is None:
+                # 单个键的增删是原子操作，转录线程读取时不需要加锁；注册耗时与租户数量无关
+                overlay = TenantOverlay(tenant_id)
+                self._tenants[tenant_id] = overlay
+        for rule in rules or []:
+            self.add_tenant_rule(tenant_id, rule["wrong"], rule["correct"], rule.get("category") or "other")
+        return overlay
+
+    def remove_tenant(self, tenant_id: str) -> bool:
+        """注销租户，返回是否存在该租户"""
+        with self._lock:
+            return self._tenants.pop(tenant_id, None) is not None
+
+    def get_tenant(self, tenant_id: str) -> Optional[TenantOverlay]:
+        """获取租户的覆盖层，不存在时返回 None"""
+        return self._tenants.get(tenant_id)
+
+    def list_tenants(self) -> Dict[str, int]:
+        """列出全部租户及其私有规则数"""
+        return {tenant_id: len(overlay) for tenant_id, overlay in list(self._tenants.items())}
+
+    def add_tenant_rule(self, tenant_id: str, wrong: str, correct: str, category: str = "other") -> bool:
+        """
+        给租户新增一条私有规则（租户不存在时自动注册），同一变体会覆盖共享字典中的规则
+
+        Returns:
+            规则是否发生了变化
+        """
+        if not wrong or not correct:
+            raise ValueError("错误变体和正确术语都不能为空")
+        overlay = self._tenants.get(tenant_id) or self.add_tenant(tenant_id)
+        rule = self._make_rule(wrong, correct, category)
+        rule["tenant"] = tenant_id
+        return overlay.set_rule(rule)
+
+    def remove_tenant_rule(self, tenant_id: str, wrong: str) -> bool:
+        """删除租户的一条私有规则，返回是否删除了规则"""
+        overlay = self._tenants.get(tenant_id)
+        return overlay.remove_rule(wrong) if overlay is not None else False
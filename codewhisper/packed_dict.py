@@ -0,0 +1,460 @@
+"""
+紧凑字典格式 - 可内存映射（mmap）的 Aho-Corasick 自动机 + 字符串池
+
+百万级变体的字典如果展开成 Python 对象（每个变体一个 dict、自动机每个节点一个 dict），
+每个进程都要各自占用数百 MB，加载也要数秒。这里把编译好的自动机和规则按固定宽度的
+uint32 数组写进一个文件，运行时直接 mmap 后在数组上查询：
+
+- 打开文件只解析一个很小的 JSON 文件头，与字典规模无关（毫秒级）
+- 同一台机器上的所有进程映射同一个文件，共享同一份物理内存页
+- 规则只在命中时才解码成 dict
+
+文件布局（所有数组均为本机字节序的 uint32）：
+
+    magic(8) | 文件头长度(4) | 文件头 JSON | 对齐 | 各数组 | 字符串池
+
+    edge_start   [节点数 + 1]   每个节点的出边在 edge_char / edge_target 中的起止位置
+    edge_char    [边数]         出边字符的码位（同一节点内递增，查找时二分）
+    edge_target  [边数]         出边指向的节点
+    fail         [节点数]       失败指针
+    node_output  [节点数]       以该节点结尾的模式编号 + 1（0 表示没有）
+    output_link  [节点数]       沿失败指针最近的、有输出的节点（0 表示没有）
+    patterns     [模式数 * 5]   变体在字符串池中的偏移、字节长度、术语编号、分类编号、标志位
+    terms        [术语数 * 2]   术语在字符串池中的偏移、字节长度（已去重排序）
+"""
+
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .term_matcher import TermMatcher, fold_text
+
+PACKED_SUFFIX = ".cwdict"
+PACKED_MAGIC = b"CWDICT\x00\x01"
+PACKED_VERSION = 1
+
+_PATTERN_FIELDS = 5  # 变体偏移、变体字节长度、术语编号、分类编号、标志位（bit0 边界，其余位为字符长度）
+_SECTIONS = ("edge_start", "edge_char", "edge_target", "fail", "node_output", "output_link", "patterns", "terms")
+
+# 解码后的规则缓存上限（命中过的规则会反复出现，缓存满了整体清空）
+_RULE_CACHE_SIZE = 65536
+
+
+def packed_path(dict_file: str) -> str:
+    """紧凑字典路径：programmer_terms.json → programmer_terms.cwdict"""
+    base, _ = os.path.splitext(dict_file)
+    return base + PACKED_SUFFIX
+
+
+def source_path(packed_file: str) -> str:
+    """紧凑字典对应的 JSON 字典：programmer_terms.cwdict → programmer_terms.json"""
+    base, _ = os.path.splitext(packed_file)
+    return base + ".json"
+
+
+def write_packed_dict(path: str, matcher: TermMatcher, pattern_rules: List[Dict],
+                      source_hash: Optional[str] = None) -> None:
+    """
+    把编译好的自动机和规则写成紧凑字典文件（先写临时文件再原子替换）
+
+    Args:
+        path: 输出路径
+        matcher: 已 build() 的自动机
+        pattern_rules: 模式编号 → 规则
+        source_hash: 源 JSON 的内容哈希（记录在文件头中）
+    """
+    matcher.build()
+    goto = matcher._goto
+    node_count = len(goto)
+
+    terms = sorted({rule.get("correct", "") for rule in pattern_rules})
+    term_ids = {term: i for i, term in enumerate(terms)}
+    categories: Dict[str, int] = {}
+    for rule in pattern_rules:
+        cat = rule.get("category", "unknown")
+        categories[cat] = categories.get(cat, 0) + 1
+    category_ids = {cat: i for i, cat in enumerate(categories)}
+
+    # 出边按字符码位排序，便于二分查找
+    edge_start = array("I", [0])
+    edge_char = array("I")
+    edge_target = array("I")
+    for transitions in goto:
+        for ch, target in sorted(transitions.items(), key=lambda item: ord(item[0])):
+            edge_char.append(ord(ch))
+            edge_target.append(target)
+        edge_start.append(len(edge_char))
+
+    node_output = array("I", bytes(4 * node_count))
+    for pattern_id, key in enumerate(matcher._keys):
+        node = 0
+        for ch in key:
+            node = goto[node][ch]
+        node_output[node] = pattern_id + 1
+
+    # 输出链：按 BFS 顺序计算，保证失败指针指向的节点先算好
+    fail = array("I", matcher._fail)
+    output_link = array("I", bytes(4 * node_count))
+    queue = deque(goto[0].values())
+    while queue:
+        node = queue.popleft()
+        target = fail[node]
+        output_link[node] = target if node_output[target] else output_link[target]
+        queue.extend(goto[node].values())
+
+    pool = bytearray()
+    pool_index: Dict[str, Tuple[int, int]] = {}
+
+    def intern(text: str) -> Tuple[int, int]:
+        cached = pool_index.get(text)
+        if cached is None:
+            raw = text.encode("utf-8")
+            cached = (len(pool), len(raw))
+            pool.extend(raw)
+            pool_index[text] = cached
+        return cached
+
+    term_table = array("I")
+    for term in terms:
+        term_table.extend(intern(term))
+
+    patterns = array("I")
+    for rule in pattern_rules:
+        variant = rule.get("variant", "")
+        offset, length = intern(variant)
+        flags = (len(variant) << 1) | int(bool(rule.get("boundary")))
+        patterns.extend((offset, length, term_ids[rule.get("correct", "")],
+                         category_ids[rule.get("category", "unknown")], flags))
+
+    arrays = {
+        "edge_start": edge_start,
+        "edge_char": edge_char,
+        "edge_target": edge_target,
+        "fail": fail,
+        "node_output": node_output,
+        "output_link": output_link,
+        "patterns": patterns,
+        "terms": term_table,
+    }
+
+    # 文件头里记录各段的字节偏移，先估计文件头长度再回填（偏移变化时重算一次即可收敛）
+    header = {
+        "version": PACKED_VERSION,
+        "byteorder": sys.byteorder,
+        "source_hash": source_hash,
+        "nodes": node_count,
+        "patterns": len(pattern_rules),
+        "categories": [[cat, count] for cat, count in categories.items()],
+        "sections": {},
+    }
+    header_size = 0
+    while True:
+        offset = _align(len(PACKED_MAGIC) + 4 + header_size)
+        sections = {}
+        for name in _SECTIONS:
+            sections[name] = [offset, len(arrays[name])]
+            offset += 4 * len(arrays[name])
+        sections["pool"] = [offset, len(pool)]
+        header["sections"] = sections
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        if len(header_bytes) == header_size:
+            break
+        header_size = len(header_bytes)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(PACKED_MAGIC)
+        f.write(len(header_bytes).to_bytes(4, "little"))
+        f.write(header_bytes)
+        f.write(b"\x00" * (_align(f.tell()) - f.tell()))
+        for name in _SECTIONS:
+            arrays[name].tofile(f)
+        f.write(pool)
+    os.replace(tmp_path, path)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class PackedDictionary:
+    """已映射到内存的紧凑字典，提供与 TermMatcher / 规则列表相同的查询接口"""
+
+    def __init__(self, path: str, make_rule: Callable[[str, str, str], Dict]):
+        """
+        Args:
+            path: 紧凑字典文件路径
+            make_rule: 把 (变体, 术语, 分类) 构建成规则 dict 的函数（与 JSON 字典的规则格式保持一致）
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(PACKED_MAGIC)] != PACKED_MAGIC:
+            raise ValueError(f"不是紧凑字典文件: {path}")
+        header_start = len(PACKED_MAGIC) + 4
+        header_size = int.from_bytes(self._mmap[len(PACKED_MAGIC):header_start], "little")
+        header = json.loads(self._mmap[header_start:header_start + header_size].decode("utf-8"))
+        if header.get("version") != PACKED_VERSION:
+            raise ValueError(f"紧凑字典版本不兼容: {header.get('version')}")
+        if header.get("byteorder") != sys.byteorder or array("I").itemsize != 4:
+            raise ValueError("紧凑字典的字节序与本机不一致，请在本机重新生成")
+
+        self.source_hash: Optional[str] = header.get("source_hash")
+        self.categories: Dict[str, int] = {cat: count for cat, count in header["categories"]}
+        self._category_names: List[str] = [cat for cat, _ in header["categories"]]
+
+        view = memoryview(self._mmap)
+        self._views = {}
+        for name in _SECTIONS:
+            offset, count = header["sections"][name]
+            self._views[name] = view[offset:offset + 4 * count].cast("I")
+        pool_offset, pool_size = header["sections"]["pool"]
+        self._pool_range = (pool_offset, pool_offset + pool_size)
+        view.release()
+
+        self.matcher = PackedMatcher(self)
+        self.rules = PackedRules(self, make_rule)
+        self.terms = PackedTerms(self)
+
+    def string(self, offset: int, length: int) -> str:
+        """从字符串池读取一个字符串"""
+        start = self._pool_range[0] + offset
+        return self._mmap[start:start + length].decode("utf-8")
+
+    def close(self) -> None:
+        """释放映射（之后不能再查询）"""
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        self._mmap.close()
+
+
+# 每个进程内按路径复用已打开的紧凑字典，进程池反序列化时也走这里
+_open_dicts: Dict[Tuple[str, float], PackedDictionary] = {}
+
+
+def open_packed_dict(path: str, make_rule: Callable[[str, str, str], Dict]) -> PackedDictionary:
+    """打开（或复用本进程中已打开的）紧凑字典"""
+    path = os.path.abspath(path)
+    key = (path, os.stat(path).st_mtime_ns)
+    packed = _open_dicts.get(key)
+    if packed is None:
+        packed = PackedDictionary(path, make_rule)
+        _open_dicts[key] = packed
+    return packed
+
+
+def _reopen_matcher(path: str, make_rule: Callable) -> "PackedMatcher":
+    return open_packed_dict(path, make_rule).matcher
+
+
+def _reopen_rules(path: str, make_rule: Callable, layer: Optional[str]) -> "PackedRules":
+    rules = open_packed_dict(path, make_rule).rules
+    return rules if layer == rules.layer else rules.with_layer(layer)
+
+
+class PackedMatcher:
+    """直接在映射数组上运行的 Aho-Corasick 自动机（接口与 TermMatcher 相同）"""
+
+    def __init__(self, packed: PackedDictionary):
+        self._packed = packed
+        views = packed._views
+        self._edge_start = views["edge_start"]
+        self._edge_char = views["edge_char"]
+        self._edge_target = views["edge_target"]
+        self._fail = views["fail"]
+        self._node_output = views["node_output"]
+        self._output_link = views["output_link"]
+        self._patterns = views["patterns"]
+        # 根节点的出边最多、被访问最频繁，单独做成字典（规模只与首字符种类数有关）
+        self._root = {
+            self._edge_char[i]: self._edge_target[i]
+            for i in range(self._edge_start[0], self._edge_start[1])
+        }
+
+    def __len__(self) -> int:
+        return len(self._patterns) // _PATTERN_FIELDS
+
+    def __contains__(self, pattern: str) -> bool:
+        return self.pattern_id(pattern) >= 0
+
+    def __reduce__(self):
+        # 进程池传递时只传路径，子进程重新映射同一个文件（共享物理页）
+        return _reopen_matcher, (self._packed.path, self._packed.rules.make_rule)
+
+    def _step(self, node: int, code: int) -> int:
+        """沿出边走一步，没有该出边时返回 -1"""
+        if node == 0:
+            return self._root.get(code, -1)
+        lo = self._edge_start[node]
+        hi = self._edge_start[node + 1]
+        if lo == hi:
+            return -1
+        i = bisect_left(self._edge_char, code, lo, hi)
+        if i < hi and self._edge_char[i] == code:
+            return self._edge_target[i]
+        return -1
+
+    def pattern_id(self, pattern: str) -> int:
+        """获取模式编号，不存在时返回 -1"""
+        node = 0
+        for ch in fold_text(pattern):
+            node = self._step(node, ord(ch))
+            if node < 0:
+                return -1
+        return self._node_output[node] - 1 if node else -1
+
+    def key(self, pattern_id: int) -> str:
+        """获取模式编号对应的折叠文本"""
+        base = pattern_id * _PATTERN_FIELDS
+        return fold_text(self._packed.string(self._patterns[base], self._patterns[base + 1]))
+
+    def keys(self) -> List[str]:
+        """全部模式的折叠文本（下标即模式编号）"""
+        return [self.key(pattern_id) for pattern_id in range(len(self))]
+
+    def build(self) -> None:
+        """紧凑自动机是只读的，已经构建完成"""
+
+    def iter_matches(self, folded_text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        扫描已折叠的文本，产出所有命中
+
+        Yields:
+            (start, end, pattern_id)，按结束位置递增
+        """
+        root = self._root
+        edge_start = self._edge_start
+        edge_char = self._edge_char
+        edge_target = self._edge_target
+        fail = self._fail
+        node_output = self._node_output
+        output_link = self._output_link
+        patterns = self._patterns
+
+        node = 0
+        for i, ch in enumerate(folded_text):
+            code = ord(ch)
+            while True:
+                if node == 0:
+                    node = root.get(code, 0)
+                    break
+                lo = edge_start[node]
+                hi = edge_start[node + 1]
+                if lo != hi:
+                    j = bisect_left(edge_char, code, lo, hi)
+                    if j < hi and edge_char[j] == code:
+                        node = edge_target[j]
+                        break
+                node = fail[node]
+
+            out = node if node_output[node] else output_link[node]
+            while out:
+                pattern_id = node_output[out] - 1
+                end = i + 1
+                yield end - (patterns[pattern_id * _PATTERN_FIELDS + 4] >> 1), end, pattern_id
+                out = output_link[out]
+
+
+class PackedRules(Sequence):
+    """
+    模式编号 → 规则 的只读序列，按需从映射数组解码
+
+    模式编号按变体长度降序分配，因此它同时可以充当按长度降序排好的规则表。
+    """
+
+    def __init__(self, packed: PackedDictionary, make_rule: Callable[[str, str, str], Dict],
+                 layer: Optional[str] = None):
+        self._packed = packed
+        self._patterns = packed._views["patterns"]
+        self.make_rule = make_rule
+        self.layer = layer
+        self._cache: Dict[int, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._patterns) // _PATTERN_FIELDS
+
+    def __reduce__(self):
+        return _reopen_rules, (self._packed.path, self.make_rule, self.layer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        rule = self._cache.get(index)
+        if rule is None:
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            base = index * _PATTERN_FIELDS
+            patterns = self._patterns
+            rule = self.make_rule(
+                self._packed.string(patterns[base], patterns[base + 1]),
+                self._packed.terms[patterns[base + 2]],
+                self._packed._category_names[patterns[base + 3]]
+            )
+            if self.layer is not None:
+                rule["layer"] = self.layer
+            if len(self._cache) >= _RULE_CACHE_SIZE:
+                self._cache = {}
+            self._cache[index] = rule
+        return rule
+
+    def with_layer(self, layer: Optional[str]) -> "PackedRules":
+        """同一份映射上、解码时带上层名的规则序列"""
+        return PackedRules(self._packed, self.make_rule, layer)
+
+    def category_index(self) -> Dict[str, frozenset]:
+        """分类 → 模式编号（直接扫描分类列，不解码规则）"""
+        patterns = self._patterns
+        groups: Dict[int, List[int]] = {}
+        for pattern_id in range(len(self)):
+            groups.setdefault(patterns[pattern_id * _PATTERN_FIELDS + 3], []).append(pattern_id)
+        names = self._packed._category_names
+        return {names[cat]: frozenset(ids) for cat, ids in groups.items()}
+
+
+class PackedTerms(Sequence):
+    """去重排序后的术语表，按需从字符串池解码"""
+
+    def __init__(self, packed: PackedDictionary):
+        self._packed = packed
+        self._table = packed._views["terms"]
+
+    def __len__(self) -> int:
+        return len(self._table) // 2
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._packed.string(self._table[2 * index], self._table[2 * index + 1])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行：python -m codewhisper.packed_dict <字典.json> [-o 输出.cwdict]"""
+    import argparse
+
+    from .dict_manager import DictionaryManager
+
+    parser = argparse.ArgumentParser(description="把 JSON 字典编译为可内存映射的紧凑字典")
+    parser.add_argument("dict_file", help="JSON 字典路径")
+    parser.add_argument("-o", "--output", help=f"输出路径（默认与字典同名，后缀 {PACKED_SUFFIX}）")
+    args = parser.parse_args(argv)
+
+    output = DictionaryManager(dict_path=args.dict_file).export_packed(args.output)
+    print(f"✓ 已生成紧凑字典: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+"""
+拼音模糊匹配索引 - 发现字典里还没有收录的同音/近音误识别（如 拍期 → 排期、鱼期 → 逾期）
+"""
+
+import re
+from importlib.util import find_spec
+from itertools import islice, product
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# pypinyin 导入约需 0.3 秒（加载词典），拼音模糊匹配默认关闭，只在构建索引时才真正导入
+PYPINYIN_AVAILABLE = find_spec("pypinyin") is not None
+
+# 连续汉字片段，只在这些片段里找近音词
+_HAN_RUN = re.compile(r'[\u4e00-\u9fff]+')
+
+# 常见的方言/口音混淆，检索时视为相同：平翘舌、n/l、前后鼻音
+_INITIAL_FUZZY = (("zh", "z"), ("ch", "c"), ("sh", "s"), ("l", "n"))
+
+
+def _pinyin(text: str, heteronym: bool = False) -> List[List[str]]:
+    """带数字声调的拼音（轻声记为 5）"""
+    from pypinyin import Style, pinyin
+    return pinyin(text, style=Style.TONE3, heteronym=heteronym, neutral_tone_with_five=True)
+
+
+def _strip_tone(syllable: str) -> str:
+    return syllable.rstrip("012345")
+
+
+def _fuzzy_syllable(syllable: str) -> str:
+    """去声调并做模糊归一，用于检索（打分仍使用带声调的原拼音）"""
+    s = _strip_tone(syllable)
+    for src, dst in _INITIAL_FUZZY:
+        if s.startswith(src):
+            s = dst + s[len(src):]
+            break
+    # ang/eng/ing → an/en/in（ong 不变）
+    if len(s) >= 3 and s.endswith("ng") and s[-3] in "aei":
+        s = s[:-1]
+    return s
+
+
+def levenshtein(a: str, b: str) -> int:
+    """编辑距离"""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class PhoneticIndex:
+    """
+    术语拼音索引
+
+    - 每个纯中文术语预先算好带声调拼音（多音字展开为多种读音），编进一棵按音节分叉的前缀树
+    - 查询时从每个位置沿前缀树向后走，最多有一个音节可以不同：声调不同、平翘舌/前后鼻音等模糊音相同，
+      或者模糊音只差一个字母（如 qi → ji / xi / qu）
+    - 替换候选用集合求交在 C 层完成，并用倒排表只看接得上后面音节的分支；编辑距离大到不可能达到置信度阈值的
+      候选直接跳过，文本接不上任何术语前缀时立即停止，每个位置只需几次查表，与术语总数基本无关
+    - 不同的那个音节按带声调拼音的编辑距离换算为置信度
+
+    5 万术语时构建约 7 s；缓存预热后 40 字的转录每段约 0.5~0.8 ms，耗时随字数线性增长，200 字约 3 ms
+    （见 benchmarks/phonetic_benchmark.py）。
+    """
+
+    # 前缀树节点的特殊键（音节不会是这些字符），见 _insert
+    _ENDS = "$"
+    _SKIPS = "#"
+    _PAIR_ENDS = "&"
+    _PAIRS = "%"
+
+    def __init__(self, terms: Iterable[Tuple[str, str]], max_readings: int = 8):
+        """
+        Args:
+            terms: (术语, 分类) 序列，只有纯中文术语会被收录
+            max_readings: 多音字展开的读音组合上限
+        """
+        if not PYPINYIN_AVAILABLE:
+            raise RuntimeError("pypinyin 未安装，无法启用拼音模糊匹配")
+
+        # 带声调音节的前缀树，术语登记为 (术语, 分类, 拼音总长)
+        self._trie: Dict[str, Dict] = {}
+        self._terms: Set[str] = set()
+        self._first_lengths: Dict[str, Set[int]] = {}  # 首字 → 以它开头的术语字数
+        self._max_length = 0
+        self._syllables: Set[str] = set()  # 术语中出现过的模糊音节
+        self._toned_by_fuzzy: Dict[str, Set[str]] = {}  # 模糊音节 → 术语中出现过的带声调音节
+        self._fuzzy_forms: Dict[str, str] = {}  # 术语中出现过的带声调音节 → 模糊音节
+        self._syllable_cache: Dict[str, Tuple[str, str]] = {}
+        self._neighbor_cache: Dict[str, frozenset] = {}
+        self._alternative_cache: Dict[Tuple[str, bool], Tuple[Dict[str, int], Dict[str, int]]] = {}
+
+        # 构建期缓存：单字的全部读音（术语用字高度重复，pypinyin 调用是构建的大头）
+        heteronyms: Dict[str, List[str]] = {}
+        for term, category in terms:
+            if term in self._terms or not term or not _HAN_RUN.fullmatch(term):
+                continue
+            self._add_term(term, category, max_readings, heteronyms)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def _add_term(self, term: str, category: str, max_readings: int, heteronyms: Dict[str, List[str]]) -> None:
+        # 整词读音（考虑词组语境）排在前面，再补上每个字的其他读音
+        phrase = _pinyin(term)
+        if len(phrase) != len(term):
+            return
+        readings = []
+        for ch, (phrase_reading,) in zip(term, phrase):
+            options = [phrase_reading]
+            others = heteronyms.get(ch)
+            if others is None:
+                others = heteronyms[ch] = _pinyin(ch, heteronym=True)[0]
+            for reading in others:
+                if reading not in options:
+                    options.append(reading)
+            readings.append(options)
+
+        self._terms.add(term)
+        self._first_lengths.setdefault(term[0], set()).add(len(term))
+        self._max_length = max(self._max_length, len(term))
+        for syllables in islice(product(*readings), max_readings):
+            entry = (term, category, sum(len(s) for s in syllables))
+            for syllable in syllables:
+                if syllable not in self._fuzzy_forms:
+                    fuzzy = self._fuzzy_forms[syllable] = _fuzzy_syllable(syllable)
+                    self._syllables.add(fuzzy)
+                    self._toned_by_fuzzy.setdefault(fuzzy, set()).add(syllable)
+            self._insert(syllables, entry)
+
+    def _insert(self, syllables: Tuple[str, ...], entry: Tuple[str, str, int]) -> None:
+        """
+        把一种读音插入前缀树
+
+        节点是“带声调音节 → 子节点”的字典，另有几个特殊键：
+        - "$"：音节 → 术语，在该节点再接这个音节就是一个完整术语
+        - "#"（只在第一层）：下一个音节 → {音节: 子节点}，替换当前音节时只看接得上下一个音节的分支
+        - "&"、"%"（只在根）：替换第一个音节用的倒排表，第二个音节 → {第一个音节: 两字术语}，
+          以及 第二个音节 → 第三个音节 → {第一个音节: 第二层节点}
+        读音完全相同的术语只登记先出现的一个。
+        """
+        nodes = [self._trie]
+        for syllable in syllables:
+            nodes.append(nodes[-1].setdefault(syllable, {}))
+        last = len(syllables) - 1
+        nodes[last].setdefault(self._ENDS, {}).setdefault(syllables[last], entry)
+        if last == 1:
+            self._trie.setdefault(self._PAIR_ENDS, {}).setdefault(syllables[1], {}).setdefault(syllables[0], entry)
+        elif last >= 2:
+            pairs = self._trie.setdefault(self._PAIRS, {}).setdefault(syllables[1], {})
+            pairs.setdefault(syllables[2], {})[syllables[0]] = nodes[2]
+            nodes[1].setdefault(self._SKIPS, {}).setdefault(syllables[2], {})[syllables[1]] = nodes[2]
+
+    def _syllable(self, ch: str) -> Tuple[str, str]:
+        """单字默认读音：(带声调拼音, 模糊音节)，结果缓存"""
+        cached = self._syllable_cache.get(ch)
+        if cached is None:
+            toned = _pinyin(ch)[0][0]
+            cached = (toned, _fuzzy_syllable(toned))
+            self._syllable_cache[ch] = cached
+        return cached
+
+    def _neighbors(self, syllable: str) -> frozenset:
+        """术语中出现过的、与该模糊音节拼写相差一个字母的模糊音节（如 qi → ji / xi / qu），结果缓存"""
+        cached = self._neighbor_cache.get(syllable)
+        if cached is None:
+            cached = frozenset(
+                other for other in self._syllables
+                if other != syllable and abs(len(other) - len(syllable)) <= 1 and levenshtein(other, syllable) <= 1
+            )
+            self._neighbor_cache[syllable] = cached
+        return cached
+
+    def _alternatives(self, toned: str, fuzzy: str, neighbors: bool = True) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        可以替换该音节的带声调音节 → 与它的编辑距离，按距离分成 (距离为 1, 距离不小于 2) 两组，结果缓存
+
+        候选为模糊音相同（声调、平翘舌等不同）的音节；neighbors 为 True 时再加上模糊音只差一个字母的音节。
+        """
+        key = (toned, neighbors)
+        cached = self._alternative_cache.get(key)
+        if cached is None:
+            others = set(self._toned_by_fuzzy.get(fuzzy, ()))
+            if neighbors:
+                for neighbor in self._neighbors(fuzzy):
+                    others.update(self._toned_by_fuzzy[neighbor])
+            others.discard(toned)
+            near: Dict[str, int] = {}
+            far: Dict[str, int] = {}
+            for other in others:
+                distance = levenshtein(toned, other)
+                (near if distance == 1 else far)[other] = distance
+            cached = self._alternative_cache[key] = (near, far)
+        return cached
+
+    def find(self, text: str, min_confidence: float = 0.85, max_distance: int = 1,
+             occupied: Optional[bytearray] = None) -> List[Tuple[int, int, str, str, float]]:
+        """
+        找出文本中读音接近某个术语的片段
+
+        Args:
+            text: 待检测文本
+            min_confidence: 置信度阈值（0~1，带声调拼音的相似度）
+            max_distance: 0 表示不同的那个音节只能是同音字（声调、平翘舌等不同），1 表示还可以是近音字
+            occupied: 已被精确规则占用的位置（长度与 text 相同），这些位置不再参与
+
+        Returns:
+            互不重叠的 (start, end, 术语, 分类, 置信度) 列表，按起始位置排序
+        """
+        if not text or not self._terms:
+            return []
+
+        # 置信度 = 1 - 距离 / max(片段拼音长, 术语拼音长)，两者最多相差一个距离，
+        # 所以能达到阈值的候选必须满足 距离 <= slack * 片段拼音长，检索时据此提前剪掉
+        slack = (1.0 - min_confidence) / min_confidence if min_confidence > 0 else float("inf")
+        candidates = []
+        for run in _HAN_RUN.finditer(text):
+            run_start = run.start()
+            chars = run.group()
+            syllables = [self._syllable(ch) for ch in chars]
+            toned = [s[0] for s in syllables]
+            alternatives = [self._alternatives(toned_syllable, fuzzy, max_distance > 0)
+                            for toned_syllable, fuzzy in syllables]
+            # 前缀和：片段 [i, j) 的拼音总长为 lengths[j] - lengths[i]
+            lengths = [0]
+            for syllable in toned:
+                lengths.append(lengths[-1] + len(syllable))
+            run_len = len(chars)
+
+            for i in range(run_len):
+                start = run_start + i
+                if occupied is not None and occupied[start]:
+                    continue
+                limit = min(run_len, i + self._max_length)
+                if occupied is not None:
+                    # 片段不能越过已被精确规则占用的位置
+                    for j in range(i + 1, limit):
+                        if occupied[run_start + j]:
+                            limit = j
+                            break
+
+                # 文本里本来就是正确术语：占住位置，避免被更短的近音词拆开
+                exact_terms = ()
+                first_lengths = self._first_lengths.get(chars[i])
+                if first_lengths:
+                    exact_terms = [n for n in first_lengths if i + n <= limit and chars[i:i + n] in self._terms]
+                    for n in exact_terms:
+                        candidates.append((-2.0, -n, start, start + n, None, None))
+
+                for length, found in self._walk(toned, lengths, alternatives, i, limit, slack):
+                    if length in exact_terms:
+                        continue
+                    # 同一片段只有置信度最高的候选可能被选中
+                    span = lengths[i + length] - lengths[i]
+                    best = None
+                    for entry, distance in found:
+                        confidence = 1.0 - distance / max(span, entry[2])
+                        if confidence >= min_confidence and (best is None or (-confidence, entry) < best):
+                            best = (-confidence, entry)
+                    if best is not None:
+                        term, category, _ = best[1]
+                        candidates.append((best[0], -length, start, start + length, term, category))
+
+        # 置信度高的优先，其次长词优先
+        candidates.sort()
+        taken = bytearray(len(text)) if occupied is None else bytearray(occupied)
+        results = []
+        for neg_confidence, _, start, end, term, category in candidates:
+            if any(taken[start:end]):
+                continue
+            taken[start:end] = b"\x01" * (end - start)
+            if term is not None:
+                results.append((start, end, term, category, round(-neg_confidence, 3)))
+
+        results.sort()
+        return results
+
+    def _replace_first(self, near: Dict[str, int], far: Dict[str, int], toned: List[str], j: int, limit: int,
+                       allowed_next: float, reach: float, carried: List[Tuple[Tuple[str, str, int], int]],
+                       ahead: List[Tuple[Dict, int]]) -> None:
+        """
+        在第一个音节 j 处替换：两字术语直接放进下一个片段的候选 carried，
+        更长的术语用“后两个音节”的倒排表找到第二层节点放进 ahead，不必为每个分支单独建路径
+        """
+        pair_ends = self._trie.get(self._PAIR_ENDS)
+        if pair_ends is not None and allowed_next >= 1:
+            bucket = pair_ends.get(toned[j + 1])
+            if bucket:
+                for others in ((near, far) if allowed_next >= 2 else (near,)):
+                    for other in bucket.keys() & others.keys():
+                        if others[other] <= allowed_next:
+                            carried.append((bucket[other], others[other]))
+        pairs = self._trie.get(self._PAIRS)
+        if pairs is not None and j + 2 < limit:
+            bucket = pairs.get(toned[j + 1])
+            bucket = bucket.get(toned[j + 2]) if bucket is not None else None
+            if bucket:
+                for others in ((near, far) if reach >= 2 else (near,)):
+                    for other in bucket.keys() & others.keys():
+                        if others[other] <= reach:
+                            ahead.append((bucket[other], others[other]))
+
+    def _replace_far(self, branches: Dict, far: Dict[str, int], toned: List[str], j: int, limit: int,
+                     reach: float, allowed_next: float, replaced: List[Tuple[Dict, int]]) -> None:
+        """
+        在位置 j 替换成编辑距离不小于 2 的音节，把走得通的路径加入 replaced
+
+        距离大的候选要更长的片段才可能达到阈值：片段到下一个字还不够长时，路径必须还能再接一个字。
+        """
+        following = toned[j + 2] if j + 2 < limit else None
+        for other in branches.keys() & far.keys():
+            distance = far[other]
+            if distance > reach:
+                continue
+            child = branches[other]
+            if distance > allowed_next:
+                grandchild = child.get(toned[j + 1])
+                if following is None or grandchild is None or following not in grandchild:
+                    continue
+            replaced.append((child, distance))
+
+    def _walk(self, toned: List[str], lengths: List[int],
+              alternatives: List[Tuple[Dict[str, int], Dict[str, int]]], start: int, limit: int,
+              slack: float) -> List[Tuple[int, List[Tuple[Tuple[str, str, int], int]]]]:
+        """
+        从 start 沿前缀树向后走，返回各片段的候选 [(片段字数, [(术语, 不同那个音节的编辑距离)])]
+
+        精确路径每走一步，都把当前音节的替换候选与节点的分支求交，分出“已替换”路径；
+        已替换的路径只能继续精确匹配。编辑距离超过 slack * 片段拼音长的候选不可能达到置信度阈值，直接跳过。
+        某个片段有读音完全相同的术语时，只返回这一个候选。
+        """
+        ends_key, skips_key = self._ENDS, self._SKIPS
+        node = self._trie
+        replaced: List[Tuple[Dict, int]] = []  # 已替换过一个音节的路径：(节点, 该音节的编辑距离)
+        ahead: List[Tuple[Dict, int]] = []  # 替换第一个音节后已经多走了一个音节的路径
+        carried: List[Tuple[Tuple[str, str, int], int]] = []  # 替换第一个音节得到的两字候选
+        base = lengths[start]
+        # 最长片段允许的编辑距离，已替换的路径不可能超过它
+        reach = slack * (lengths[limit] - base)
+        windows = []
+        for j in range(start, limit):
+            syllable = toned[j]
+            allowed = slack * (lengths[j + 1] - base)
+            found = carried
+            carried = []
+            if replaced:
+                advanced = []
+                for nd, distance in replaced:
+                    if distance <= allowed:
+                        ends = nd.get(ends_key)
+                        if ends is not None and syllable in ends:
+                            found.append((ends[syllable], distance))
+                    child = nd.get(syllable)
+                    if child is not None:
+                        advanced.append((child, distance))
+                replaced = advanced
+            if ahead:
+                replaced.extend(ahead)
+                ahead = []
+
+            if node is not None:
+                ends = node.get(ends_key)
+                exact = ends.get(syllable) if ends is not None else None
+                if exact is not None:
+                    found = [(exact, 0)]
+                if reach >= 1:
+                    near, far = alternatives[j]
+                    if exact is None and ends is not None and allowed >= 1:
+                        # 在最后一个音节处替换
+                        for others in ((near, far) if allowed >= 2 else (near,)):
+                            for other in ends.keys() & others.keys():
+                                if others[other] <= allowed:
+                                    found.append((ends[other], others[other]))
+                    if j + 1 < limit:
+                        allowed_next = slack * (lengths[j + 2] - base)
+                        if j == start:
+                            self._replace_first(near, far, toned, j, limit, allowed_next, reach, carried, ahead)
+                        else:
+                            skips = node.get(skips_key)
+                            branches = skips.get(toned[j + 1]) if skips is not None else node
+                            if branches:
+                                for other in branches.keys() & near.keys():
+                                    replaced.append((branches[other], 1))
+                                if reach >= 2:
+                                    self._replace_far(branches, far, toned, j, limit, reach, allowed_next, replaced)
+                node = node.get(syllable)
+
+            if found:
+                windows.append((j + 1 - start, found))
+            if node is None and not replaced and not ahead and not carried:
+                break
+        return windows
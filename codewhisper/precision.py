@@ -0,0 +1,116 @@
+"""
+推理精度 - CPU 上的 FP32 / 动态 int8 量化 / bfloat16 自动混合精度
+
+- fp32：默认，与 openai-whisper 在 CPU 上的行为一致
+- int8：对编码器和解码器的全部 Linear 层做动态量化（权重 int8，激活在运行时量化），
+  权重内存约为 FP32 的 1/4，矩阵乘法走 int8 内核
+- bf16：推理时开启 torch.autocast(bfloat16)，权重保持 FP32；需要 CPU 支持 bf16 指令（AVX512-BF16 / AMX 等）
+
+GPU 上 openai-whisper 自动使用 fp16，这里的选项只影响 CPU。
+"""
+
+import contextlib
+import os
+from typing import Optional
+
+from .console import debug, warn
+
+PRECISIONS = ("fp32", "int8", "bf16")
+DEFAULT_PRECISION = "fp32"
+
+
+def normalize_precision(precision: Optional[str]) -> str:
+    """校验精度名称；为 None 时读取环境变量 CODEWHISPER_PRECISION，默认 fp32"""
+    precision = (precision or os.environ.get("CODEWHISPER_PRECISION") or DEFAULT_PRECISION).strip().lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"不支持的推理精度: {precision}（可选: {', '.join(PRECISIONS)}）")
+    return precision
+
+
+def bf16_supported() -> bool:
+    """CPU 是否有原生 bf16 计算支持（没有时 autocast 反而更慢）"""
+    import torch
+
+    try:
+        return bool(torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def int8_supported() -> bool:
+    """当前 torch 是否带有可用的量化内核（fbgemm / x86 / qnnpack）"""
+    import torch
+
+    engines = [engine for engine in torch.backends.quantized.supported_engines if engine != "none"]
+    return bool(engines)
+
+
+def resolve_precision(precision: Optional[str], device: str) -> str:
+    """
+    确定实际使用的精度：非 CPU 设备固定走 openai-whisper 的默认行为（记为 fp32），
+    CPU 不支持所选精度时回退到 fp32
+    """
+    precision = normalize_precision(precision)
+    if precision == "fp32":
+        return precision
+    if device != "cpu":
+        debug(f"推理精度 {precision} 只作用于 CPU，{device} 上使用默认精度")
+        return "fp32"
+    if precision == "bf16" and not bf16_supported():
+        warn("⚠️ 当前 CPU 不支持 bf16 计算，回退到 FP32")
+        return "fp32"
+    if precision == "int8" and not int8_supported():
+        warn("⚠️ 当前 torch 没有可用的量化内核，回退到 FP32")
+        return "fp32"
+    return precision
+
+
+def apply_precision(model, precision: str):
+    """
+    按精度改造模型（原地修改并返回）
+
+    int8：Whisper 的 Linear 是 nn.Linear 的子类（只重写了 forward 里的类型转换），
+    动态量化只识别 nn.Linear 本身，所以先把类换回 nn.Linear（不复制权重）再量化。
+    bf16：编码器输出转回 FP32，whisper 解码时会校验音频特征的类型（fp16=False 时必须为 float32）。
+    """
+    import torch
+
+    if precision == "int8":
+        from whisper.model import Linear as WhisperLinear
+
+        for module in model.modules():
+            if type(module) is WhisperLinear:
+                module.__class__ = torch.nn.Linear
+        torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    elif precision == "bf16":
+        model.encoder.register_forward_hook(lambda module, inputs, output: output.float())
+    return model
+
+
+def inference_context(precision: str):
+    """推理时需要进入的上下文：bf16 为 CPU autocast，其他精度不需要（autocast 是线程局部的，每次调用时进入）"""
+    if precision != "bf16":
+        return contextlib.nullcontext()
+    import torch
+    return torch.autocast("cpu", dtype=torch.bfloat16)
+
+
+def model_memory_bytes(model) -> int:
+    """模型权重占用的字节数：参数、缓冲区，以及量化 Linear 打包后的 int8 权重"""
+    import torch
+
+    total = 0
+    seen = set()
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        if tensor.is_sparse or id(tensor) in seen:
+            continue
+        seen.add(id(tensor))
+        total += tensor.numel() * tensor.element_size()
+
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            weight, bias = module._packed_params._weight_bias()
+            total += weight.numel() * weight.element_size()
+            if bias is not None:
+                total += bias.numel() * bias.element_size()
+    return total
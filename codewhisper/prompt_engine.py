@@ -4,6 +4,7 @@ Prompt Engine - 可配置、可扩展、能持续学习用户习惯的个性化
 
 import json
 import os
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional, Set
 from pathlib import Path
@@ -37,6 +38,9 @@ class PromptEngine:
         self.config_path = Path(config_path)
         self.config = self._load_config()
 
+        # 用户术语库会被转录线程合并、被提示词构建读取，统一加锁
+        self._lock = threading.RLock()
+
         # 加载通用术语库和用户术语库
         self.base_dict = self._load_base_dict()
         self.user_dict = self._load_user_dict()
@@ -133,10 +137,11 @@ class PromptEngine:
 
         # 2. 从 user_dict 取高频个性化术语
         # 过滤出 freq >= min_freq 的术语
-        qualified_user_terms = [
-            term for term in self.user_dict
-            if term.get("freq", 0) >= min_freq
-        ]
+        with self._lock:
+            qualified_user_terms = [
+                dict(term) for term in self.user_dict
+                if term.get("freq", 0) >= min_freq
+            ]
 
         # 按 freq DESC, last_used DESC 排序
         sorted_user_terms = sorted(
@@ -184,31 +189,39 @@ class PromptEngine:
         if not detected_terms:
             return
 
+        self.merge_user_term_counts({term: 1 for term in detected_terms})
+
+    def merge_user_term_counts(self, term_counts: Dict[str, int]):
+        """
+        批量更新用户术语库：一次合并多次转录检测到的术语，只写一次盘
+
+        Args:
+            term_counts: 术语 → 本批次中出现在多少次转录里
+        """
+        if not term_counts:
+            return
+
         current_time = datetime.now().isoformat()
-        updated = False
-
-        for term in detected_terms:
-            # 查找该术语是否已存在
-            existing_term = next(
-                (t for t in self.user_dict if t["term"] == term),
-                None
-            )
-
-            if existing_term:
-                # 已存在，更新频次和最后使用时间
-                existing_term["freq"] += 1
-                existing_term["last_used"] = current_time
-                updated = True
-            else:
-                # 不存在，添加新术语
-                self.user_dict.append({
-                    "term": term,
-                    "freq": 1,
-                    "last_used": current_time
-                })
-                updated = True
-
-        if updated:
+
+        with self._lock:
+            index = {t["term"]: t for t in self.user_dict}
+            for term, count in term_counts.items():
+                existing_term = index.get(term)
+
+                if existing_term:
+                    # 已存在，更新频次和最后使用时间
+                    existing_term["freq"] += count
+                    existing_term["last_used"] = current_time
+                else:
+                    # 不存在，添加新术语
+                    new_term = {
+                        "term": term,
+                        "freq": count,
+                        "last_used": current_time
+                    }
+                    self.user_dict.append(new_term)
+                    index[term] = new_term
+
             # 维护用户术语库（淘汰低频词）
             self._maintain_user_dict()
             # 保存到文件
@@ -244,14 +257,16 @@ class PromptEngine:
     def get_stats(self) -> Dict:
         """获取统计信息"""
         min_freq = self.config.get("user_term_min_freq", 3)
-        qualified_terms = [
-            term for term in self.user_dict
-            if term.get("freq", 0) >= min_freq
-        ]
+        with self._lock:
+            user_terms_count = len(self.user_dict)
+            qualified_terms = [
+                term for term in self.user_dict
+                if term.get("freq", 0) >= min_freq
+            ]
 
         return {
             "base_terms_count": len(self.base_dict),
-            "user_terms_count": len(self.user_dict),
+            "user_terms_count": user_terms_count,
             "qualified_user_terms": len(qualified_terms),
             "current_prompt": self.build_prompt()
         }
@@ -0,0 +1,83 @@
+"""
+请求上下文 - 单次转录的修正记录、统计和学到的术语，让同一个模型可以被多个线程同时调用
+"""
+
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+
+@dataclass
+class RequestContext:
+    """
+    单次转录请求的私有状态
+
+    共享部分（模型、编译好的字典、提示词快照）只读不写；
+    每次请求产生的修正记录、统计和术语都记在这里，请求之间互不干扰。
+    """
+    prompt: Optional[str] = None
+    profile: Optional[str] = None
+    tenant: Optional[str] = None
+    corrections: List[Dict] = field(default_factory=list)
+    detected_terms: Set[str] = field(default_factory=set)
+    stats: Dict = field(default_factory=lambda: {"replacements_made": 0})
+
+    def add_corrections(self, corrections: List[Dict]) -> None:
+        """记录一批修正"""
+        self.corrections.extend(corrections)
+        self.stats["replacements_made"] += len(corrections)
+
+
+class LearnedTermsBuffer:
+    """
+    学到的术语的批量合并缓冲
+
+    转录线程只往队列里追加本次请求的术语集合（deque.append 是原子操作，不需要加锁）；
+    合并时用非阻塞的方式抢锁，抢到的线程把积累的所有请求一次性并入用户术语库并只写一次盘，
+    没抢到的线程直接返回，它的术语会由正在合并的线程或下一次合并带走。
+    """
+
+    def __init__(self, merge: Callable[[Dict[str, int]], None]):
+        """
+        Args:
+            merge: 合并回调，参数为 术语 → 出现在多少次请求中
+        """
+        self._merge = merge
+        self._pending: deque = deque()
+        self._flush_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, terms: Iterable[str]) -> None:
+        """登记一次请求检测到的术语"""
+        terms = frozenset(terms)
+        if terms:
+            self._pending.append(terms)
+
+    def flush(self, block: bool = False) -> int:
+        """
+        合并积累的术语
+
+        Args:
+            block: 是否等待正在进行的合并结束（默认不等待，适合在转录线程里调用）
+
+        Returns:
+            本次合并的请求数；其他线程正在合并时直接返回 0
+        """
+        merged = 0
+        while self._pending:
+            if not self._flush_lock.acquire(blocking=block):
+                break
+            try:
+                counts: Counter = Counter()
+                while self._pending:
+                    counts.update(self._pending.popleft())
+                    merged += 1
+                if counts:
+                    self._merge(dict(counts))
+            finally:
+                self._flush_lock.release()
+            # 释放锁之前其他线程追加、但没抢到锁的术语，在下一轮循环里带走
+        return merged
@@ -0,0 +1,128 @@
+"""
+启动耗时报告 - 基于 python -X importtime 的导入耗时分解，以及字典/模型加载各阶段耗时
+
+用法：
+    python -m codewhisper.startup_report                       # 导入 codewhisper.transcriber 的耗时分解
+    python -m codewhisper.startup_report --module gui.mac_menu_bar_app --top 30
+    python -m codewhisper.startup_report --model tiny          # 追加构造 CodeWhisper 的各阶段耗时
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from .utils import get_project_root
+
+# -X importtime 输出行：import time: self [us] | cumulative | imported package
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_imports(module: str) -> Dict:
+    """
+    在全新的子进程里导入模块，解析 -X importtime 输出
+
+    Returns:
+        {"module", "wall_ms", "total_ms", "imports": [{"name", "self_ms", "cumulative_ms", "depth"}, ...]}
+    """
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=get_project_root(), capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    imports = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append({
+                "name": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": (len(indent) - 1) // 2,
+            })
+
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"导入 {module} 失败:\n" + "\n".join(errors[-10:]))
+
+    return {
+        "module": module,
+        "wall_ms": round(wall_ms, 1),
+        "total_ms": round(sum(item["self_ms"] for item in imports), 1),
+        "imports": imports,
+    }
+
+
+def summarize_packages(imports: List[Dict]) -> List[Dict]:
+    """按顶层包汇总自身耗时（如 torch、whisper、numpy），降序"""
+    totals: Dict[str, float] = defaultdict(float)
+    counts: Dict[str, int] = defaultdict(int)
+    for item in imports:
+        package = item["name"].split(".")[0]
+        totals[package] += item["self_ms"]
+        counts[package] += 1
+    return sorted(
+        ({"package": package, "self_ms": round(ms, 1), "modules": counts[package]} for package, ms in totals.items()),
+        key=lambda row: row["self_ms"], reverse=True,
+    )
+
+
+def measure_startup(model_name: str) -> Dict:
+    """构造 CodeWhisper（后台加载模型），记录界面可用时间与模型就绪时间"""
+    from .transcriber import CodeWhisper
+
+    started = time.perf_counter()
+    whisper = CodeWhisper(model_name=model_name, background_load=True)
+    constructed = time.perf_counter() - started
+    whisper.wait_until_ready()
+    ready = time.perf_counter() - started
+    return {
+        "time_to_ui_ms": round(constructed * 1000, 1),
+        "time_to_ready_ms": round(ready * 1000, 1),
+        "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in whisper.startup_times.items()},
+    }
+
+
+def print_report(imports: Dict, startup: Optional[Dict], top: int) -> None:
+    print(f"导入 {imports['module']}: 子进程总耗时 {imports['wall_ms']:.0f} ms，导入合计 {imports['total_ms']:.0f} ms")
+
+    print("\n按顶层包（自身耗时）:")
+    for row in summarize_packages(imports["imports"])[:top]:
+        print(f"  {row['self_ms']:>9.1f} ms  {row['package']} ({row['modules']} 个模块)")
+
+    print(f"\n累计耗时最高的 {top} 个导入:")
+    for item in sorted(imports["imports"], key=lambda x: x["cumulative_ms"], reverse=True)[:top]:
+        print(f"  {item['cumulative_ms']:>9.1f} ms  (自身 {item['self_ms']:>7.1f} ms)  {'  ' * item['depth']}{item['name']}")
+
+    if startup:
+        print(f"\n构造 CodeWhisper: 界面可用 {startup['time_to_ui_ms']:.0f} ms，模型就绪 {startup['time_to_ready_ms']:.0f} ms")
+        for name, ms in startup["phases_ms"].items():
+            print(f"  {ms:>9.1f} ms  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CodeWhisper 启动耗时报告")
+    parser.add_argument("--module", default="codewhisper.transcriber", help="要测量导入耗时的模块")
+    parser.add_argument("--top", type=int, default=20, help="列出的条目数")
+    parser.add_argument("--model", help="同时测量构造 CodeWhisper 并加载该模型的各阶段耗时")
+    parser.add_argument("--json", dest="json_path", help="把完整结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    imports = measure_imports(args.module)
+    startup = measure_startup(args.model) if args.model else None
+    print_report(imports, startup, args.top)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"imports": imports, "startup": startup}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
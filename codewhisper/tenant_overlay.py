@@ -0,0 +1,107 @@
+"""
+租户覆盖层 - 多个用户共用一份只读主字典，每个用户只额外保存自己的少量术语
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .term_matcher import TermMatcher, fold_text
+
+
+class TenantOverlay:
+    """
+    单个租户（用户）的私有规则
+
+    只保存该用户自己添加的变体，编译成一个很小的自动机；查找时作为最高优先级的匹配源
+    放在共享匹配源之前，与主字典的结果一起挑选。主字典的自动机、规则表完全共享，不做任何复制。
+
+    编辑时重建小自动机并整体替换快照（写时复制），正在转录的线程拿到的始终是一致的旧快照。
+    """
+
+    __slots__ = ("tenant_id", "_rules", "_source", "_masked_cache", "_lock")
+
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+        self._rules: Dict[str, Dict] = {}  # 折叠后变体 → 规则
+        self._source: Optional[Tuple] = None  # (自动机, 模式编号 → 规则, 屏蔽的模式编号)，没有规则时为 None
+        self._masked_cache: Dict[Tuple, Tuple] = {}  # (包含的分类, 排除的分类) → (快照, 屏蔽后的匹配源)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def __contains__(self, wrong: str) -> bool:
+        return fold_text(wrong) in self._rules
+
+    def set_rule(self, rule: Dict) -> bool:
+        """
+        新增或替换一条规则
+
+        Returns:
+            规则是否发生了变化
+        """
+        key = fold_text(rule["variant"])
+        with self._lock:
+            current = self._rules.get(key)
+            if current is not None and (current["correct"], current["category"]) == (rule["correct"], rule["category"]):
+                return False
+            rules = dict(self._rules)
+            rules[key] = rule
+            self._publish(rules)
+            return True
+
+    def remove_rule(self, wrong: str) -> bool:
+        """删除一个变体，返回是否删除了规则"""
+        key = fold_text(wrong)
+        with self._lock:
+            if key not in self._rules:
+                return False
+            rules = dict(self._rules)
+            del rules[key]
+            self._publish(rules)
+            return True
+
+    def rules(self) -> List[Dict]:
+        """该租户的全部规则（按长度降序）"""
+        return sorted(self._rules.values(), key=lambda rule: rule["wrong_len"], reverse=True)
+
+    def source(self, include: Optional[frozenset] = None, exclude: frozenset = frozenset()) -> Optional[Tuple]:
+        """
+        获取匹配源快照，按纠错档案的分类屏蔽对应的模式编号
+
+        Args:
+            include: 只启用的分类，为 None 时表示全部
+            exclude: 停用的分类
+
+        Returns:
+            (自动机, 模式编号 → 规则, 屏蔽的模式编号)；没有规则时返回 None
+        """
+        source = self._source
+        if source is None or (include is None and not exclude):
+            return source
+
+        cache_key = (include, exclude)
+        cached = self._masked_cache.get(cache_key)
+        if cached is not None and cached[0] is source:
+            return cached[1]
+
+        matcher, pattern_rules, _ = source
+        masked_ids = frozenset(
+            pattern_id for pattern_id, rule in enumerate(pattern_rules)
+            if (include is not None and rule["category"] not in include) or rule["category"] in exclude
+        )
+        masked = (matcher, pattern_rules, masked_ids)
+        self._masked_cache[cache_key] = (source, masked)
+        return masked
+
+    def _publish(self, rules: Dict[str, Dict]) -> None:
+        """重建小自动机并整体替换快照"""
+        if rules:
+            ordered = sorted(rules.items(), key=lambda item: len(item[0]), reverse=True)
+            matcher = TermMatcher(key for key, _ in ordered)
+            pattern_rules = [rule for _, rule in ordered]
+            self._source = (matcher, pattern_rules, frozenset())
+        else:
+            self._source = None
+        self._rules = rules
+        self._masked_cache = {}
@@ -0,0 +1,153 @@
+"""
+术语匹配自动机 - 基于 Aho-Corasick 的多模式单遍扫描匹配
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+def fold_text(text: str) -> str:
+    """
+    大小写折叠，保证折叠前后长度一致（下标可直接映射回原文）
+
+    绝大多数字符 lower() 后长度不变，直接整体 lower()；
+    极少数字符（如 "İ"）lower() 后会变长，此时逐字符折叠并保留原字符。
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+
+
+def is_ascii_alnum(ch: str) -> bool:
+    """判断字符是否为 ASCII 字母或数字（用于短词边界判断）"""
+    return ch.isascii() and ch.isalnum()
+
+
+class TermMatcher:
+    """
+    Aho-Corasick 多模式匹配自动机
+
+    所有模式在加入时做大小写折叠，扫描时对折叠后的文本只走一遍，
+    一次性找出全部（可重叠的）命中，复杂度与文本长度和命中数成线性。
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._keys: List[str] = []
+        self._lengths: List[int] = []
+        self._index: Dict[str, int] = {}
+        self._built = True
+
+        for pattern in patterns:
+            self.add(pattern)
+        self.build()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, pattern: str) -> bool:
+        return fold_text(pattern) in self._index
+
+    def add(self, pattern: str) -> int:
+        """
+        加入一个模式，返回模式编号（相同折叠形式的模式共享同一个编号）
+
+        加入后需要调用 build() 才能参与匹配。
+        """
+        key = fold_text(pattern)
+        if not key:
+            raise ValueError("匹配模式不能为空")
+        if key in self._index:
+            return self._index[key]
+
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+
+        pattern_id = len(self._keys)
+        self._keys.append(key)
+        self._lengths.append(len(key))
+        self._index[key] = pattern_id
+        self._built = False
+        return pattern_id
+
+    def pattern_id(self, pattern: str) -> int:
+        """获取模式编号，不存在时返回 -1"""
+        return self._index.get(fold_text(pattern), -1)
+
+    def key(self, pattern_id: int) -> str:
+        """获取模式编号对应的折叠文本"""
+        return self._keys[pattern_id]
+
+    def keys(self) -> List[str]:
+        """全部模式的折叠文本（下标即模式编号）"""
+        return list(self._keys)
+
+    def build(self) -> None:
+        """按 BFS 计算失败指针，并把后缀节点的输出合并到当前节点"""
+        if self._built:
+            return
+
+        # 重新计算前先只保留每个节点自身的输出
+        own_out: List[Tuple[int, ...]] = [()] * len(self._goto)
+        for pattern_id, key in enumerate(self._keys):
+            node = 0
+            for ch in key:
+                node = self._goto[node][ch]
+            own_out[node] = own_out[node] + (pattern_id,)
+
+        self._fail = [0] * len(self._goto)
+        self._out = own_out
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                # 第一层节点的失败指针固定指向根
+                self._fail[child] = target if target != child else 0
+                if self._out[self._fail[child]]:
+                    self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+        self._built = True
+
+    def iter_matches(self, folded_text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        扫描已折叠的文本，产出所有命中
+
+        Args:
+            folded_text: 经 fold_text() 折叠后的文本
+
+        Yields:
+            (start, end, pattern_id)，按结束位置递增
+        """
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        lengths = self._lengths
+
+        node = 0
+        for i, ch in enumerate(folded_text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                end = i + 1
+                for pattern_id in out[node]:
+                    yield end - lengths[pattern_id], end, pattern_id
@@ -0,0 +1,234 @@
+"""
+推理线程配置 - 首次启动时做一次短校准，为本机和并发进程数选出 torch 线程数，结果缓存复用
+
+torch 默认把 intra-op 线程数设为全部核数，多个推理进程（或推理与录音回调、界面线程）同时运行时
+会严重超额订阅；而 Whisper 的矩阵在线程数增加到一定程度后就不再变快。这里在每个进程可用的核数
+范围内测一遍 Transformer MLP 形状的矩阵乘法，选出达到最快速度 95% 的最少线程数。
+
+优先级：环境变量 CODEWHISPER_THREADS（每个进程的 intra-op 线程数）> OMP_NUM_THREADS > 缓存 > 校准。
+CODEWHISPER_THREAD_TUNING=0 时不做任何设置（保持 torch 默认值）。
+"""
+
+import json
+import os
+import platform
+import time
+from typing import Dict, List, Optional
+
+from .console import debug, info, warn
+
+try:
+    from threadpoolctl import ThreadpoolController
+    THREADPOOLCTL_AVAILABLE = True
+except ImportError:
+    THREADPOOLCTL_AVAILABLE = False
+
+# 缓存格式版本，校准方法变化时递增
+TUNING_VERSION = 1
+
+# 各模型编码器的宽度，校准用同样宽度的矩阵
+_MODEL_WIDTHS = {"tiny": 384, "base": 512, "small": 768, "medium": 1024, "large": 1280, "turbo": 1280}
+
+# 比最快配置慢不超过该比例时，取线程更少的配置
+_TOLERANCE = 0.05
+
+# 每个候选配置的计时轮数（取最快的一轮）
+_ROUNDS = 3
+
+
+def available_cpus() -> int:
+    """当前进程可用的 CPU 数（考虑容器 / taskset 的亲和性限制）"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        return os.cpu_count() or 1
+
+
+def tuning_enabled() -> bool:
+    return os.environ.get("CODEWHISPER_THREAD_TUNING", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def default_cache_file() -> str:
+    root = os.environ.get("CODEWHISPER_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "codewhisper"
+    )
+    return os.path.join(root, "thread_config.json")
+
+
+def candidate_threads(budget: int) -> List[int]:
+    """候选线程数：1、2、4 …（2 的幂）以及预算本身"""
+    candidates = []
+    threads = 1
+    while threads < budget:
+        candidates.append(threads)
+        threads *= 2
+    candidates.append(budget)
+    return candidates
+
+
+def calibrate(budget: int, width: int = 1024, min_seconds: float = 0.2) -> Dict:
+    """
+    在 1 ~ budget 个 intra-op 线程下计时一个编码器 MLP 块（1500 帧 × width → 4·width → width）
+
+    Returns:
+        {"intra_op": 选中的线程数, "timings_ms": {线程数: 每次耗时}}
+    """
+    import torch
+
+    original = torch.get_num_threads()
+    x = torch.randn(1500, width)
+    w1 = torch.randn(width, 4 * width) / width ** 0.5
+    w2 = torch.randn(4 * width, width) / (4 * width) ** 0.5
+
+    def block():
+        return torch.nn.functional.gelu(x @ w1) @ w2
+
+    timings: Dict[int, float] = {}
+    try:
+        with torch.inference_mode():
+            for threads in candidate_threads(budget):
+                torch.set_num_threads(threads)
+                block()  # 预热：线程池创建、内存分配
+                best = float("inf")
+                for _ in range(_ROUNDS):
+                    runs, started = 0, time.perf_counter()
+                    while True:
+                        block()
+                        runs += 1
+                        elapsed = time.perf_counter() - started
+                        if elapsed >= min_seconds / _ROUNDS:
+                            break
+                    best = min(best, elapsed / runs)
+                timings[threads] = best * 1000
+    finally:
+        torch.set_num_threads(original)
+
+    fastest = min(timings.values())
+    chosen = min(threads for threads, ms in timings.items() if ms <= fastest * (1 + _TOLERANCE))
+    return {"intra_op": chosen, "timings_ms": {str(t): round(ms, 2) for t, ms in timings.items()}}
+
+
+def _host_fingerprint() -> Dict:
+    import torch
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": available_cpus(),
+        "torch": torch.__version__,
+    }
+
+
+def resolve_thread_config(model_name: str = "medium", workers: int = 1, cache_file: Optional[str] = None,
+                          recalibrate: bool = False) -> Optional[Dict]:
+    """
+    确定每个推理进程的线程配置：环境变量指定时直接使用，否则读缓存，缓存缺失或主机变化时校准并写回
+
+    Args:
+        model_name: 模型名（决定校准矩阵的宽度）
+        workers: 本机同时运行的推理进程数，每个进程最多分到 可用核数 / workers 个线程
+        cache_file: 校准结果缓存文件，默认 ~/.cache/codewhisper/thread_config.json
+        recalibrate: 忽略缓存重新校准
+
+    Returns:
+        {"intra_op", "inter_op", "source", ...}；关闭调优时返回 None
+    """
+    if not tuning_enabled():
+        return None
+    workers = max(1, workers)
+    budget = max(1, available_cpus() // workers)
+
+    for env_name in ("CODEWHISPER_THREADS", "OMP_NUM_THREADS"):
+        value = os.environ.get(env_name, "").strip()
+        if value.isdigit() and int(value) > 0:
+            return {"intra_op": int(value), "inter_op": 1, "source": env_name}
+
+    width = _MODEL_WIDTHS.get(os.path.basename(model_name).split(".")[0].split("-")[0], 1024)
+    key = f"workers={workers},width={width}"
+    cache_file = cache_file or default_cache_file()
+    fingerprint = _host_fingerprint()
+
+    cache: Dict = {}
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if cache.get("version") != TUNING_VERSION or cache.get("host") != fingerprint:
+        cache = {"version": TUNING_VERSION, "host": fingerprint, "configs": {}}
+
+    config = cache["configs"].get(key)
+    if config is not None and not recalibrate:
+        return dict(config, source="cache")
+
+    info(f"⚙️ 首次启动，校准推理线程数（{workers} 个进程，每个最多 {budget} 线程）...")
+    started = time.perf_counter()
+    result = calibrate(budget, width)
+    # Whisper 的推理图是顺序执行的，inter-op 并行没有收益，只会多占线程
+    config = {"intra_op": result["intra_op"], "inter_op": 1, "budget": budget, "timings_ms": result["timings_ms"]}
+    debug(f"  线程校准耗时 {time.perf_counter() - started:.1f}s: {result['timings_ms']}")
+
+    cache["configs"][key] = config
+    try:
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        tmp_path = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, cache_file)
+    except OSError as e:
+        warn(f"⚠️ 写入线程配置缓存失败: {e}")
+    return dict(config, source="calibrated")
+
+
+def apply_thread_config(config: Optional[Dict]) -> None:
+    """
+    应用线程配置（需在模型加载、首次推理之前调用）
+
+    NumPy 的 BLAS 线程池限制为 1（安装了 threadpoolctl 时）：音频预处理的向量运算很小，
+    多线程只会与 torch 的计算线程争抢核心。见 limit_numpy_blas。
+    """
+    if not config:
+        return
+    import torch
+
+    torch.set_num_threads(config["intra_op"])
+    try:
+        torch.set_num_interop_threads(config["inter_op"])
+    except RuntimeError:
+        # inter-op 线程池已经启动（本进程里已经跑过并行算子），只能保持现状
+        debug("inter-op 线程数已固定，跳过设置")
+    limit_numpy_blas()
+    info(f"⚙️ 推理线程: intra-op {config['intra_op']}，inter-op {config['inter_op']}（{config['source']}）")
+
+
+def limit_numpy_blas() -> int:
+    """
+    把 NumPy 自带的 BLAS 线程池限制为 1 个线程，返回限制的库数
+
+    线程池上限是按动态库设置的、对整个进程生效：torch 动态链接 MKL / OpenBLAS 时，
+    按 user_api="blas" 一刀切会把 torch 的矩阵乘法也限制成单线程，抵消校准出的 intra-op 线程数。
+    所以只限制位于 NumPy 安装目录里的库（wheel 自带的 numpy.libs / numpy/.dylibs）；
+    NumPy 使用系统或 conda 的 BLAS 时可能与 torch 共用同一个库，保持不变。
+    """
+    if not THREADPOOLCTL_AVAILABLE:
+        return 0
+    import numpy
+
+    # 前缀同时覆盖 .../numpy/.dylibs 和 .../numpy.libs
+    numpy_dir = os.path.dirname(os.path.realpath(numpy.__file__))
+    blas = ThreadpoolController().select(user_api="blas")
+    filepaths = [
+        controller.filepath for controller in blas.lib_controllers
+        if os.path.realpath(controller.filepath).startswith(numpy_dir)
+    ]
+    if not filepaths:
+        debug("NumPy 没有自带 BLAS（可能与 torch 共用），不限制其线程数")
+        return 0
+    blas.select(filepath=filepaths).limit(limits=1)
+    return len(filepaths)
+
+
+def configure_threads(model_name: str = "medium", workers: int = 1, recalibrate: bool = False) -> Optional[Dict]:
+    """确定并应用线程配置，返回生效的配置（关闭调优时为 None）"""
+    config = resolve_thread_config(model_name, workers, recalibrate=recalibrate)
+    apply_thread_config(config)
+    return config
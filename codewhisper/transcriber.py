@@ -1,71 +1,232 @@
 """
 转录引擎 - 基于 OpenAI Whisper 的转录核心
+
+whisper / torch 导入很重（数秒），只在加载模型和解码时才导入，导入本模块本身很快。
 """
 
-import whisper
-import torch
 import re
-from typing import Dict, Optional, Tuple, List
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple, List, Union
 
 import numpy as np
+from .audio_buffer import CHUNK_SECONDS, AudioBuffer
 from .dict_manager import DictionaryManager
 from .prompt_engine import PromptEngine
+from .request_context import LearnedTermsBuffer, RequestContext
 from .utils import convert_to_simplified_chinese, normalize_zh_punctuation
-from .console import info, debug
+from . import weight_cache
+from .thread_tuning import configure_threads
+from .vad import trim_silence
+from .precision import apply_precision, inference_context, model_memory_bytes, normalize_precision, resolve_precision
+from .console import info, debug, warn
 
 
 class CodeWhisper:
-    """主转录引擎"""
+    """
+    主转录引擎
+
+    模型、编译好的字典和提示词快照在请求之间共享且只读；
+    每次 transcribe 的修正记录、统计和学到的术语记在各自的 RequestContext 里，
+    学到的术语经 LearnedTermsBuffer 批量并回用户术语库，因此同一个实例可以被多个线程同时调用。
+    """
 
-    def __init__(self, model_name: str = "medium", dict_path: Optional[str] = None):
+    def __init__(self, model_name: str = "medium", dict_path: Optional[str] = None, watch_dict: bool = False,
+                 dict_layers: Optional[List[Dict]] = None, model=None, background_load: bool = False,
+                 warmup: Optional[bool] = None, precision: Optional[str] = None, workers: int = 1):
         """
          CodeWhisper 初始化，同时预加载字典的特定术语并将其构建为提示词喂给Whisper进行预热；模型默认medium
         Args:
             model_name: Whisper 模型 (tiny, base, small, medium, large)
             dict_path: 自定义字典路径，支持后续拓展todo
+            watch_dict: 是否监听字典文件，其他进程添加的术语无需重启即可生效（长驻的 GUI 进程建议开启）
+            dict_layers: 叠加在主字典之上的字典层（团队/个人/领域包），为 None 时读取配置中的 dict_layers
+            model: 已加载的 Whisper 模型（可选），传入时不再加载；工作进程池用它共享同一份权重
+            background_load: 是否在后台线程导入 torch、加载模型（构造函数只加载字典和提示词，立即返回）；
+                模型就绪前提交的转录会等待 ready，而不是失败
+            warmup: 模型加载后是否先跑一次空白音频解码，把首次推理的初始化开销提前付掉；
+                默认后台加载时开启、同步加载时关闭
+            precision: CPU 推理精度 fp32 / int8 / bf16，为 None 时读取配置 inference_precision
+                或环境变量 CODEWHISPER_PRECISION，默认 fp32；CPU 不支持时回退到 fp32
+            workers: 本机同时做推理的进程数。CPU 推理时按它分配核数，首次启动校准 torch 线程数并缓存，
+                在加载模型前生效（见 thread_tuning）
         """
         info(f"📦 Whisper 模型: {model_name}")
-
-        # 显式设定设备与精度：优先使用 NVIDIA CUDA，其次回退 CPU
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        info(f"🧠 推理设备: {self.device} (CPU 将使用 FP32)")
-
-        # openai-whisper 会在 CUDA 上自动使用 fp16，在 CPU 上用 fp32
-        self.model = whisper.load_model(model_name, device=self.device)
         self.model_name = model_name
-
-        debug("📚 加载字典管理器")
-        self.dict_manager = DictionaryManager(dict_path)
+        self.workers = workers
+        self.thread_config: Optional[Dict] = None
+        self.model = None
+        self.device: Optional[str] = None
+        # 启动各阶段耗时（秒），供 startup_report 输出
+        self.startup_times: Dict[str, float] = {}
+        # 模型就绪的 Future：结果为模型本身，加载失败时为异常
+        self.ready: Future = Future()
+        started = time.perf_counter()
 
         debug("🚀 加载智能提示词引擎")
         self.prompt_engine = PromptEngine()
 
-        # 使用新的 PromptEngine 构建提示词
+        debug("📚 加载字典管理器")
+        if dict_layers is None:
+            dict_layers = self.prompt_engine.config.get("dict_layers")
+        self.dict_manager = DictionaryManager(
+            dict_path,
+            layers=dict_layers,
+            profiles=self.prompt_engine.config.get("dict_profiles"),
+            profile=self.prompt_engine.config.get("dict_profile", "all"),
+        )
+        if watch_dict:
+            self.dict_manager.start_watching()
+
+        # 使用新的 PromptEngine 构建提示词（只整体替换引用，请求开始时各自取一份快照）
         self.programmer_prompt = self.prompt_engine.build_prompt()
+        self._learned_terms = LearnedTermsBuffer(self._merge_learned_terms)
         info(f"💡 当前提示词: {self.programmer_prompt}")
+        self.startup_times["dict_and_prompt"] = time.perf_counter() - started
+
+        # 请求的精度；模型加载后更新为实际生效的精度
+        self.precision = normalize_precision(precision or self.prompt_engine.config.get("inference_precision"))
+        self.model_memory_bytes = 0
+        # 累计推理统计：音频时长与推理耗时（秒），用于计算实时率
+        self._inference_lock = threading.Lock()
+        self._inference_stats = {"requests": 0, "audio_seconds": 0.0, "input_seconds": 0.0, "compute_seconds": 0.0}
+
+        if warmup is None:
+            warmup = background_load
+        if model is not None:
+            self.device = next(model.parameters()).device.type
+            self.model = self._prepare_model(model, self.device)
+            info(f"🧠 推理设备: {self.device}，精度 {self.precision} (使用已加载的模型)")
+            self.ready.set_result(self.model)
+        elif background_load:
+            threading.Thread(
+                target=self._load_model, args=(warmup,), name="cw-model-loader", daemon=True
+            ).start()
+            info("⏳ 模型在后台加载，完成前的录音会排队等待")
+            return
+        else:
+            self._load_model(warmup)
+            self.ready.result()  # 同步加载失败时直接抛出
 
         info("✅ CodeWhisper 初始化完成")
 
-    def _audio_level_stats(self, audio_file: str) -> Tuple[float, float, float]:
+    def _load_model(self, warmup: bool) -> None:
+        """导入 torch / whisper、加载模型并（可选）预热，结果写入 ready"""
+        try:
+            started = time.perf_counter()
+            import torch
+            import whisper
+            self.startup_times["import_torch_whisper"] = time.perf_counter() - started
+
+            # 显式设定设备与精度：优先使用 NVIDIA CUDA，其次回退 CPU
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            if device == "cpu":
+                # 线程数必须在第一次并行计算之前确定
+                started = time.perf_counter()
+                self.thread_config = configure_threads(self.model_name, self.workers)
+                self.startup_times["thread_tuning"] = time.perf_counter() - started
+
+            # openai-whisper 会在 CUDA 上自动使用 fp16，在 CPU 上用 fp32
+            started = time.perf_counter()
+            if weight_cache.cache_enabled():
+                # 首次加载时生成转换好的权重缓存，之后直接内存映射
+                model = weight_cache.load_model(self.model_name, device=device)
+            else:
+                model = whisper.load_model(self.model_name, device=device)
+            self.startup_times["model_load"] = time.perf_counter() - started
+            model = self._prepare_model(model, device)
+            info(f"🧠 推理设备: {device}，精度 {self.precision}，权重 {self.model_memory_bytes / 2**20:.0f} MB")
+
+            if warmup:
+                # 一次空白音频的解码：触发权重首次访问、内核选择等一次性开销
+                started = time.perf_counter()
+                with inference_context(self.precision):
+                    model.transcribe(
+                        np.zeros(whisper.audio.SAMPLE_RATE, dtype=np.float32),
+                        language="zh", verbose=None, temperature=0.0, fp16=(device == "cuda"),
+                    )
+                self.startup_times["warmup"] = time.perf_counter() - started
+
+            self.device = device
+            self.model = model
+        except BaseException as e:
+            warn(f"❌ 模型加载失败: {e}")
+            self.ready.set_exception(e)
+            return
+        info(f"✅ Whisper 模型已就绪（{sum(self.startup_times.values()):.1f}s）")
+        self.ready.set_result(model)
+
+    def _prepare_model(self, model, device: str):
+        """按配置的精度改造模型（int8 量化 / bf16 自动混合精度），记录实际精度与权重内存"""
+        self.precision = resolve_precision(self.precision, device)
+        if self.precision != "fp32":
+            started = time.perf_counter()
+            model = apply_precision(model, self.precision)
+            self.startup_times["precision"] = time.perf_counter() - started
+        self.model_memory_bytes = model_memory_bytes(model)
+        return model
+
+    def _record_inference(self, audio_seconds: float, compute_seconds: float, requests: int = 1,
+                          input_seconds: Optional[float] = None) -> None:
+        """
+        Args:
+            audio_seconds: 送进模型的音频时长（语音活动检测裁剪之后）
+            input_seconds: 裁剪前的原始时长，默认与 audio_seconds 相同
+        """
+        with self._inference_lock:
+            self._inference_stats["requests"] += requests
+            self._inference_stats["audio_seconds"] += audio_seconds
+            self._inference_stats["input_seconds"] += audio_seconds if input_seconds is None else input_seconds
+            self._inference_stats["compute_seconds"] += compute_seconds
+
+    def get_inference_stats(self) -> Dict:
+        """
+        推理统计：设备、实际精度、权重内存，以及累计的实时率（推理耗时 / 音频时长，越小越快，< 1 即快于实时）
+
+        只统计真正送进模型的音频（静音跳过的请求不计）：audio_seconds 为语音活动检测裁剪后的时长，
+        实时率按它计算；input_seconds 为裁剪前的原始时长。
         """
-        读取音频并计算强度统计信息，用于快速判断“几乎静音”的输入。
+        with self._inference_lock:
+            stats = dict(self._inference_stats)
+        audio_seconds = stats["audio_seconds"]
+        stats.update({
+            "device": self.device,
+            "precision": self.precision,
+            "model_memory_mb": round(self.model_memory_bytes / 2**20, 1),
+            "rtf": round(stats["compute_seconds"] / audio_seconds, 3) if audio_seconds else None,
+        })
+        return stats
+
+    def is_ready(self) -> bool:
+        """模型是否已加载完成（加载失败也返回 True，此时 ready.result() 会抛出异常）"""
+        return self.ready.done()
+
+    def wait_until_ready(self, timeout: Optional[float] = None):
+        """等待模型加载完成并返回模型；加载失败时抛出加载时的异常"""
+        return self.ready.result(timeout)
+
+    def _require_model(self):
+        if not self.ready.done():
+            info("⏳ 模型仍在加载，转录排队等待中...")
+        return self.ready.result()
+
+    def _audio_level_stats(self, audio: Union[AudioBuffer, str, np.ndarray]) -> Tuple[float, float, float]:
+        """
+        计算音频强度统计信息，用于快速判断“几乎静音”的输入。
+
+        Args:
+            audio: AudioBuffer（复用已缓存的统计）、音频文件路径或 16 kHz 单声道 float32 数组
 
         Returns:
             (duration_seconds, rms, peak)
         """
         try:
-            audio = whisper.load_audio(audio_file)
+            audio = AudioBuffer.from_input(audio)
         except Exception:
             # 读取失败时不做静音判定（避免误判直接跳过转录）
             return -1.0, 0.0, 0.0
-
-        if audio is None or len(audio) == 0:
-            return 0.0, 0.0, 0.0
-
-        duration_seconds = float(len(audio) / whisper.audio.SAMPLE_RATE)
-        rms = float(np.sqrt(np.mean(np.square(audio), dtype=np.float64)))
-        peak = float(np.max(np.abs(audio)))
-        return duration_seconds, rms, peak
+        return audio.level_stats
 
     def _looks_like_repetition_loop(self, text: str, max_repeat: int = 10) -> bool:
         """
@@ -185,7 +346,7 @@ class CodeWhisper:
 
         # 获取所有术语
         all_terms = set(self.prompt_engine.base_dict)
-        for term_info in self.prompt_engine.user_dict:
+        for term_info in list(self.prompt_engine.user_dict):
             all_terms.add(term_info.get("term", ""))
 
         # 检查清理后的文本是否全部由术语组成
@@ -198,7 +359,7 @@ class CodeWhisper:
 
     def transcribe(
         self,
-        audio_file: str,
+        audio_file: Union[AudioBuffer, str, np.ndarray, bytes, bytearray, memoryview],
         language: Optional[str] = "zh",
         fix_programmer_terms: bool = True,
         verbose: bool = True,
@@ -209,12 +370,17 @@ class CodeWhisper:
         *,
         use_initial_prompt: bool = True,
         learn_user_terms: bool = True,
+        context: Optional[RequestContext] = None,
+        profile: Optional[str] = None,
+        tenant: Optional[str] = None,
+        vad: Optional[bool] = None,
     ) -> Dict:
         """
         转录音频文件
 
         Args:
-            audio_file: 音频文件路径
+            audio_file: 音频文件路径、16 kHz 单声道 float32 音频（np.ndarray 或 float32 原始采样缓冲区），
+                或已有的 AudioBuffer。音频只解码一次，静音判断和 Whisper 共用同一个 AudioBuffer
             language: 语言代码 (默认zh中文模型)
             fix_programmer_terms: 是否修正程序员术语默认为True
             verbose: 是否打印详细信息 默认为True (打印输出状态、提示词加载、繁简转换、术语修正等步骤)
@@ -224,62 +390,273 @@ class CodeWhisper:
             silence_peak_threshold: 静音 Peak 阈值（越大越激进）
             use_initial_prompt: 是否把提示词喂给 Whisper（默认启用）。分块/低质量音频建议关闭以减少“提示词幻觉”。
             learn_user_terms: 是否根据本次转录结果更新用户术语库（默认启用）。分块转录建议关闭以避免频繁写盘。
-
+            context: 本次请求的上下文（可选），传入时修正记录和检测到的术语会记在其中，便于调用方汇总多次请求
+            profile: 本次使用的纠错档案（如 "student"），为 None 时使用配置中的 dict_profile
+            tenant: 租户（用户）标识，该用户通过 dict_manager.add_tenant_rule 添加的私有术语优先生效
+            vad: 是否先用语音活动检测剪掉首尾和中间的停顿再送入 Whisper（分段时间戳会还原到原始音频），
+                为 None 时读取配置 vad（默认关闭）
 
         Returns:
-            包含转录结果的字典
+            包含转录结果的字典，其中 corrections 为本次请求的修正记录；
+            字典启用了拼音模糊匹配（未开启自动改写）时，phonetic_candidates 为读音接近术语的待确认片段
         """
+        context = self._request_context(context, profile, tenant)
+
+        # 整个请求只解码一次：静音判断和 VAD 共用 AudioBuffer 上缓存的强度统计与分帧能量
+        # （梅尔谱由 whisper.transcribe 内部计算，只有批量转录才用 AudioBuffer 缓存的梅尔谱）
+        audio = AudioBuffer.from_input(audio_file)
         if verbose:
-            debug(f"🎙️ 转录中 {audio_file} (语言: {language})")
+            debug(f"🎙️ 转录中 {audio} (语言: {language})")
 
         # 快速静音判断：避免静音输入触发 Whisper 产生“重复幻觉”
         if hallucination_filter:
-            duration_seconds, rms, peak = self._audio_level_stats(audio_file)
-            if verbose:
-                debug(f"🔇 音频强度: 时长={duration_seconds:.2f}s, rms={rms:.5f}, peak={peak:.5f}")
-
-            # duration_seconds < 0 表示无法读取音频，跳过静音判断
-            if duration_seconds == 0.0:
-                if verbose:
-                    debug("⏭️ 音频为空，跳过转录")
-                return {
-                    "text": "",
-                    "segments": [],
-                    "language": language,
-                    "_skipped_reason": "empty_audio",
-                }
-
-            if duration_seconds > 0.0 and (rms < silence_rms_threshold and peak < silence_peak_threshold):
+            skipped = self._silence_result(audio, language, silence_rms_threshold, silence_peak_threshold, verbose)
+            if skipped is not None:
+                return skipped
+
+        # 剪掉非语音区间：停顿不再占用编码器计算，也不会诱发幻觉分段
+        if vad is None:
+            vad = self.prompt_engine.config.get("vad", False)
+        speech, time_map = audio, None
+        if vad:
+            speech, time_map = trim_silence(audio)
+            if time_map is not None:
+                if len(speech) == 0:
+                    if verbose:
+                        debug("⏭️ 未检测到语音，跳过转录")
+                    return self._skipped_result(language, "no_speech")
                 if verbose:
-                    debug("⏭️ 检测到几乎静音，跳过转录")
-                return {
-                    "text": "",
-                    "segments": [],
-                    "language": language,
-                    "_skipped_reason": "silence",
-                }
-
-        # 调用 Whisper 进行转录（使用初始化时缓存的提示词）
+                    debug(f"✂️ 语音活动检测: {audio.duration:.2f}s -> {speech.duration:.2f}s（{len(time_map.orig_starts)} 段）")
+
+        # 调用 Whisper 进行转录（使用本次请求的提示词快照）
         # 注意：这里verbose=False 是指 OpenAI 的Whisper 自身的调试日志（解码进度等）
         # 而用户的 verbose 参数控制的是 CodeWhisper 的进度日志（上面的if verbose）
-        result = self.model.transcribe(
-            audio_file,
-            language=language,
-            initial_prompt=(self.programmer_prompt if use_initial_prompt else None),
-            # openai-whisper 新版本：verbose=False 会显示 tqdm 进度条；verbose=None 才会安静
-            verbose=None,
-            temperature=temperature,
-            # 防止 Whisper 幻觉重复 bug
-            condition_on_previous_text=False,  # 禁用前文依赖，减少重复循环
-            compression_ratio_threshold=2.4,   # 压缩比阈值，超过则认为是重复/乱码
-            no_speech_threshold=0.6,           # 静音检测阈值，减少静音段幻觉
-            # 避免 CPU 上 fp16 警告噪音
-            fp16=(self.device == "cuda"),
-        )
+        model = self._require_model()
+        started = time.perf_counter()
+        with inference_context(self.precision):
+            result = model.transcribe(
+                speech.samples,
+                language=language,
+                initial_prompt=(context.prompt if use_initial_prompt else None),
+                # openai-whisper 新版本：verbose=False 会显示 tqdm 进度条；verbose=None 才会安静
+                verbose=None,
+                temperature=temperature,
+                # 防止 Whisper 幻觉重复 bug
+                condition_on_previous_text=False,  # 禁用前文依赖，减少重复循环
+                compression_ratio_threshold=2.4,   # 压缩比阈值，超过则认为是重复/乱码
+                no_speech_threshold=0.6,           # 静音检测阈值，减少静音段幻觉
+                # 避免 CPU 上 fp16 警告噪音
+                fp16=(self.device == "cuda"),
+            )
+        self._record_inference(speech.duration, time.perf_counter() - started, input_seconds=audio.duration)
+        if time_map is not None:
+            time_map.restore_segments(result.get("segments", []))
+            result["vad"] = time_map.summary()
 
         if verbose:
             debug("✅ 转录完成")
 
+        return self._finish_result(
+            result, language, context,
+            fix_programmer_terms=fix_programmer_terms,
+            verbose=verbose,
+            hallucination_filter=hallucination_filter,
+            learn_user_terms=learn_user_terms,
+        )
+
+    def transcribe_batch(
+        self,
+        audio_files: List[Union[AudioBuffer, str, np.ndarray]],
+        language: Optional[str] = "zh",
+        fix_programmer_terms: bool = True,
+        verbose: bool = False,
+        temperature: float = 0.0,
+        hallucination_filter: bool = True,
+        silence_rms_threshold: float = 0.002,
+        silence_peak_threshold: float = 0.02,
+        *,
+        use_initial_prompt: bool = True,
+        learn_user_terms: bool = True,
+        beam_size: Optional[int] = None,
+        batch_size: int = 8,
+        contexts: Optional[List[RequestContext]] = None,
+        profile: Optional[str] = None,
+        tenant: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        批量转录多段音频：把不超过 30 秒的音频的梅尔谱叠成一个批次，编码器和解码器各只跑一遍
+
+        适合边录边转录时积压的多个分块，或离线批处理。每段音频仍各自做提示词前缀过滤、繁简转换、
+        幻觉过滤和术语修正，返回结果与逐段调用 transcribe 的结构一致（按输入顺序）；
+        超过 30 秒的音频需要滑动窗口，逐段走 transcribe。
+
+        批量解码不输出时间戳，每段音频的结果只有一个覆盖整段的分段。
+        一个批次只能带一个提示词，提示词快照不同的音频（如各自的 context）分开成批。
+
+        Args:
+            audio_files: 音频列表（路径、16 kHz float32 数组或 AudioBuffer）
+            beam_size: 束搜索宽度，为 None 时使用贪心解码
+            batch_size: 每个批次最多的音频段数
+            contexts: 每段音频的请求上下文（可选，长度需与 audio_files 一致）
+            其余参数同 transcribe
+
+        Returns:
+            每段音频的转录结果
+        """
+        if contexts is not None and len(contexts) != len(audio_files):
+            raise ValueError("contexts 的长度必须与 audio_files 一致")
+
+        results: List[Optional[Dict]] = [None] * len(audio_files)
+        pending: List[Tuple[int, AudioBuffer, RequestContext]] = []
+        for i, audio_file in enumerate(audio_files):
+            context = self._request_context(contexts[i] if contexts else None, profile, tenant)
+            audio = AudioBuffer.from_input(audio_file)
+
+            if hallucination_filter:
+                skipped = self._silence_result(audio, language, silence_rms_threshold, silence_peak_threshold, verbose)
+                if skipped is not None:
+                    results[i] = skipped
+                    continue
+
+            if audio.duration > CHUNK_SECONDS:
+                results[i] = self.transcribe(
+                    audio, language, fix_programmer_terms, verbose, temperature, hallucination_filter,
+                    silence_rms_threshold, silence_peak_threshold,
+                    use_initial_prompt=use_initial_prompt, learn_user_terms=learn_user_terms, context=context,
+                )
+                continue
+            pending.append((i, audio, context))
+
+        if not pending:
+            return results
+
+        # 解码选项里只有一个提示词：按提示词快照分组，不同提示词的音频分开成批
+        groups: Dict[Optional[str], List[Tuple[int, AudioBuffer, RequestContext]]] = {}
+        for item in pending:
+            groups.setdefault(item[2].prompt if use_initial_prompt else None, []).append(item)
+        batch_size = max(1, batch_size)
+        batches = [
+            (prompt, items[start:start + batch_size])
+            for prompt, items in groups.items()
+            for start in range(0, len(items), batch_size)
+        ]
+
+        import torch
+        import whisper
+        model = self._require_model()
+        n_mels = model.dims.n_mels
+        for prompt, batch in batches:
+            if verbose:
+                debug(f"🎙️ 批量转录 {len(batch)} 段音频 (语言: {language})")
+
+            # 每段取补齐后梅尔谱的第一个 30 秒窗口，与 whisper.transcribe 的输入一致
+            mel = torch.stack([
+                audio.padded_mel(n_mels, self.device)[:, :whisper.audio.N_FRAMES] for _, audio, _ in batch
+            ])
+            options = whisper.DecodingOptions(
+                task="transcribe",
+                language=language,
+                temperature=temperature,
+                beam_size=beam_size,
+                prompt=prompt,
+                without_timestamps=True,
+                fp16=(self.device == "cuda"),
+            )
+            started = time.perf_counter()
+            with inference_context(self.precision):
+                decoded = whisper.decode(model, mel, options)
+            self._record_inference(sum(audio.duration for _, audio, _ in batch), time.perf_counter() - started, len(batch))
+
+            for (i, audio, context), item in zip(batch, decoded):
+                result = self._decoding_to_result(item, audio)
+                results[i] = self._finish_result(
+                    result, language, context,
+                    fix_programmer_terms=fix_programmer_terms,
+                    verbose=verbose,
+                    hallucination_filter=hallucination_filter,
+                    learn_user_terms=learn_user_terms,
+                )
+
+        if verbose:
+            debug(f"✅ 批量转录完成: {len(audio_files)} 段")
+        return results
+
+    @staticmethod
+    def _decoding_to_result(item, audio: AudioBuffer) -> Dict:
+        """把一条批量解码结果整理成与 whisper.transcribe 相同的结构（整段一个分段）"""
+        # 与 whisper.transcribe 的 no_speech_threshold=0.6 一致：判为静音的窗口不输出文本
+        is_silence = item.no_speech_prob > 0.6 and item.avg_logprob < -1.0
+        text = "" if is_silence else item.text
+        segments = [] if is_silence else [{
+            "id": 0,
+            "seek": 0,
+            "start": 0.0,
+            "end": audio.duration,
+            "text": text,
+            "tokens": item.tokens,
+            "temperature": item.temperature,
+            "avg_logprob": item.avg_logprob,
+            "compression_ratio": item.compression_ratio,
+            "no_speech_prob": item.no_speech_prob,
+        }]
+        return {"text": text, "segments": segments, "language": item.language}
+
+    def _request_context(self, context: Optional[RequestContext], profile: Optional[str],
+                         tenant: Optional[str]) -> RequestContext:
+        """补齐请求上下文：纠错档案、租户和提示词快照"""
+        if context is None:
+            context = RequestContext()
+        if profile is not None:
+            context.profile = profile
+        if tenant is not None:
+            context.tenant = tenant
+        if context.prompt is None:
+            # 请求开始时固定提示词快照，其他线程合并术语后重建的提示词从下一次请求开始生效
+            context.prompt = self.programmer_prompt
+        return context
+
+    @staticmethod
+    def _silence_result(audio: AudioBuffer, language: Optional[str], rms_threshold: float,
+                        peak_threshold: float, verbose: bool) -> Optional[Dict]:
+        """空音频或几乎静音时返回跳过结果，否则返回 None"""
+        duration_seconds, rms, peak = audio.level_stats
+        if verbose:
+            debug(f"🔇 音频强度: 时长={duration_seconds:.2f}s, rms={rms:.5f}, peak={peak:.5f}")
+
+        if duration_seconds == 0.0:
+            reason = "empty_audio"
+            if verbose:
+                debug("⏭️ 音频为空，跳过转录")
+        elif rms < rms_threshold and peak < peak_threshold:
+            reason = "silence"
+            if verbose:
+                debug("⏭️ 检测到几乎静音，跳过转录")
+        else:
+            return None
+        return CodeWhisper._skipped_result(language, reason)
+
+    @staticmethod
+    def _skipped_result(language: Optional[str], reason: str) -> Dict:
+        return {
+            "text": "",
+            "segments": [],
+            "language": language,
+            "corrections": [],
+            "_skipped_reason": reason,
+        }
+
+    def _finish_result(
+        self,
+        result: Dict,
+        language: Optional[str],
+        context: RequestContext,
+        *,
+        fix_programmer_terms: bool,
+        verbose: bool,
+        hallucination_filter: bool,
+        learn_user_terms: bool,
+    ) -> Dict:
+        """Whisper 输出之后的后处理：提示词前缀过滤、繁简转换、标点规范、幻觉过滤、术语修正和术语学习"""
         # 过滤掉提示词前缀（Whisper 幻觉问题：静音时可能把 initial_prompt 当成转录结果）
         result["text"] = self._remove_prompt_prefix(result["text"])
         for segment in result.get("segments", []):
@@ -315,11 +692,32 @@ class CodeWhisper:
             if verbose:
                 debug("🛠 修正为开发者术语")
 
-            # 只修正正文文本一次，避免重复修正
-            result["text"] = self.dict_manager.fix_text(result["text"], accumulate=False)
+            # 分段拼接后只修正一遍，再按下标映射写回各分段，正文和分段的用词、时间戳保持一致；
+            # 修正记录只记在本次请求的上下文里
+            segments = result.get("segments") or []
+            joined = "".join(seg.get("text", "") for seg in segments)
+            if segments and joined.strip() == result["text"].strip():
+                corrected, corrections = self.dict_manager.fix_segments(segments, context.profile, context.tenant)
+                result["text"] = corrected.strip()
+                # char_start / char_end 是拼接文本里的下标，去掉首尾空白后平移并截断，与正文对齐
+                leading = len(corrected) - len(corrected.lstrip())
+                for segment in segments:
+                    for key in ("char_start", "char_end"):
+                        if key in segment:
+                            segment[key] = min(max(segment[key] - leading, 0), len(result["text"]))
+            else:
+                result["text"], corrections = self.dict_manager.correct_text(result["text"], context.profile, context.tenant)
+            context.add_corrections(corrections)
 
             if language and language.lower().startswith("zh"):
+                # 只替换单个标点，长度不变，分段下标仍然有效
                 result["text"] = normalize_zh_punctuation(result["text"])
+                for segment in segments:
+                    segment["text"] = normalize_zh_punctuation(segment["text"])
+
+            if self.dict_manager.phonetic_enabled and not self.dict_manager.phonetic_autocorrect:
+                # 拼音模糊匹配默认只标记读音接近术语的片段，不改写正文
+                result["phonetic_candidates"] = self.dict_manager.find_phonetic_candidates(result["text"])
 
         # 学习用户习惯：检测文本中出现的术语并更新用户术语库
         if learn_user_terms:
@@ -327,7 +725,7 @@ class CodeWhisper:
                 debug("🧠 学习用户习惯")
 
             # 方法1：从修正记录中获取术语（优先，更精准）
-            detected_terms = self.dict_manager.get_detected_terms_from_corrections()
+            detected_terms = self.dict_manager.get_detected_terms_from_corrections(context.corrections)
 
             # 方法2：从最终文本中检测术语（补充）
             detected_terms_from_text = self.dict_manager.detect_terms_in_text(result["text"])
@@ -336,21 +734,31 @@ class CodeWhisper:
             if detected_terms:
                 if verbose:
                     debug(f"  检测到术语: {', '.join(list(detected_terms)[:5])}{'...' if len(detected_terms) > 5 else ''}")
-                # 更新用户术语库
-                self.prompt_engine.update_user_terms(detected_terms)
-
-                # 重新构建提示词（下次转录使用）
-                self.programmer_prompt = self.prompt_engine.build_prompt()
+                context.detected_terms.update(detected_terms)
+                # 登记到批量缓冲，合并用户术语库并重建提示词（下次转录使用）；
+                # 其他线程正在合并时直接返回，本次的术语由它一并带走
+                self._learned_terms.add(detected_terms)
+                self._learned_terms.flush()
 
+        result["corrections"] = context.corrections
         return result
 
+    def _merge_learned_terms(self, term_counts: Dict[str, int]) -> None:
+        """把一批请求学到的术语并入用户术语库，并整体替换提示词快照"""
+        self.prompt_engine.merge_user_term_counts(term_counts)
+        self.programmer_prompt = self.prompt_engine.build_prompt()
+
+    def flush_learned_terms(self) -> int:
+        """等待并合并所有尚未并入用户术语库的术语（退出前调用），返回合并的请求数"""
+        return self._learned_terms.flush(block=True)
+
     def get_supported_models(self) -> list:
         """获取支持的模型列表"""
         return ["tiny", "base", "small", "medium", "large"]
 
-    def get_dict_stats(self) -> Dict:
-        """获取字典统计信息"""
-        return self.dict_manager.get_stats()
+    def get_dict_stats(self, detail: bool = False) -> Dict:
+        """获取字典统计信息（detail=True 时附带每条规则的命中统计）"""
+        return self.dict_manager.get_stats(detail)
 
     def get_dict_categories(self) -> Dict:
         """获取字典分类统计"""
@@ -0,0 +1,242 @@
+"""
+语音活动检测（VAD）- 向量化的分帧能量 + 过零率判决，带拖尾平滑；转录前剪掉非语音区间，
+并保留时间映射，把 Whisper 输出的时间戳还原到原始音频上
+
+口述输入里通常有 30%~50% 是停顿，剪掉之后编码器的计算量按比例下降，
+长停顿也不再诱发 Whisper 的幻觉分段。
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .audio_buffer import AudioBuffer
+
+# 分帧：25 ms 帧长、10 ms 帧移（与 AudioBuffer.frame_energies 的默认值一致，结果可复用）
+FRAME_LENGTH = 400
+HOP_LENGTH = 160
+
+# 判决参数
+NOISE_PERCENTILE = 10      # 噪声底估计：帧能量（dB）的第 10 百分位
+SPEECH_PERCENTILE = 95     # 语音电平估计：第 95 百分位
+SPEECH_MARGIN_DB = 10.0    # 高于噪声底该值判为语音
+WEAK_MARGIN_DB = 5.0       # 高于噪声底该值且过零率高时也判为语音（清辅音 s/sh/f 等能量低、过零率高）
+DYNAMIC_RANGE_DB = 20.0    # 阈值不超过语音电平减该值
+ABSOLUTE_FLOOR_DB = -55.0  # 阈值下限（约 RMS 0.0018），低于它的一律不算语音
+ZCR_THRESHOLD = 0.25
+
+# 平滑参数（帧）
+MIN_SPEECH_FRAMES = 3      # 短于 30 ms 的孤立“语音”视为点击声
+HANGOVER_FRAMES = 20       # 语音结束后保留 200 ms 拖尾（字尾的弱音）
+PREROLL_FRAMES = 10        # 语音开始前保留 100 ms
+
+# 剪掉的总时长不到该值时不裁剪，省去拼接和时间映射
+MIN_TRIM_SECONDS = 1.0
+
+
+def _to_db(energies: np.ndarray) -> np.ndarray:
+    return 10.0 * np.log10(energies.astype(np.float64) + 1e-10)
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """布尔序列中连续 True 区间的 (起点, 终点)，终点不含"""
+    edges = np.diff(np.concatenate([[0], mask.view(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def speech_frames(audio: AudioBuffer) -> np.ndarray:
+    """
+    逐帧判决是否为语音（未平滑）
+
+    阈值随录音自适应：噪声底 + 10 dB，但不高于语音电平 - 20 dB（整段都是语音时不误剪），
+    也不低于绝对下限；
+    能量略高于噪声底、过零率又高的帧（清辅音）也判为语音。
+    """
+    energies = audio.frame_energies(FRAME_LENGTH, HOP_LENGTH)
+    if len(energies) == 0:
+        return np.zeros(0, dtype=bool)
+    db = _to_db(energies)
+    zcr = audio.zero_crossing_rates(FRAME_LENGTH, HOP_LENGTH)
+
+    noise_db, speech_db = np.percentile(db, [NOISE_PERCENTILE, SPEECH_PERCENTILE])
+    threshold = max(min(noise_db + SPEECH_MARGIN_DB, speech_db - DYNAMIC_RANGE_DB), ABSOLUTE_FLOOR_DB)
+    weak_threshold = max(noise_db + WEAK_MARGIN_DB, ABSOLUTE_FLOOR_DB)
+    return (db > threshold) | ((db > weak_threshold) & (zcr > ZCR_THRESHOLD))
+
+
+def detect_speech(audio: AudioBuffer) -> np.ndarray:
+    """
+    检测语音区间
+
+    先去掉过短的孤立语音帧，再向后延长拖尾、向前延长预留，重叠或相接的区间合并，
+    因此短于拖尾 + 预留（300 ms）的停顿会被保留在语音区间里。
+
+    Returns:
+        形状为 (区间数, 2) 的 int64 数组，每行是 [起始采样, 结束采样)，按时间排序
+    """
+    mask = speech_frames(audio)
+    n_samples = len(audio.samples)
+    starts, ends = _runs(mask)
+    keep = (ends - starts) >= MIN_SPEECH_FRAMES
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    starts = np.maximum(starts - PREROLL_FRAMES, 0)
+    ends = np.minimum(ends + HANGOVER_FRAMES, len(mask))
+    # 合并重叠区间：起点已排序，起点超过之前所有区间的最远终点时开始新的一组
+    reach = np.maximum.accumulate(ends)
+    group_start = np.concatenate([[True], starts[1:] > reach[:-1]])
+    group_end = np.concatenate([group_start[1:], [True]])
+    starts, ends = starts[group_start], reach[group_end]
+
+    # 帧 → 采样：第 i 帧覆盖 [i·hop, i·hop + frame_length)
+    sample_starts = starts * HOP_LENGTH
+    sample_ends = np.minimum((ends - 1) * HOP_LENGTH + FRAME_LENGTH, n_samples)
+    return np.stack([sample_starts, sample_ends], axis=1).astype(np.int64)
+
+
+class TimeMap:
+    """
+    裁剪后音频与原始音频之间的时间映射
+
+    保留的每个区间在裁剪后的音频里首尾相接；裁剪后的时间 t 落在第 i 个区间时，
+    原始时间为 原始起点[i] + (t - 裁剪后起点[i])。
+    """
+
+    __slots__ = ("orig_starts", "orig_ends", "trimmed_starts", "duration")
+
+    def __init__(self, regions: np.ndarray, sample_rate: int, duration: float):
+        """
+        Args:
+            regions: detect_speech 的结果（采样下标）
+            sample_rate: 采样率
+            duration: 原始音频时长（秒）
+        """
+        self.orig_starts = regions[:, 0] / sample_rate
+        self.orig_ends = regions[:, 1] / sample_rate
+        lengths = self.orig_ends - self.orig_starts
+        self.trimmed_starts = np.concatenate([[0.0], np.cumsum(lengths)])[:len(lengths)]
+        self.duration = duration
+
+    @property
+    def speech_seconds(self) -> float:
+        return float(np.sum(self.orig_ends - self.orig_starts))
+
+    def to_original(self, t: float, end: bool = False) -> float:
+        """
+        裁剪后的时间 → 原始音频时间（秒）
+
+        恰好落在两个区间接缝上的时间：起点映射到后一个区间的开头，
+        终点（end=True）映射到前一个区间的结尾，不把被剪掉的停顿算进分段里。
+        """
+        side = "left" if end else "right"
+        i = max(0, int(np.searchsorted(self.trimmed_starts, t, side=side)) - 1)
+        return float(min(self.orig_starts[i] + (t - self.trimmed_starts[i]), self.orig_ends[i]))
+
+    def restore_segments(self, segments: List[Dict]) -> List[Dict]:
+        """把分段（及逐词时间戳）的 start / end 还原到原始音频时间（原地修改）"""
+        for segment in segments:
+            for item in [segment] + list(segment.get("words") or []):
+                if "start" in item:
+                    item["start"] = round(self.to_original(item["start"]), 3)
+                if "end" in item:
+                    item["end"] = round(self.to_original(item["end"], end=True), 3)
+        return segments
+
+    def summary(self) -> Dict:
+        """裁剪概况：原始时长、保留的语音时长、区间数"""
+        return {
+            "duration": round(self.duration, 3),
+            "speech_seconds": round(self.speech_seconds, 3),
+            "regions": len(self.orig_starts),
+        }
+
+
+def trim_silence(audio: AudioBuffer) -> Tuple[AudioBuffer, Optional[TimeMap]]:
+    """
+    剪掉非语音区间
+
+    Returns:
+        (裁剪后的音频, 时间映射)。没有检测到语音时返回空音频；
+        可剪掉的时长不足 MIN_TRIM_SECONDS 时原样返回，时间映射为 None
+    """
+    regions = detect_speech(audio)
+    if len(regions) == 0:
+        return AudioBuffer(np.zeros(0, dtype=np.float32), source=audio.source), TimeMap(regions, audio.sample_rate, audio.duration)
+
+    removed = len(audio.samples) - int(np.sum(regions[:, 1] - regions[:, 0]))
+    if removed < MIN_TRIM_SECONDS * audio.sample_rate:
+        return audio, None
+
+    samples = np.concatenate([audio.samples[start:end] for start, end in regions])
+    return AudioBuffer(samples, source=audio.source), TimeMap(regions, audio.sample_rate, audio.duration)
+
+
+class StreamChunker:
+    """
+    边录边转录的分块切点选择
+
+    录音流持续增长时，反复用尚未切出的音频调用 find_cut：
+    - 长停顿：已有语音之后出现超过 pause_seconds 的停顿，且分块已不短于 min_seconds，立即在停顿里切分，
+      说完一句就开始转录，不必等满名义时长
+    - 名义边界：音频达到 target_seconds 时，在其前后 search_seconds 的窗口里找平滑后能量最低的位置切分，
+      尽量不把一个字切成两半
+    - 上限：切点不超过 max_seconds，转录延迟有界
+    """
+
+    def __init__(self, sample_rate: int = 16000, target_seconds: float = 10.0, max_seconds: Optional[float] = None,
+                 search_seconds: float = 2.0, pause_seconds: float = 0.8, min_seconds: float = 3.0):
+        """
+        Args:
+            sample_rate: 采样率（16 kHz）
+            target_seconds: 名义分块时长
+            max_seconds: 分块时长上限，默认 target_seconds + search_seconds / 2
+            search_seconds: 名义边界附近搜索切点的窗口宽度
+            pause_seconds: 触发提前切分的停顿时长
+            min_seconds: 提前切分时分块的最短时长
+        """
+        self.sample_rate = sample_rate
+        self.target = int(target_seconds * sample_rate)
+        self.max = int((max_seconds or target_seconds + search_seconds / 2) * sample_rate)
+        self.half_window = int(search_seconds * sample_rate / 2)
+        self.pause_frames = max(1, int(pause_seconds * sample_rate / HOP_LENGTH))
+        self.min = int(min(min_seconds, target_seconds) * sample_rate)
+
+    def find_cut(self, pending: np.ndarray) -> Optional[int]:
+        """
+        Args:
+            pending: 从当前分块起点到录音末尾的采样
+
+        Returns:
+            切点（相对 pending 起点的采样数），暂不切分时返回 None
+        """
+        n = len(pending)
+        window_end = min(self.target + self.half_window, self.max)
+        if n < self.min:
+            return None
+
+        audio = AudioBuffer(pending, self.sample_rate)
+        mask = speech_frames(audio)
+
+        # 长停顿：第一段语音之后、分块已够长时出现的足够长的非语音区间，切在停顿开头的拖尾之后
+        speech_at = np.flatnonzero(mask)
+        if len(speech_at):
+            starts, ends = _runs(~mask)
+            long_pause = (ends - starts >= self.pause_frames) & (starts > speech_at[0])
+            long_pause &= (starts + HANGOVER_FRAMES) * HOP_LENGTH >= self.min
+            if np.any(long_pause):
+                cut = (starts[long_pause][0] + HANGOVER_FRAMES) * HOP_LENGTH
+                if cut <= self.max:
+                    return int(cut)
+
+        if n < window_end:
+            return None
+
+        # 名义边界：窗口内 100 ms 平滑能量最低的帧中心
+        db = _to_db(audio.frame_energies(FRAME_LENGTH, HOP_LENGTH))
+        smoothed = np.convolve(db, np.ones(10) / 10, mode="same")
+        first = max(0, (min(self.target, window_end) - self.half_window) // HOP_LENGTH)
+        last = max(first + 1, (window_end - FRAME_LENGTH) // HOP_LENGTH + 1)
+        frame = first + int(np.argmin(smoothed[first:last]))
+        return int(min(frame * HOP_LENGTH + FRAME_LENGTH // 2, self.max))
@@ -0,0 +1,211 @@
+"""
+模型权重缓存 - 把转换好的 Whisper 权重存成 safetensors 布局的文件，启动时直接内存映射
+
+whisper.load_model 每次都要反序列化整个 .pt 检查点（fp16），再复制转换成 fp32 参数，medium / large 需要数秒。
+缓存文件保存的是已经转换好的参数与缓冲区，加载时用 mmap 映射并直接作为张量的存储：
+启动耗时只剩缺页，同一台机器上的多个进程共享同一份物理页（页缓存）。
+
+文件布局与 safetensors 相同：8 字节小端头长度 + JSON 头 + 连续的原始字节。
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Optional, Tuple
+
+from .console import debug, info, warn
+
+# 缓存格式版本，布局变化时递增，旧文件自动失效
+CACHE_VERSION = "1"
+CACHE_SUFFIX = ".safetensors"
+
+# torch dtype 名 → safetensors dtype
+_DTYPES = {
+    "float32": "F32",
+    "float16": "F16",
+    "bfloat16": "BF16",
+    "float64": "F64",
+    "int64": "I64",
+    "int32": "I32",
+    "bool": "BOOL",
+}
+
+
+def cache_enabled() -> bool:
+    """是否启用权重缓存（CODEWHISPER_WEIGHT_CACHE=0 关闭）"""
+    return os.environ.get("CODEWHISPER_WEIGHT_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def default_cache_dir() -> str:
+    """缓存目录：CODEWHISPER_CACHE_DIR，默认 ~/.cache/codewhisper/weights"""
+    root = os.environ.get("CODEWHISPER_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "codewhisper"
+    )
+    return os.path.join(root, "weights")
+
+
+def cache_path(model_name: str, cache_dir: Optional[str] = None) -> str:
+    """
+    模型对应的缓存文件路径
+
+    官方模型名用下载地址中的 sha256 区分版本；本地检查点路径用文件大小和修改时间区分。
+    """
+    import whisper
+
+    if model_name in whisper._MODELS:
+        version = whisper._MODELS[model_name].split("/")[-2][:16]
+        stem = model_name
+    else:
+        stat = os.stat(model_name)
+        version = hashlib.sha256(f"{os.path.abspath(model_name)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+        stem = os.path.splitext(os.path.basename(model_name))[0]
+    return os.path.join(cache_dir or default_cache_dir(), f"{stem}-{version}-v{CACHE_VERSION}{CACHE_SUFFIX}")
+
+
+def load_model(model_name: str, device: str = "cpu", cache_dir: Optional[str] = None):
+    """
+    加载 Whisper 模型：优先内存映射缓存，没有缓存时用 whisper.load_model 加载并写入缓存
+
+    Args:
+        model_name: 模型名（tiny / base / small / medium / large...）或本地检查点路径
+        device: 推理设备；非 CPU 设备会把映射的权重复制到设备上
+        cache_dir: 缓存目录，默认见 default_cache_dir()
+
+    Returns:
+        Whisper 模型
+    """
+    import whisper
+
+    path = cache_path(model_name, cache_dir)
+    if os.path.exists(path):
+        try:
+            model = load_cached(path)
+            debug(f"✓ 从权重缓存映射模型: {path}")
+            return model.to(device) if device != "cpu" else model
+        except Exception as e:
+            warn(f"⚠️ 权重缓存不可用，重新生成: {e}")
+
+    model = whisper.load_model(model_name, device="cpu")
+    try:
+        save_cached(model, path, alignment_heads=whisper._ALIGNMENT_HEADS.get(model_name))
+        info(f"💾 已生成权重缓存，下次启动直接映射: {path}")
+    except OSError as e:
+        warn(f"⚠️ 写入权重缓存失败: {e}")
+    return model.to(device) if device != "cpu" else model
+
+
+def save_cached(model, path: str, alignment_heads: Optional[bytes] = None) -> None:
+    """
+    把模型的全部参数和缓冲区（含不随 state_dict 保存的缓冲区）写成 safetensors 布局
+
+    对齐头（alignment_heads）是稀疏张量，不写入数据区，原始编码放在元数据里，加载后重新设置。
+    """
+    import torch
+    from dataclasses import asdict
+
+    tensors = {}
+    for name, tensor in list(model.named_parameters()) + list(model.named_buffers()):
+        if name == "alignment_heads" or tensor.is_sparse:
+            continue
+        tensors[name] = tensor.detach().to("cpu").contiguous()
+
+    # 元素宽度大的在前，保证每个张量在数据区里按元素大小对齐
+    ordered = sorted(tensors.items(), key=lambda item: -item[1].element_size())
+    header: Dict[str, Dict] = {
+        "__metadata__": {
+            "format": "codewhisper",
+            "version": CACHE_VERSION,
+            "dims": json.dumps(asdict(model.dims)),
+            "alignment_heads": alignment_heads.decode("ascii") if alignment_heads else "",
+        }
+    }
+    offset = 0
+    for name, tensor in ordered:
+        dtype = str(tensor.dtype).replace("torch.", "")
+        if dtype not in _DTYPES:
+            raise ValueError(f"不支持缓存的张量类型: {name} {dtype}")
+        size = tensor.numel() * tensor.element_size()
+        header[name] = {"dtype": _DTYPES[dtype], "shape": list(tensor.shape), "data_offsets": [offset, offset + size]}
+        offset += size
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # 头部补空格，让数据区从 64 字节边界开始（safetensors 允许头部尾随空格）
+    header_bytes += b" " * (-(8 + len(header_bytes)) % 64)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for name, tensor in ordered:
+            # bfloat16 没有对应的 numpy 类型，按 16 位整数写出原始字节
+            raw = tensor.view(torch.int16) if tensor.dtype == torch.bfloat16 else tensor
+            f.write(raw.numpy().tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_header(path: str) -> Tuple[Dict, int]:
+    """读取 JSON 头，返回 (头, 数据区起始偏移)"""
+    with open(path, "rb") as f:
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    return header, 8 + header_len
+
+
+def load_cached(path: str):
+    """
+    内存映射缓存文件并组装模型：模型骨架建在 meta 设备上（不分配、不初始化参数），
+    每个参数 / 缓冲区直接指向映射区域
+
+    映射为写时复制（MAP_PRIVATE）：只读使用时与其他进程共享页缓存，张量可写（torch 不会告警）。
+    """
+    import torch
+    from whisper.model import ModelDimensions, Whisper
+
+    header, data_start = read_header(path)
+    metadata = header.pop("__metadata__", {})
+    if metadata.get("version") != CACHE_VERSION:
+        raise ValueError(f"缓存版本不匹配: {metadata.get('version')}")
+
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    dtypes = {code: getattr(torch, name) for name, code in _DTYPES.items()}
+    dims = ModelDimensions(**json.loads(metadata["dims"]))
+    try:
+        with torch.device("meta"):
+            model = Whisper(dims)
+    except Exception:
+        # 旧版 torch 不支持 meta 设备上下文：在 CPU 上构建（参数会被随后映射的张量替换）
+        model = Whisper(dims)
+
+    modules = dict(model.named_modules())
+    for name, spec in header.items():
+        begin, end = spec["data_offsets"]
+        dtype = dtypes[spec["dtype"]]
+        count = (end - begin) // torch.empty((), dtype=dtype).element_size()
+        tensor = torch.frombuffer(mapped, dtype=dtype, count=count, offset=data_start + begin).view(spec["shape"])
+
+        module_name, _, attr = name.rpartition(".")
+        module = modules[module_name]
+        if attr in module._parameters:
+            module._parameters[attr] = torch.nn.Parameter(tensor, requires_grad=False)
+        else:
+            module._buffers[attr] = tensor
+
+    if metadata.get("alignment_heads"):
+        model.set_alignment_heads(metadata["alignment_heads"].encode("ascii"))
+    else:
+        # 与 Whisper 构造函数的默认值一致：后一半解码层的全部注意力头
+        all_heads = torch.zeros(dims.n_text_layer, dims.n_text_head, dtype=torch.bool)
+        all_heads[dims.n_text_layer // 2:] = True
+        model.register_buffer("alignment_heads", all_heads.to_sparse(), persistent=False)
+
+    leftover = [name for name, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+    if leftover:
+        raise ValueError(f"缓存缺少张量: {', '.join(leftover[:5])}")
+    # 保持映射存活（张量只引用底层缓冲区）
+    model._weight_cache_mmap = mapped
+    return model.eval()
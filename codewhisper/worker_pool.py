@@ -0,0 +1,366 @@
+"""
+多进程转录池 - 多个工作进程共享同一份只读模型权重，突破 GIL 和单线程转录的吞吐上限
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from . import weight_cache
+from .thread_tuning import apply_thread_config, available_cpus, resolve_thread_config
+from .console import debug, info, warn
+
+try:
+    import torch.multiprocessing as torch_mp
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+# 等待结果时检查工作进程存活的间隔（秒）
+_MONITOR_INTERVAL = 0.5
+
+# 就绪之前就崩溃的进程按指数退避重启（0.5 s、1 s、2 s …，最长 30 s），连续失败达到上限后不再重启
+_RESTART_BACKOFF = 0.5
+_MAX_RESTART_BACKOFF = 30.0
+_MAX_STARTUP_FAILURES = 5
+
+
+def _worker_main(worker_id: int, generation: int, model, weights_path: Optional[str], model_name: str,
+                 init_kwargs: Dict, thread_config: Dict, tasks, results) -> None:
+    """
+    工作进程入口：用共享的模型权重构建 CodeWhisper，循环处理父进程分配的任务
+
+    有权重缓存时各进程自己映射缓存文件（共享页缓存）；否则模型参数位于共享内存，
+    传入时只传递句柄。两种方式都不复制权重。
+    消息都带上进程的代数（generation），父进程据此忽略已经被替换的旧进程发来的状态。
+    """
+    apply_thread_config(thread_config)
+    from .transcriber import CodeWhisper
+
+    if model is None:
+        model = weight_cache.load_cached(weights_path)
+
+    whisper = CodeWhisper(model_name, model=model, **init_kwargs)
+    results.put(("ready", worker_id, generation, None, None))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        request_id, audio, kwargs = task
+        try:
+            result = whisper.transcribe(audio, **kwargs)
+        except Exception as e:
+            results.put(("error", worker_id, generation, request_id, f"{type(e).__name__}: {e}"))
+        else:
+            results.put(("done", worker_id, generation, request_id, result))
+    whisper.flush_learned_terms()
+
+
+class TranscriberPool:
+    """
+    多进程转录池
+
+    父进程只加载一次模型：有权重缓存时各工作进程内存映射同一个缓存文件，否则把参数移到共享内存，
+    N 个工作进程通过句柄映射同一份权重，内存不会随进程数成倍增长。任务先在父进程排队，由父进程逐个分配给
+    空闲的进程（每个进程一个任务队列），因此父进程始终知道每个进程手上的请求；map() 按提交顺序返回结果。
+    工作进程意外退出时，它手上的请求以异常结束，进程会被自动重启；启动阶段反复崩溃的进程按退避间隔重启，
+    连续失败达到上限后不再重启。
+
+    共享的只是 FP32 权重：精度为 int8 时，每个工作进程在映射后各自做一次动态量化，量化后的 int8 权重
+    （约为 FP32 权重的 1/4）是进程私有的，总内存约为 进程数 × 1/4 份 FP32 权重，4 个进程以上反而多于
+    共享的一份 FP32；内存紧张、进程数较多时优先用 fp32 或 bf16。
+
+    用法：
+        with TranscriberPool("medium", workers=4) as pool:
+            results = pool.map(["a.wav", "b.wav", "c.wav"])
+    """
+
+    def __init__(self, model_name: str = "medium", workers: Optional[int] = None,
+                 threads_per_worker: Optional[int] = None, **init_kwargs):
+        """
+        Args:
+            model_name: Whisper 模型名
+            workers: 工作进程数，默认等于 CPU 核数
+            threads_per_worker: 每个进程的 torch 计算线程数；默认按进程数校准（见 thread_tuning，结果缓存），
+                关闭调优时为可用核数 / 进程数（至少 1）
+            init_kwargs: 传给 CodeWhisper 的其他参数（如 dict_path、dict_layers）
+        """
+        if not TORCH_AVAILABLE:
+            raise RuntimeError("多进程转录池需要安装 torch 和 openai-whisper")
+        import whisper
+
+        cpus = available_cpus()
+        self.workers = max(1, workers or cpus)
+        # 父进程校准一次，所有工作进程使用同一份配置
+        self.thread_config = None if threads_per_worker else resolve_thread_config(model_name, self.workers)
+        if self.thread_config is None:
+            self.thread_config = {
+                "intra_op": threads_per_worker or max(1, cpus // self.workers),
+                "inter_op": 1,
+                "source": "threads_per_worker" if threads_per_worker else "default",
+            }
+        self.threads_per_worker = self.thread_config["intra_op"]
+        self.model_name = model_name
+        self._init_kwargs = init_kwargs
+
+        info(f"📦 转录池加载共享模型: {model_name}（{self.workers} 个进程 × {self.threads_per_worker} 线程）")
+        # 池内统一用 CPU。有权重缓存时父进程只负责生成缓存，各进程直接映射同一个文件；
+        # 否则参数放进共享内存后，各进程只映射不复制
+        self._model = None
+        self._weights_path: Optional[str] = None
+        if weight_cache.cache_enabled():
+            try:
+                weight_cache.load_model(model_name, device="cpu")
+                self._weights_path = weight_cache.cache_path(model_name)
+            except Exception as e:
+                warn(f"⚠️ 权重缓存不可用，改用共享内存: {e}")
+        if self._weights_path is None or not os.path.exists(self._weights_path):
+            self._weights_path = None
+            self._model = whisper.load_model(model_name, device="cpu")
+            self._model.share_memory()
+
+        # spawn 启动：不继承父进程的线程与锁状态，torch 的共享内存句柄按引用传递
+        self._ctx = torch_mp.get_context("spawn")
+        self._results = self._ctx.Queue()
+
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._futures: Dict[int, Future] = {}
+        self._pending: Deque[Tuple[int, object, Dict]] = deque()  # 尚未分配给进程的任务
+        self._workers: Dict[int, Dict] = {}  # 工作进程编号 → 进程、任务队列、代数、当前请求、重启状态
+        self._restarts = 0
+        self._closed = False    # 不再接受新请求
+        self._stopping = False  # 正在结束工作进程，不再重启
+
+        for worker_id in range(self.workers):
+            self._start_worker(worker_id)
+
+        self._collector = threading.Thread(target=self._collect, name="cw-pool-collector", daemon=True)
+        self._collector.start()
+
+    def __enter__(self) -> "TranscriberPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def submit(self, audio, **kwargs) -> Future:
+        """
+        提交一段音频，返回 Future（结果为 transcribe 的返回值）
+
+        Args:
+            audio: 音频文件路径或 16 kHz float32 数组
+            kwargs: 传给 CodeWhisper.transcribe 的参数；learn_user_terms 默认关闭，
+                避免多个进程同时改写用户术语库
+        """
+        if self._closed:
+            raise RuntimeError("转录池已关闭")
+        if all(worker["given_up"] for worker in list(self._workers.values())):
+            raise RuntimeError("转录进程均无法启动")
+        kwargs.setdefault("learn_user_terms", False)
+        kwargs.setdefault("verbose", False)
+
+        future: Future = Future()
+        with self._lock:
+            request_id = next(self._request_ids)
+            self._futures[request_id] = future
+            self._pending.append((request_id, audio, kwargs))
+            self._dispatch()
+        return future
+
+    def map(self, audios: Iterable, **kwargs) -> List[Dict]:
+        """批量转录，按输入顺序返回结果（任意一段失败时抛出异常）"""
+        futures = [self.submit(audio, **kwargs) for audio in audios]
+        return [future.result() for future in futures]
+
+    def stats(self) -> Dict:
+        """池状态：进程数、排队/处理中的请求数、累计重启次数、已放弃重启的进程数"""
+        with self._lock:
+            workers = list(self._workers.values())
+            return {
+                "workers": self.workers,
+                "alive": sum(1 for worker in workers if worker["process"].is_alive()),
+                "busy": sum(1 for worker in workers if worker["request"] is not None),
+                "pending": len(self._pending),
+                "restarts": self._restarts,
+                "given_up": sum(1 for worker in workers if worker["given_up"]),
+            }
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        等待已提交的请求处理完并关闭所有工作进程
+
+        Args:
+            timeout: 等待未完成的请求、以及每个进程退出的最长秒数
+        """
+        if self._closed:
+            return
+        self._closed = True
+        # 任务由父进程逐个分配，排队中的请求要等进程处理完才能发送结束标记
+        with self._lock:
+            futures = list(self._futures.values())
+        wait(futures, timeout)
+
+        self._stopping = True
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            worker["tasks"].put(None)
+        for worker in workers:
+            worker["process"].join(timeout)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+        self._collector.join(timeout)
+
+        with self._lock:
+            futures, self._futures = self._futures, {}
+            self._pending.clear()
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(RuntimeError("转录池已关闭"))
+
+    def _start_worker(self, worker_id: int) -> None:
+        with self._lock:
+            previous = self._workers.get(worker_id)
+        generation = previous["generation"] + 1 if previous else 0
+        tasks = self._ctx.Queue()
+        # 进程可能在领取任务之前退出，退出时不等待写不进去的数据
+        tasks.cancel_join_thread()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, generation, self._model, self._weights_path, self.model_name, self._init_kwargs,
+                  self.thread_config, tasks, self._results),
+            name=f"cw-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        with self._lock:
+            self._workers[worker_id] = {
+                "process": process,
+                "tasks": tasks,
+                "generation": generation,
+                "ready": False,
+                "request": None,
+                "failures": previous["failures"] if previous else 0,  # 连续在就绪前崩溃的次数
+                "restart_at": None,
+                "given_up": False,
+            }
+
+    def _dispatch(self) -> None:
+        """把排队的任务分配给空闲的工作进程（调用方持有锁）"""
+        for worker in self._workers.values():
+            if not self._pending:
+                return
+            if worker["ready"] and worker["request"] is None and worker["process"].is_alive():
+                task = self._pending.popleft()
+                worker["request"] = task[0]
+                worker["tasks"].put(task)
+
+    def _collect(self) -> None:
+        """收集线程：分发结果，并定期检查工作进程是否意外退出"""
+        last_check = time.monotonic()
+        while True:
+            try:
+                self._handle(self._results.get(timeout=_MONITOR_INTERVAL))
+            except queue.Empty:
+                if self._stopping and not any(worker["process"].is_alive() for worker in list(self._workers.values())):
+                    break
+
+            if time.monotonic() - last_check >= _MONITOR_INTERVAL:
+                self._check_workers()
+                last_check = time.monotonic()
+
+    def _drain(self) -> None:
+        """处理结果队列里已经到达的全部消息"""
+        while True:
+            try:
+                message = self._results.get_nowait()
+            except queue.Empty:
+                return
+            self._handle(message)
+
+    def _handle(self, message: Tuple) -> None:
+        """处理工作进程的一条消息：就绪后开始分配任务，结果交给对应的 Future 并释放该进程"""
+        kind, worker_id, generation, request_id, payload = message
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            # 已被替换的旧进程的就绪消息和占用状态都不再有效，但它在退出前算完的结果仍然交付
+            current = worker is not None and worker["generation"] == generation
+            if kind == "ready":
+                if current:
+                    worker["ready"] = True
+                    worker["failures"] = 0
+                    self._dispatch()
+                future = None
+            else:
+                if current and worker["request"] == request_id:
+                    worker["request"] = None
+                    self._dispatch()
+                future = self._futures.pop(request_id, None)
+
+        if kind == "ready":
+            if current:
+                debug(f"✓ 转录进程 {worker_id} 就绪")
+        elif future is not None:
+            if kind == "done":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _check_workers(self) -> None:
+        """
+        处理意外退出的工作进程：它正在处理的请求以异常结束，进程重启
+
+        就绪之前就崩溃（如构建 CodeWhisper 时出错）的进程按指数退避重启，
+        连续失败 _MAX_STARTUP_FAILURES 次后放弃；所有进程都放弃时，排队的请求以异常结束。
+        """
+        if self._stopping:
+            return
+        now = time.monotonic()
+        for worker_id, worker in list(self._workers.items()):
+            process = worker["process"]
+            if worker["given_up"] or process.is_alive():
+                continue
+
+            if worker["restart_at"] is None:
+                # 刚发现退出：先处理它退出前发出的消息，避免把已经算完的请求判为失败
+                self._drain()
+                with self._lock:
+                    request_id, worker["request"] = worker["request"], None
+                    future = self._futures.pop(request_id, None) if request_id is not None else None
+                    if not worker["ready"]:
+                        worker["failures"] += 1
+                    failures = worker["failures"]
+                    worker["given_up"] = failures >= _MAX_STARTUP_FAILURES
+                    delay = min(_RESTART_BACKOFF * 2 ** (failures - 1), _MAX_RESTART_BACKOFF) if failures else 0.0
+                    worker["restart_at"] = now + delay
+                if future is not None:
+                    future.set_exception(RuntimeError(f"转录进程 {worker_id} 意外退出"))
+                if worker["given_up"]:
+                    warn(f"❌ 转录进程 {worker_id} 启动时连续崩溃 {failures} 次（exitcode={process.exitcode}），不再重启")
+                    self._fail_if_no_workers()
+                    continue
+                warn(f"⚠️ 转录进程 {worker_id} 意外退出（exitcode={process.exitcode}），"
+                     f"{f'{delay:.1f}s 后重启' if delay else '正在重启'}")
+
+            if now >= worker["restart_at"]:
+                with self._lock:
+                    self._restarts += 1
+                self._start_worker(worker_id)
+
+    def _fail_if_no_workers(self) -> None:
+        """所有进程都已放弃重启时，排队中的请求不会再被处理，直接以异常结束"""
+        with self._lock:
+            if not all(worker["given_up"] for worker in self._workers.values()):
+                return
+            pending, self._pending = self._pending, deque()
+            futures = [self._futures.pop(request_id, None) for request_id, _, _ in pending]
+        for future in futures:
+            if future is not None:
+                future.set_exception(RuntimeError("转录进程均无法启动"))
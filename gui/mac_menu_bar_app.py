@@ -4,18 +4,18 @@ CodeWhisper MenuBar Application - macOS 菜单栏应用（使用 rumps）
 
 import os
 import queue
+from collections import deque
 import threading
-import tempfile
 import subprocess
 from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import rumps
 import sounddevice as sd
-import soundfile as sf
 import numpy as np
 
 from codewhisper.transcriber import CodeWhisper
+from codewhisper.vad import StreamChunker
 from codewhisper.history_manager import HistoryManager
 from codewhisper.console import preview_text
 
@@ -62,13 +62,18 @@ class CodeWhisperApp(rumps.App):
         self._recording_seq = 0
         self._chunk_text_lock = threading.Lock()
         self._chunk_texts = {}
+        self._chunk_corrections = {}
+        # 等待转录的分块：推理慢于实时、分块积压时一次取出多个合成一个批次
+        self._pending_chunks = deque()
+        self._chunk_batch_size = max(1, int(os.environ.get("CODEWHISPER_CHUNK_BATCH", "4")))
         self.transcribe_mode = self._load_gui_config().get("transcribe_mode", "fast")
         self._refresh_mode_menu_state()
 
         try:
-            print("📦 加载 CodeWhisper 模型...")
-            self.whisper = CodeWhisper(model_name="medium") #模型可选择 tiny base small medium large
-            print("✅ 模型加载完成")
+            print("📦 加载 CodeWhisper（模型在后台加载，菜单栏图标先出现）...")
+            # 模型可选择 tiny base small medium large；加载完成前的录音会排队，加载完成后自动转录
+            self.whisper = CodeWhisper(model_name="medium", watch_dict=True, background_load=True)
+            self.whisper.ready.add_done_callback(self._on_model_ready)
         except Exception as e:
             print(f"❌ 模型加载失败: {e}")
             self.whisper = None
@@ -76,6 +81,15 @@ class CodeWhisperApp(rumps.App):
         self._refresh_history_menu()
         self._start_hold_to_record_hotkey()
 
+    def _on_model_ready(self, future) -> None:
+        """模型后台加载结束（在加载线程中回调）"""
+        error = future.exception()
+        if error is not None:
+            print(f"❌ 模型加载失败: {error}")
+            self._enqueue_set_title("❌")
+        else:
+            print("✅ 模型加载完成")
+
     def _gui_config_path(self):
         from pathlib import Path
         project_root = Path(__file__).parent.parent
@@ -148,6 +162,7 @@ class CodeWhisperApp(rumps.App):
         self._recording_seq += 1
         with self._chunk_text_lock:
             self._chunk_texts = {}
+            self._chunk_corrections = {}
 
         self.is_recording = True
         sender.title = "停止录音"
@@ -163,9 +178,12 @@ class CodeWhisperApp(rumps.App):
 
     def _record_audio(self):
         """后台线程：录音"""
-        audio_buffer = []
+        # 按回调块保存录音（每块一个 float32 数组），需要时再拼接
+        audio_blocks = []
         buffer_lock = threading.Lock()
         recording_seq = self._recording_seq
+        # 录音过程中切换模式只影响下一次录音
+        fast_mode = self.transcribe_mode == "fast"
         try:
             print("🎙️ 开始录音...")
 
@@ -175,7 +193,7 @@ class CodeWhisperApp(rumps.App):
                 if self.is_recording:
                     # callback 在音频线程里运行，避免与分块调度/切片并发冲突
                     with buffer_lock:
-                        audio_buffer.extend(indata[:, 0].copy())
+                        audio_blocks.append(indata[:, 0].copy())
 
             # 使用回调模式录音，便于及时响应停止信号
             self.stream = sd.InputStream(
@@ -187,75 +205,82 @@ class CodeWhisperApp(rumps.App):
             )
 
             with self.stream:
-                next_chunk_start = 0
+                # 尚未切出的音频（从当前分块起点开始），以及已读取的回调块数
+                pending = np.zeros(0, dtype="float32")
+                consumed_blocks = 0
                 chunk_index = 0
 
                 # 极速模式：边录边分块转录，减少录音结束后的等待
-                if self.transcribe_mode == "fast":
+                if fast_mode:
                     chunk_seconds = float(os.environ.get("CODEWHISPER_CHUNK_SECONDS", "10"))
                     min_final_seconds = float(os.environ.get("CODEWHISPER_MIN_FINAL_SECONDS", "1.5"))
-                    chunk_samples = max(1, int(self.sample_rate * chunk_seconds))
+                    max_chunk_seconds = os.environ.get("CODEWHISPER_CHUNK_MAX_SECONDS")
+                    # 切点选在名义边界附近能量最低处，长停顿时提前切分，分块时长不超过上限
+                    chunker = StreamChunker(
+                        self.sample_rate,
+                        target_seconds=chunk_seconds,
+                        max_seconds=float(max_chunk_seconds) if max_chunk_seconds else None,
+                        pause_seconds=float(os.environ.get("CODEWHISPER_CHUNK_PAUSE_SECONDS", "0.8")),
+                    )
+                    # 每新增 0.25 秒音频才取出并重新找一次切点
+                    check_samples = self.sample_rate // 4
                     min_final_samples = max(1, int(self.sample_rate * min_final_seconds))
                 else:
                     # 全量模式：录完再统一转录
-                    chunk_samples = None
+                    chunker = None
                     min_final_samples = None
 
                 while self.is_recording:
                     sd.sleep(20)
-                    if self.transcribe_mode == "fast":
-                        # 录音进行中：只要累计超过一个 chunk，就切一段出来异步转录
-                        while True:
-                            with buffer_lock:
-                                available = len(audio_buffer) - next_chunk_start
-                                if available < chunk_samples:
-                                    break
-                                chunk = np.array(
-                                    audio_buffer[next_chunk_start: next_chunk_start + chunk_samples],
-                                    dtype="float32",
-                                )
-                                next_chunk_start += chunk_samples
-
-                            self.transcribe_executor.submit(
-                                self._transcribe_chunk_store,
-                                recording_seq,
-                                chunk_index,
-                                chunk,
-                            )
-                            chunk_index += 1
-
-            if self.transcribe_mode == "fast":
+                    if chunker is None:
+                        continue
+                    with buffer_lock:
+                        fresh = audio_blocks[consumed_blocks:]
+                        if sum(len(block) for block in fresh) < check_samples:
+                            continue
+                        consumed_blocks = len(audio_blocks)
+                    pending = np.concatenate([pending] + fresh)
+
+                    # 录音进行中：找到切点就切一段出来异步转录（一次新增的音频里可能有多个切点）
+                    while True:
+                        cut = chunker.find_cut(pending)
+                        if cut is None:
+                            break
+                        self._submit_chunk(recording_seq, chunk_index, pending[:cut].copy())
+                        chunk_index += 1
+                        pending = pending[cut:]
+
+            with buffer_lock:
+                total_samples = sum(len(block) for block in audio_blocks)
+                if fast_mode:
+                    fresh = audio_blocks[consumed_blocks:]
+                    if fresh:
+                        pending = np.concatenate([pending] + fresh)
+
+            if fast_mode:
                 # 录音停止后，把剩余未处理的尾巴也丢去转录；太短则不转，避免浪费开销
-                with buffer_lock:
-                    tail = np.array(audio_buffer[next_chunk_start:], dtype="float32")
-
-                if len(tail) >= min_final_samples:
-                    self.transcribe_executor.submit(
-                        self._transcribe_chunk_store,
-                        recording_seq,
-                        chunk_index,
-                        tail,
-                    )
+                if len(pending) >= min_final_samples:
+                    self._submit_chunk(recording_seq, chunk_index, pending.copy())
                     chunk_index += 1
 
-            duration = len(audio_buffer) / self.sample_rate if self.sample_rate else 0
+            duration = total_samples / self.sample_rate if self.sample_rate else 0
             print(f"✓ 录音完成，共 {duration:.2f} 秒")
-            print(f"✓ 录音数据点数: {len(audio_buffer)}")
+            print(f"✓ 录音数据点数: {total_samples}")
             self._enqueue_set_title("⏳")
 
-            if not audio_buffer:
+            if not total_samples:
                 print("⚠️ 未捕获到音频，跳过转录")
                 self._enqueue_set_title("🎙️")
                 return
 
-            if self.transcribe_mode == "fast":
+            if fast_mode:
                 # 最终拼接/复制/写历史：排在 executor 队列尾部，确保先跑完所有分块
                 self.transcribe_executor.submit(self._finalize_chunked_transcription, recording_seq)
             else:
                 # 全量模式：一次性转录整段，标点/上下文更好
                 self.transcribe_executor.submit(
                     self._transcribe_audio,
-                    np.array(audio_buffer, dtype="float32"),
+                    np.concatenate(audio_blocks),
                 )
 
         except Exception as e:
@@ -269,6 +294,67 @@ class CodeWhisperApp(rumps.App):
             self.is_recording = False
 
 
+    # 分块转录参数：关闭 initial_prompt 和术语学习，提高静音阈值
+    _CHUNK_TRANSCRIBE_OPTIONS = dict(
+        language="zh",
+        fix_programmer_terms=True,
+        verbose=False,
+        # 分块转录时关闭 initial_prompt，能明显减少“提示词术语列表”幻觉
+        use_initial_prompt=False,
+        # 分块转录不做用户术语学习，避免频繁写盘/扰动 prompt
+        learn_user_terms=False,
+        # 分块更容易遇到静音/半句，适当提高静音阈值减少幻觉
+        silence_rms_threshold=0.0035,
+        silence_peak_threshold=0.03,
+    )
+
+    def _submit_chunk(self, recording_seq: int, chunk_index: int, audio_array: np.ndarray) -> None:
+        """分块先进入等待队列，每个分块对应一次批量转录任务（积压的分块会被前面的任务一并取走）"""
+        self._pending_chunks.append((recording_seq, chunk_index, audio_array))
+        self.transcribe_executor.submit(self._transcribe_pending_chunks)
+
+    def _transcribe_pending_chunks(self) -> None:
+        """
+        取出积压的分块一起转录：只有一个时走普通转录，多个时叠成一个批次，编码器/解码器只跑一遍。
+
+        任务数与分块数相同，所以队列总能被取空；收尾任务排在最后一个分块的任务之后。
+        """
+        batch = []
+        while self._pending_chunks and len(batch) < self._chunk_batch_size:
+            recording_seq, chunk_index, audio_array = self._pending_chunks.popleft()
+            # 录音 session 已切换，丢弃旧分块
+            if recording_seq != self._recording_seq or audio_array is None or audio_array.size == 0:
+                continue
+            batch.append((recording_seq, chunk_index, audio_array))
+
+        if not batch or not self.whisper:
+            return
+        if len(batch) == 1:
+            self._transcribe_chunk_store(*batch[0])
+            return
+
+        try:
+            print(f"📦 分块积压，批量转录 {len(batch)} 段")
+            results = self.whisper.transcribe_batch(
+                [audio_array for _, _, audio_array in batch],
+                batch_size=len(batch),
+                **self._CHUNK_TRANSCRIBE_OPTIONS,
+            )
+            for (_, chunk_index, _), result in zip(batch, results):
+                self._store_chunk_result(chunk_index, result)
+        except Exception as e:
+            print(f"❌ 分块批量转录失败: {e}")
+
+    def _store_chunk_result(self, chunk_index: int, result: dict) -> None:
+        text = (result.get("text") or "").strip()
+        if not text:
+            return
+
+        with self._chunk_text_lock:
+            # executor 默认单线程，但这里仍用锁以防未来调整并发
+            self._chunk_texts[int(chunk_index)] = text
+            self._chunk_corrections[int(chunk_index)] = result.get("corrections", [])
+
     def _transcribe_chunk_store(self, recording_seq: int, chunk_index: int, audio_array: np.ndarray) -> None:
         """
         转录一个音频分块并存入累计结果（不更新 UI/剪贴板/历史；用于“边录边转录”）。
@@ -283,41 +369,12 @@ class CodeWhisperApp(rumps.App):
         if not self.whisper:
             return
 
-        temp_audio_file = None
         try:
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-                temp_audio_file = tmp_file.name
-                sf.write(temp_audio_file, audio_array, self.sample_rate)
-
-            result = self.whisper.transcribe(
-                temp_audio_file,
-                language="zh",
-                fix_programmer_terms=True,
-                verbose=False,
-                # 分块转录时关闭 initial_prompt，能明显减少“提示词术语列表”幻觉
-                use_initial_prompt=False,
-                # 分块转录不做用户术语学习，避免频繁写盘/扰动 prompt
-                learn_user_terms=False,
-                # 分块更容易遇到静音/半句，适当提高静音阈值减少幻觉
-                silence_rms_threshold=0.0035,
-                silence_peak_threshold=0.03,
-            )
-            text = (result.get("text") or "").strip()
-            if not text:
-                return
-
-            with self._chunk_text_lock:
-                # executor 默认单线程，但这里仍用锁以防未来调整并发
-                self._chunk_texts[int(chunk_index)] = text
+            # 分块数组直接交给 Whisper，不再写临时 WAV 再读回
+            result = self.whisper.transcribe(audio_array, **self._CHUNK_TRANSCRIBE_OPTIONS)
+            self._store_chunk_result(chunk_index, result)
         except Exception as e:
             print(f"❌ 分块转录失败: {e}")
-        finally:
-            if temp_audio_file:
-                try:
-                    if os.path.exists(temp_audio_file):
-                        os.remove(temp_audio_file)
-                except Exception:
-                    pass
 
 
     def _finalize_chunked_transcription(self, recording_seq: int) -> None:
@@ -329,6 +386,11 @@ class CodeWhisperApp(rumps.App):
             with self._chunk_text_lock:
                 texts = [self._chunk_texts[k] for k in sorted(self._chunk_texts.keys())]
                 final_text = "".join([t for t in texts if isinstance(t, str)]).strip()
+                corrections = [
+                    correction
+                    for k in sorted(self._chunk_corrections.keys())
+                    for correction in self._chunk_corrections[k]
+                ]
 
             if not final_text:
                 print("⚠️ 最终文本为空，跳过复制/写入历史")
@@ -340,7 +402,7 @@ class CodeWhisperApp(rumps.App):
             self.history_manager.add(final_text)
             self._enqueue_history_refresh()
             self._enqueue_set_title("✅")
-            self._print_dict_stats()
+            self._print_dict_stats(corrections)
         except Exception as e:
             print(f"❌ 最终收尾失败: {e}")
             self._enqueue_set_title("❌")
@@ -348,29 +410,25 @@ class CodeWhisperApp(rumps.App):
 
     def _transcribe_audio(self, audio_array: np.ndarray):
         """转录音频"""
-        temp_audio_file = None
         try:
             print("🔄 转录中...")
             self._enqueue_set_title("⏳")
 
             print(f"📊 音频数组形状: {audio_array.shape}")
 
-            #创建包装成临时WAV文件，准备喂给Whisper模型
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-                temp_audio_file = tmp_file.name
-                sf.write(temp_audio_file, audio_array, self.sample_rate)
-                print(f"💾 音频已保存到: {temp_audio_file}")
-
             #兜底保护
             if not self.whisper:
                 print("❌ 模型未加载")
                 self._enqueue_set_title("❌")
                 return
+            if not self.whisper.is_ready():
+                print("⏳ 模型仍在加载，录音已排队，加载完成后自动转录")
 
             # 使用 CodeWhisper 转录
             print("🔊（Whisper中文模型）CodeWhisper开始转录...")
+            # 录音数组直接喂给 Whisper（16kHz float32），不经过临时文件
             result = self.whisper.transcribe(
-                temp_audio_file,
+                audio_array,
                 language="zh",#走中文模型
                 fix_programmer_terms=True,
                 verbose=True
@@ -388,7 +446,7 @@ class CodeWhisperApp(rumps.App):
             self._enqueue_set_title("✅")
 
             # 打印字典修正统计信息
-            self._print_dict_stats()
+            self._print_dict_stats(result.get("corrections", []))
 
         except Exception as e:
             print(f"❌ 转录错误: {e}")
@@ -396,16 +454,6 @@ class CodeWhisperApp(rumps.App):
             traceback.print_exc()
             self._enqueue_set_title("❌")
 
-        finally:
-            # 清理临时文件
-            if temp_audio_file:
-                try:
-                    if os.path.exists(temp_audio_file):
-                        os.remove(temp_audio_file)
-                        print(f"🗑️ 已删除临时文件")
-                except Exception as e:
-                    print(f"删除临时文件失败: {e}")
-
     def _copy_to_clipboard(self, text):
         """复制文本到剪切板"""
         try:
@@ -540,11 +588,10 @@ class CodeWhisperApp(rumps.App):
         except Exception as e:
             print(f"❌ 清除历史记录失败: {e}")
 
-    def _print_dict_stats(self):
-        """打印字典修正的统计信息"""
+    def _print_dict_stats(self, corrections: list):
+        """打印字典修正的统计信息（corrections 为本次转录请求的修正记录）"""
         try:
             stats = self.whisper.get_dict_stats()
-            corrections = self.whisper.dict_manager.get_corrections()
 
             print(f"\n📊 字典修正统计信息:")
             print(f"  📚 总规则数: {stats['total_rules']}")
@@ -705,7 +752,7 @@ class CodeWhisperApp(rumps.App):
             # 保存到字典
             if self._save_term_to_dict(correct_term, wrong_variant):
                 # 用 AppleScript 显示通知
-                notify_script = f'display notification "重启后生效" with title "添加成功" subtitle "{wrong_variant} → {correct_term}"'
+                notify_script = f'display notification "已生效" with title "添加成功" subtitle "{wrong_variant} → {correct_term}"'
                 subprocess.run(['osascript', '-e', notify_script])
             else:
                 subprocess.run(['osascript', '-e', 'display notification "保存出错" with title "添加失败"'])
@@ -714,50 +761,29 @@ class CodeWhisperApp(rumps.App):
             print(f"❌ 快速添加失败: {e}")
 
     def _save_term_to_dict(self, correct_term: str, wrong_variant: str) -> bool:
-        """保存术语到字典的 other 分类"""
-        import json
-        from pathlib import Path
+        """
+        保存术语到字典的 other 分类
 
+        立即在内存中生效，并以增量日志的形式追加写盘（稍后自动合并进 programmer_terms.json），
+        其他正在运行的 CodeWhisper 进程会通过文件监听很快感知到新术语。
+        """
         try:
-            # 字典文件路径
-            project_root = Path(__file__).parent.parent
-            dict_path = project_root / "dictionaries" / "programmer_terms.json"
-
-            # 读取字典
-            with open(dict_path, 'r', encoding='utf-8') as f:
-                dict_data = json.load(f)
-
-            # 获取 other 分类
-            other_category = dict_data["categories"].get("other", {})
-            terms = other_category.setdefault("terms", {})
-
-            # 检查术语是否已存在
-            if correct_term in terms:
-                # 已存在，添加变体
-                variants = terms[correct_term].setdefault("variants", [])
-                # 检查变体是否已存在
-                for v in variants:
-                    if v.get("wrong") == wrong_variant:
-                        print(f"变体已存在: {wrong_variant}")
-                        return True
-                variants.append({
-                    "wrong": wrong_variant,
-                    "description": "通过快速添加添加"
-                })
+            if self.whisper:
+                dict_manager = self.whisper.dict_manager
             else:
-                # 不存在，创建新术语
-                terms[correct_term] = {
-                    "correct": correct_term,
-                    "description": "通过快速添加添加",
-                    "variants": [{
-                        "wrong": wrong_variant,
-                        "description": "通过快速添加添加"
-                    }]
-                }
-
-            # 保存字典
-            with open(dict_path, 'w', encoding='utf-8') as f:
-                json.dump(dict_data, f, ensure_ascii=False, indent=2)
+                from codewhisper.dict_manager import DictionaryManager
+                dict_manager = DictionaryManager()
+
+            changed = dict_manager.add_rule(
+                wrong_variant,
+                correct_term,
+                category="other",
+                description="通过快速添加添加",
+                persist=True,
+            )
+            if not changed:
+                print(f"变体已存在: {wrong_variant}")
+                return True
 
             print(f"✅ 已添加术语: {wrong_variant} → {correct_term}")
             return True
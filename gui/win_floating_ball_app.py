@@ -3,10 +3,8 @@ CodeWhisper FloatingBall Application - Windows悬浮球应用（使用 Pyside6
 """
 import sys
 import threading
-import tempfile
 import numpy as np
 import sounddevice as sd
-import soundfile as sf
 from PySide6.QtCore import Qt, QPoint, Signal, Slot
 from PySide6.QtGui import QColor, QPainter
 from PySide6.QtWidgets import QApplication, QWidget, QToolTip
@@ -33,7 +31,9 @@ class FloatingBall(QWidget):
         self.sample_rate = 16000
         self.stream = None
         try:
-            self.whisper = CodeWhisper(model_name="small")
+            # 模型在后台加载，悬浮球先显示；加载完成前的录音会等待模型就绪后再转写
+            self.whisper = CodeWhisper(model_name="small", watch_dict=True, background_load=True)
+            self.whisper.ready.add_done_callback(self._on_model_ready)
         except Exception as e:
             print(f"模型加载失败: {e}")
             self.whisper = None
@@ -52,6 +52,10 @@ class FloatingBall(QWidget):
         print(f"悬浮球已启动，位置: ({x}, {y})，尺寸: {self.width()}x{self.height()}")
         self.show()
 
+    def _on_model_ready(self, future):
+        error = future.exception()
+        print(f"模型加载失败: {error}" if error is not None else "模型加载完成")
+
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing, True)
@@ -101,26 +105,30 @@ class FloatingBall(QWidget):
                 self.stream = s
                 while self.recording:
                     data, _ = s.read(1024)
-                    self.audio_data.extend(data.flatten().tolist())
-            duration = len(self.audio_data) / self.sample_rate if self.sample_rate else 0
+                    # 按块保存 float32 数组，转录时只拼接一次
+                    self.audio_data.append(data[:, 0])
+            samples = sum(len(block) for block in self.audio_data)
+            duration = samples / self.sample_rate if self.sample_rate else 0
             print(f"录音完成: {duration:.2f}s")
             self._transcribe_audio()
         except Exception as e:
             print(f"录音错误: {e}")
 
     def _transcribe_audio(self):
-        temp_audio_file = None
         try:
-            audio_array = np.array(self.audio_data, dtype="float32")
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                temp_audio_file = tmp.name
-                sf.write(temp_audio_file, audio_array, self.sample_rate)
+            if not self.audio_data:
+                print("未捕获到音频")
+                return
+            audio_array = np.concatenate(self.audio_data).astype("float32", copy=False)
             if not self.whisper:
                 print("模型未加载")
                 return
+            if not self.whisper.is_ready():
+                print("模型仍在加载，录音已排队，加载完成后自动转写")
             print("转写中...")
+            # 录音数组直接交给 Whisper（16kHz float32），不写临时 WAV
             result = self.whisper.transcribe(
-                temp_audio_file,
+                audio_array,
                 language="zh",
                 fix_programmer_terms=True,
                 verbose=True
@@ -128,17 +136,9 @@ class FloatingBall(QWidget):
             text = result.get("text", "")
             print(f"转写完成: {text[:80]}")
             self.textReady.emit(text)
-            self._print_dict_stats()
+            self._print_dict_stats(result.get("corrections", []))
         except Exception as e:
             print(f"转录错误: {e}")
-        finally:
-            if temp_audio_file:
-                try:
-                    import os
-                    if os.path.exists(temp_audio_file):
-                        os.remove(temp_audio_file)
-                except Exception as e:
-                    print(f"清理失败: {e}")
 
     @Slot(str)
     def _copy_to_clipboard(self, text: str):
@@ -150,11 +150,10 @@ class FloatingBall(QWidget):
         except Exception as e:
             print(f"剪贴板错误: {e}")
 
-    def _print_dict_stats(self):
-        """打印词典修正统计，和 mac 版保持一致输出。"""
+    def _print_dict_stats(self, corrections: list):
+        """打印词典修正统计（本次请求的修正记录），和 mac 版保持一致输出。"""
         try:
             stats = self.whisper.get_dict_stats()
-            corrections = self.whisper.dict_manager.get_corrections()
 
             print("\n词典修正统计信息:")
             print(f"  总规则数: {stats.get('total_rules')}")
@@ -0,0 +1,43 @@
+"""
+测试公共夹具：预编译缓存写到临时目录，字典用小型 JSON 临时生成
+"""
+
+import json
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """预编译字典写到每个测试自己的缓存目录，不碰用户的 ~/.cache"""
+    path = tmp_path / "cache"
+    monkeypatch.setenv("CODEWHISPER_CACHE_DIR", str(path))
+    return path
+
+
+def dict_data(categories):
+    """{分类: {正确术语: [错误变体...]}} → 字典文件的 JSON 结构"""
+    return {
+        "version": "test",
+        "categories": {
+            category: {
+                "terms": {
+                    correct: {"correct": correct, "variants": [{"wrong": wrong} for wrong in variants]}
+                    for correct, variants in terms.items()
+                }
+            }
+            for category, terms in categories.items()
+        },
+    }
+
+
+@pytest.fixture
+def write_dict(tmp_path):
+    """在临时目录写一份字典文件，返回路径"""
+
+    def write(categories, name="terms.json"):
+        path = tmp_path / name
+        path.write_text(json.dumps(dict_data(categories), ensure_ascii=False), encoding="utf-8")
+        return str(path)
+
+    return write
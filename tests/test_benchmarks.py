@@ -0,0 +1,34 @@
+"""
+基准测试冒烟测试：小规模跑通、黄金语料全部通过、回归对比能发现变慢
+"""
+
+import copy
+import json
+
+from benchmarks import dict_benchmark
+
+
+def test_small_run_writes_report_and_passes_golden(tmp_path):
+    output = tmp_path / "bench.json"
+
+    exit_code = dict_benchmark.main([
+        "--sizes", "300", "--text-lengths", "50,500",
+        "--min-runs", "1", "--max-runs", "2", "--min-seconds", "0", "--output", str(output),
+    ])
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert exit_code == 0
+    assert report["golden"]["cases"] > 0 and report["golden"]["failed"] == 0
+    (entry,) = report["results"]
+    assert entry["dict_size"] == 300
+    assert [text["length"] for text in entry["texts"]] == [50, 500]
+    for text in entry["texts"]:
+        assert text["fix_text"]["p50_ms"] <= text["fix_text"]["p99_ms"]
+
+    # 与自己对比没有回归；p50 变慢一倍就会被报告
+    assert dict_benchmark.compare_results(report, report, 0.2) == []
+    slower = copy.deepcopy(report)
+    slower["results"][0]["texts"][0]["fix_text"]["p50_ms"] = report["results"][0]["texts"][0]["fix_text"]["p50_ms"] * 2 + 1
+    assert [line.split(":")[0] for line in dict_benchmark.compare_results(slower, report, 0.2)] == [
+        "[300/50] fix_text.p50_ms"
+    ]
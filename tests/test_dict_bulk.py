@@ -0,0 +1,41 @@
+"""
+批量修正测试：多进程与单进程结果一致且保持输入顺序，JSONL 逐行写回
+"""
+
+import json
+
+from codewhisper.dict_manager import DictionaryManager
+
+TERMS = {"database": {"Redis": ["瑞迪斯"], "MySQL": ["买SQL"]}, "work_terms": {"提测": ["体测"]}}
+
+
+def corpus(count: int):
+    samples = ["瑞迪斯挂了", "今天体测", "买SQL慢查询", "没有术语", ""]
+    return (f"{k}:{samples[k % len(samples)]}" for k in range(count))
+
+
+def test_parallel_results_match_sequential_order(write_dict):
+    manager = DictionaryManager(write_dict(TERMS))
+
+    sequential = list(manager.fix_texts(corpus(200), workers=1))
+    parallel = list(manager.fix_texts(corpus(200), workers=2, chunk_size=7))
+
+    assert parallel == sequential
+    assert sequential[0] == ("0:Redis挂了", [
+        {"wrong": "瑞迪斯", "correct": "Redis", "category": "database", "start": 2, "end": 5}
+    ])
+    assert [text.split(":")[0] for text, _ in parallel] == [str(k) for k in range(200)]
+    # 批量修正不写共享的修正记录和计数
+    assert manager.stats["replacements_made"] == 0
+
+
+def test_jsonl_is_rewritten_line_by_line(write_dict, tmp_path):
+    manager = DictionaryManager(write_dict(TERMS))
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    source.write_text('{"id": 1, "text": "瑞迪斯"}\n\n"体测通过"\n', encoding="utf-8")
+
+    assert manager.fix_jsonl(str(source), str(output), workers=1) == 2
+
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [record["text"] for record in records] == ["Redis", "提测通过"]
+    assert records[0]["id"] == 1 and records[1]["corrections"][0]["wrong"] == "体测"
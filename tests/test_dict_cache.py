@@ -0,0 +1,73 @@
+"""
+预编译字典缓存测试：内容不变时复用产物，内容变化或文件头不符时重新构建且不反序列化
+"""
+
+import hashlib
+import os
+import pickle
+
+import pytest
+
+from codewhisper import dict_cache
+from codewhisper.dict_cache import COMPILED_MAGIC, COMPILED_VERSION, _COMPILED_HEADER, compiled_path
+from codewhisper.dict_manager import DictionaryManager
+
+# 被 unpickle 时会记下一笔的载荷，用来确认伪造的产物没有被反序列化
+UNPICKLED = []
+
+
+class Payload:
+    def __reduce__(self):
+        return (UNPICKLED.append, ("executed",))
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def write_artifact(dict_file: str, magic: bytes, digest: str) -> None:
+    path = compiled_path(dict_file)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(_COMPILED_HEADER.pack(magic, COMPILED_VERSION, bytes.fromhex(digest)))
+        pickle.dump(Payload(), f)
+
+
+def test_artifact_is_reused_while_dict_is_unchanged(write_dict, cache_dir, monkeypatch):
+    dict_file = write_dict({"database": {"Redis": ["瑞迪斯"]}})
+    DictionaryManager(dict_file)
+    assert compiled_path(dict_file).startswith(str(cache_dir))
+    assert os.path.exists(compiled_path(dict_file))
+
+    def fail(*args):
+        raise AssertionError("不应重新编译")
+
+    monkeypatch.setattr(DictionaryManager, "_compile", fail)
+    assert DictionaryManager(dict_file).fix_text("瑞迪斯") == "Redis"
+
+
+def test_changed_dict_is_rebuilt(write_dict):
+    dict_file = write_dict({"database": {"Redis": ["瑞迪斯"]}})
+    DictionaryManager(dict_file)
+
+    write_dict({"database": {"Redis": ["瑞迪斯"], "MySQL": ["买SQL"]}})
+    manager = DictionaryManager(dict_file)
+
+    assert manager.fix_text("买SQL和瑞迪斯") == "MySQL和Redis"
+    assert dict_cache.load_compiled(dict_file, file_digest(dict_file))["hash"] == file_digest(dict_file)
+
+
+@pytest.mark.parametrize("magic, stale", [(b"NOTCWDC\0", False), (COMPILED_MAGIC, True)])
+def test_foreign_or_stale_artifact_is_never_unpickled(write_dict, magic, stale):
+    UNPICKLED.clear()
+    dict_file = write_dict({"database": {"Redis": ["瑞迪斯"]}})
+    digest = hashlib.sha256(b"other content").hexdigest() if stale else file_digest(dict_file)
+    write_artifact(dict_file, magic, digest)
+
+    manager = DictionaryManager(dict_file)
+
+    assert UNPICKLED == []
+    assert manager.fix_text("瑞迪斯") == "Redis"
+    # 重新构建后写回了一份有效产物
+    assert dict_cache.load_compiled(dict_file, file_digest(dict_file)) is not None
@@ -0,0 +1,89 @@
+"""
+字典增量日志测试：追加与断行读取、合并回主字典、其他进程的编辑热更新
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+from codewhisper.dict_delta import append_delta, delta_path, read_deltas
+from codewhisper.dict_manager import DictionaryManager
+
+REDIS = {"database": {"Redis": ["瑞迪斯"]}}
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def test_half_written_line_is_left_for_next_read(write_dict):
+    dict_file = write_dict(REDIS)
+    append_delta(dict_file, {"op": "add", "wrong": "卡夫卡", "correct": "Kafka"})
+    with open(delta_path(dict_file), "ab") as f:
+        f.write(b'{"op": "remove", "wro')
+
+    ops, offset = read_deltas(delta_path(dict_file))
+    assert [op["wrong"] for op in ops] == ["卡夫卡"]
+
+    with open(delta_path(dict_file), "ab") as f:
+        f.write('ng": "瑞迪斯"}\n'.encode("utf-8"))
+    ops, _ = read_deltas(delta_path(dict_file), offset)
+    assert ops == [{"op": "remove", "wrong": "瑞迪斯"}]
+
+
+def test_merge_folds_log_into_dict_file(write_dict):
+    dict_file = write_dict(REDIS)
+    manager = DictionaryManager(dict_file)
+    manager.add_rule("卡夫卡", "Kafka", category="middleware", persist=True)
+    manager.remove_rule("瑞迪斯", persist=True)
+
+    assert manager.merge_deltas() == 2
+    assert not os.path.exists(delta_path(dict_file))
+    with open(dict_file, encoding="utf-8") as f:
+        terms = json.load(f)["categories"]["middleware"]["terms"]
+    assert terms["Kafka"]["variants"][0]["wrong"] == "卡夫卡"
+
+    reopened = DictionaryManager(dict_file)
+    assert reopened.fix_text("卡夫卡和瑞迪斯") == "Kafka和瑞迪斯"
+    assert manager.check_for_updates() == 0
+
+
+def test_other_managers_pick_up_persisted_edits(write_dict):
+    dict_file = write_dict(REDIS)
+    writer, reader = DictionaryManager(dict_file), DictionaryManager(dict_file)
+    reader.start_watching(interval=0.01)
+    try:
+        writer.add_rule("卡夫卡", "Kafka", persist=True)
+        assert wait_until(lambda: reader.fix_text("卡夫卡") == "Kafka")
+
+        # 合并后日志换成新文件，读取方从头读新日志
+        writer.merge_deltas()
+        writer.add_rule("瑞迪斯", "REDIS", persist=True)
+        assert wait_until(lambda: reader.fix_text("瑞迪斯") == "REDIS")
+    finally:
+        reader.stop_watching()
+    assert reader.fix_text("卡夫卡") == "Kafka"
+
+
+def test_half_saved_dict_file_is_retried_after_next_save(write_dict):
+    dict_file = write_dict(REDIS)
+    manager = DictionaryManager(dict_file)
+
+    with open(dict_file, "w", encoding="utf-8") as f:
+        f.write('{"categories": {"database": ')
+    with pytest.raises(ValueError):
+        manager.check_for_updates()
+    # 内容不变时不再重复解析
+    assert manager.check_for_updates() == 0
+    assert manager.fix_text("瑞迪斯") == "Redis"
+
+    write_dict({"database": {"Redis": ["瑞迪斯"], "MySQL": ["买SQL"]}})
+    assert manager.check_for_updates() == 1
+    assert manager.fix_text("买SQL") == "MySQL"
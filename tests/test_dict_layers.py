@@ -0,0 +1,59 @@
+"""
+字典分层测试：同一变体由优先级最高的层生效，停用、注销后恢复下层规则
+"""
+
+from codewhisper.dict_manager import DictionaryManager
+
+BASE = {"backend": {"Redis": ["瑞迪斯"], "Kafka": ["卡夫卡"]}}
+TEAM = {"team": {"Redis集群": ["瑞迪斯"], "提测": ["体测"]}}
+PERSONAL = {"personal": {"RedisCluster": ["瑞迪斯"]}}
+
+
+def test_higher_priority_layer_shadows_lower_layers(write_dict):
+    manager = DictionaryManager(write_dict(BASE))
+    manager.add_layer("team", write_dict(TEAM, "team.json"), priority=10)
+
+    assert manager.fix_text("瑞迪斯和卡夫卡要体测") == "Redis集群和Kafka要提测"
+    layers = {layer["name"]: layer for layer in manager.list_layers()}
+    assert [layer["name"] for layer in manager.list_layers()] == ["team", "base"]
+    assert layers["base"]["shadowed"] == 1 and layers["team"]["shadowed"] == 0
+
+    manager.add_layer("personal", write_dict(PERSONAL, "personal.json"), priority=20)
+    assert manager.fix_text("瑞迪斯") == "RedisCluster"
+
+
+def test_equal_priority_keeps_first_registered_layer(write_dict):
+    manager = DictionaryManager(write_dict(BASE))
+    manager.add_layer("team", write_dict(TEAM, "team.json"), priority=0)
+
+    assert manager.fix_text("瑞迪斯要体测") == "Redis要提测"
+
+
+def test_disable_and_remove_restore_lower_layers(write_dict):
+    manager = DictionaryManager(write_dict(BASE))
+    manager.add_layer("team", write_dict(TEAM, "team.json"), priority=10)
+
+    assert manager.disable_layer("team")
+    assert manager.fix_text("瑞迪斯要体测") == "Redis要体测"
+    assert {layer["name"]: layer["shadowed"] for layer in manager.list_layers()} == {"team": 0, "base": 0}
+
+    assert manager.enable_layer("team")
+    assert manager.fix_text("瑞迪斯要体测") == "Redis集群要提测"
+
+    assert manager.remove_layer("team")
+    assert not manager.remove_layer("base")
+    assert manager.fix_text("瑞迪斯要体测") == "Redis要体测"
+    assert [layer["name"] for layer in manager.list_layers()] == ["base"]
+
+
+def test_layers_load_lazily_and_reject_bad_input(write_dict, tmp_path):
+    manager = DictionaryManager(write_dict(BASE))
+
+    assert manager.add_layer("team", write_dict(TEAM, "team.json"), priority=10, enabled=False)
+    assert manager.list_layers()[0]["loaded"] is False
+    assert manager.fix_text("体测") == "体测"
+    assert not manager.add_layer("team", write_dict(TEAM, "team.json"))
+    assert not manager.enable_layer("missing")
+
+    assert manager.add_layer("ghost", str(tmp_path / "ghost.json"), enabled=False)
+    assert not manager.enable_layer("ghost")
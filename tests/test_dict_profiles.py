@@ -0,0 +1,70 @@
+"""
+纠错档案测试：按分类开关规则、按请求切换，分类过滤后再判定层覆盖
+"""
+
+import pytest
+
+from codewhisper.dict_manager import DictionaryManager
+
+TERMS = {
+    "work_terms": {"提测": ["体测"], "排期": ["拍期"]},
+    "student_terms": {"秋招": ["丘招"]},
+    "backend": {"Redis": ["瑞迪斯"], "Python": ["派森富"]},
+}
+TEAM = {"team": {"PythonPlus": ["派森富"]}}
+
+
+def test_profiles_switch_categories_per_request(write_dict):
+    manager = DictionaryManager(write_dict(TERMS), profiles={
+        "student": {"exclude": ["work_terms"]},
+        "work": {"include": ["work_terms", "backend"]},
+    })
+    text = "丘招前要体测瑞迪斯"
+
+    assert manager.fix_text(text) == "秋招前要提测Redis"
+    assert manager.fix_text(text, profile="student") == "秋招前要体测Redis"
+    assert manager.fix_text(text, profile="work") == "丘招前要提测Redis"
+
+    manager.set_profile("student")
+    assert manager.get_profile() == "student"
+    assert manager.fix_text(text) == "秋招前要体测Redis"
+    assert manager.list_profiles()["student"]["active_categories"] == ["backend", "student_terms"]
+
+
+def test_profile_switch_does_not_recompile(write_dict):
+    manager = DictionaryManager(write_dict(TERMS), profiles={"student": {"exclude": ["work_terms"]}})
+    matcher = manager.matcher
+
+    for profile in ("student", "all", "student"):
+        manager.fix_text("体测", profile=profile)
+
+    assert manager.matcher is matcher
+    # 同一快照下重复切换只是查缓存
+    assert manager._profile_sources("student") == manager._profile_sources("student")
+
+
+def test_rule_edits_respect_profiles(write_dict):
+    manager = DictionaryManager(write_dict(TERMS), profiles={"student": {"exclude": ["work_terms"]}})
+
+    manager.add_rule("联条", "联调", "work_terms")
+    assert manager.fix_text("联条", profile="student") == "联条"
+    assert manager.fix_text("联条") == "联调"
+
+
+def test_excluded_winning_layer_falls_back_to_lower_layer(write_dict):
+    manager = DictionaryManager(write_dict(TERMS))
+    manager.add_layer("team", write_dict(TEAM, "team.json"), priority=10)
+    manager.define_profile("noteam", exclude=["team"])
+
+    assert manager.fix_text("派森富") == "PythonPlus"
+    # 停用了胜出层的分类后，下层同一变体的规则重新生效
+    assert manager.fix_text("派森富", profile="noteam") == "Python"
+
+
+def test_unknown_and_builtin_profiles_are_rejected(write_dict):
+    manager = DictionaryManager(write_dict(TERMS))
+
+    with pytest.raises(ValueError):
+        manager.set_profile("missing")
+    with pytest.raises(ValueError):
+        manager.define_profile("all", exclude=["backend"])
@@ -0,0 +1,60 @@
+"""
+统计测试：每条规则的命中、替换计数，未命中规则的列出，统计导出、清空与有界的修正记录
+"""
+
+import json
+
+from codewhisper.dict_manager import DictionaryManager
+
+TERMS = {"backend": {"Redis": ["瑞迪斯", "redis"], "Kafka": ["卡夫卡"]}, "work_terms": {"提测": ["体测"]}}
+
+
+def test_rule_stats_count_matches_and_replacements(write_dict):
+    manager = DictionaryManager(write_dict(TERMS))
+    manager.fix_text("瑞迪斯和瑞迪斯要体测")
+    manager.fix_text("Redis")
+
+    rows = {row["variant"]: row for row in manager.get_rule_stats()}
+    assert set(rows) == {"瑞迪斯", "体测", "redis"}
+    assert (rows["瑞迪斯"]["matches"], rows["瑞迪斯"]["replacements"]) == (2, 2)
+    assert rows["体测"]["category"] == "work_terms"
+    # 命中文本已经是正确写法：计入命中，不算替换
+    assert (rows["redis"]["matches"], rows["redis"]["replacements"], rows["redis"]["same_text"]) == (1, 0, 1)
+
+    assert [row["variant"] for row in manager.get_rule_stats(sort_by="replacements", limit=2)] == ["瑞迪斯", "体测"]
+    unused = [row for row in manager.get_rule_stats(include_unused=True) if row["matches"] == 0]
+    assert [(row["variant"], row["correct"]) for row in unused] == [("卡夫卡", "Kafka")]
+
+    stats = manager.get_stats(detail=True)
+    assert stats["replacements_made"] == 3 and stats["scans"] == 2
+    assert len(stats["rules"]) == 3
+
+
+def test_dump_and_reset_stats(write_dict, tmp_path):
+    manager = DictionaryManager(write_dict(TERMS))
+    manager.fix_text("瑞迪斯要体测")
+    path = tmp_path / "stats.json"
+
+    manager.dump_stats(str(path))
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert report["stats"]["replacements_made"] == 2
+    assert len(report["rules"]) == 4
+    assert [c["correct"] for c in report["recent_corrections"]] == ["Redis", "提测"]
+
+    manager.reset_stats()
+    assert manager.get_stats()["replacements_made"] == 0
+    assert manager.get_rule_stats() == []
+    assert manager.get_corrections() == []
+    assert manager.get_stats()["total_rules"] == 4
+
+
+def test_correction_history_is_bounded(write_dict):
+    manager = DictionaryManager(write_dict(TERMS), history_size=3)
+    for _ in range(5):
+        manager.fix_text("瑞迪斯要体测")
+
+    assert len(manager.get_corrections()) == 3
+    assert manager.get_stats()["replacements_made"] == 10
+
+    manager.fix_text("卡夫卡", accumulate=False)
+    assert [c["correct"] for c in manager.get_corrections()] == ["Kafka"]
@@ -0,0 +1,45 @@
+"""
+紧凑字典测试：与 JSON 字典结果一致，经紧凑字典写入的编辑在 JSON 合并增量日志后不丢失
+"""
+
+import hashlib
+
+from codewhisper.dict_manager import DictionaryManager
+from codewhisper.packed_dict import PackedDictionary
+
+TERMS = {"backend": {"Redis": ["瑞迪斯"], "Kafka": ["卡夫卡"]}, "work_terms": {"提测": ["体测"]}}
+TEXT = "瑞迪斯和卡夫卡要体测，还要联条"
+
+
+def test_packed_dict_matches_json(write_dict):
+    manager = DictionaryManager(write_dict(TERMS))
+    packed = DictionaryManager(manager.export_packed())
+
+    assert packed.fix_text(TEXT) == manager.fix_text(TEXT) == "Redis和Kafka要提测，还要联条"
+    assert packed.list_categories() == manager.list_categories()
+
+
+def test_edits_through_packed_survive_json_merge(write_dict):
+    dict_file = write_dict(TERMS)
+    manager = DictionaryManager(dict_file)
+    packed_file = manager.export_packed()
+
+    # 紧凑字典只读，编辑写进与 JSON 共用的增量日志
+    DictionaryManager(packed_file).add_rule("联条", "联调", "work_terms", persist=True)
+    assert DictionaryManager(dict_file).merge_deltas() == 1
+
+    # 合并后日志已清空，紧凑字典随之重新生成
+    with open(dict_file, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    assert PackedDictionary(packed_file, manager._make_rule).source_hash == digest
+    reopened = DictionaryManager(packed_file)
+    assert reopened.fix_text(TEXT) == "Redis和Kafka要提测，还要联调"
+
+
+def test_stale_packed_dict_is_rebuilt_on_open(write_dict):
+    dict_file = write_dict(TERMS)
+    packed_file = DictionaryManager(dict_file).export_packed()
+
+    # JSON 在紧凑字典之外被改写（例如旧版本合并了日志却没有重新生成紧凑字典）
+    write_dict({**TERMS, "team": {"联调": ["联条"]}})
+    assert DictionaryManager(packed_file).fix_text(TEXT) == "Redis和Kafka要提测，还要联调"
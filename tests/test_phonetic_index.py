@@ -0,0 +1,69 @@
+"""
+拼音模糊匹配测试：近音片段的检索，以及默认只标记、开启自动改写后才修正
+"""
+
+import pytest
+
+pytest.importorskip("pypinyin")
+
+from codewhisper.dict_manager import DictionaryManager
+from codewhisper.phonetic_index import PhoneticIndex
+
+TERMS = {"work_terms": {"排期": ["pai期"], "逾期": ["yu期"]}}
+
+
+def test_one_differing_syllable_is_found():
+    index = PhoneticIndex([("排期", "work_terms"), ("逾期", "work_terms"), ("数据库", "database")])
+
+    # 拍/排 只差声调，鱼/逾 读音相同
+    assert index.find("他说要拍期，还有鱼期的问题") == [
+        (3, 5, "排期", "work_terms", 0.857),
+        (8, 10, "逾期", "work_terms", 1.0),
+    ]
+    # 不同的音节可以在任意位置
+    assert [hit[2] for hit in index.find("书据库数剧库数据哭")] == ["数据库"] * 3
+
+
+def test_max_distance_zero_only_allows_homophones():
+    index = PhoneticIndex([("数据库", "database")])
+
+    assert index.find("书据库", max_distance=0) == [(0, 3, "数据库", "database", 0.9)]
+    # ju → qu 是模糊音相差一个字母的近音，不算同音
+    assert index.find("数去库", max_distance=0) == []
+    assert [hit[2] for hit in index.find("数去库")] == ["数据库"]
+
+
+def test_occupied_positions_are_skipped():
+    index = PhoneticIndex([("排期", "work_terms")])
+    occupied = bytearray(4)
+    occupied[1] = 1
+
+    assert index.find("拍期拍期", occupied=occupied) == [(2, 4, "排期", "work_terms", 0.857)]
+
+
+def test_exact_term_is_not_split_by_shorter_near_term():
+    # 没有“数据库”时，“数据”会被当成“书据”的近音
+    index = PhoneticIndex([("书据", "other"), ("数据库", "database")])
+
+    assert index.find("数据库") == []
+    assert index.find("数据") == [(0, 2, "书据", "other", 0.857)]
+
+
+def test_phonetic_matches_are_flagged_not_rewritten_by_default(write_dict):
+    manager = DictionaryManager(dict_path=write_dict(TERMS), phonetic=True)
+
+    assert manager.fix_text("他说要拍期") == "他说要拍期"
+    assert not manager.corrections
+    candidates = manager.find_phonetic_candidates("他说要拍期")
+    assert [(c["wrong"], c["correct"], c["category"]) for c in candidates] == [("拍期", "排期", "work_terms")]
+
+
+def test_autocorrect_rewrites_phonetic_matches(write_dict):
+    manager = DictionaryManager(dict_path=write_dict(TERMS), phonetic=True, phonetic_autocorrect=True)
+
+    assert manager.fix_text("他说要拍期，还有鱼期的问题") == "他说要排期，还有逾期的问题"
+
+    manager.enable_phonetic()
+    assert not manager.phonetic_autocorrect
+    assert manager.fix_text("他说要拍期") == "他说要拍期"
+
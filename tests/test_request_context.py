@@ -0,0 +1,83 @@
+"""
+并发测试：多线程同时修正文本、编辑规则、合并学到的术语，统计不丢失也不串请求
+"""
+
+import threading
+
+from codewhisper.dict_manager import DictionaryManager
+from codewhisper.request_context import LearnedTermsBuffer, RequestContext
+
+TERMS = {"backend": {"Redis": ["瑞迪斯"], "Kafka": ["卡夫卡"]}}
+THREADS = 4
+ROUNDS = 300
+
+
+def test_concurrent_corrections_while_rules_change(write_dict):
+    manager = DictionaryManager(write_dict(TERMS))
+    errors = []
+    totals = []
+    stop = threading.Event()
+
+    def transcribe():
+        try:
+            count = 0
+            for _ in range(ROUNDS):
+                context = RequestContext()
+                text, corrections = manager.correct_text("瑞迪斯和卡夫卡都要体测")
+                context.add_corrections(corrections)
+                # 编辑线程只整体替换快照：每次看到的要么有“体测”规则，要么没有，不会出现半截状态
+                assert text in ("Redis和Kafka都要体测", "Redis和Kafka都要提测")
+                assert context.stats["replacements_made"] == (3 if "提测" in text else 2)
+                count += len(corrections)
+            totals.append(count)
+        except Exception as e:  # 断言失败也要带回主线程
+            errors.append(e)
+
+    def edit():
+        while not stop.is_set():
+            manager.add_rule("体测", "提测", "work_terms")
+            manager.remove_rule("体测")
+
+    editor = threading.Thread(target=edit)
+    workers = [threading.Thread(target=transcribe) for _ in range(THREADS)]
+    editor.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stop.set()
+    editor.join()
+
+    assert errors == []
+    assert manager.stats["replacements_made"] == sum(totals)
+    # correct_text 不写共享的修正记录
+    assert len(manager.corrections) == 0
+
+
+def test_learned_terms_are_merged_once_by_whoever_holds_the_lock():
+    merged = []
+    entered = threading.Event()
+    release = threading.Event()
+
+    def merge(counts):
+        merged.append(counts)
+        if len(merged) == 1:
+            entered.set()
+            release.wait(5)
+
+    buffer = LearnedTermsBuffer(merge)
+    buffer.add({"Redis", "Kafka"})
+    first = threading.Thread(target=buffer.flush)
+    first.start()
+    entered.wait(5)
+
+    # 合并进行中：其他请求只登记术语，不等待
+    buffer.add({"Redis"})
+    buffer.add(set())
+    assert buffer.flush() == 0
+    assert len(buffer) == 1
+
+    release.set()
+    first.join()
+    assert merged == [{"Redis": 1, "Kafka": 1}, {"Redis": 1}]
+    assert len(buffer) == 0
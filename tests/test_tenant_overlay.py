@@ -0,0 +1,58 @@
+"""
+租户覆盖层测试：私有规则只对本租户生效并优先于共享字典，遵守纠错档案，注销后恢复共享规则
+"""
+
+import pytest
+
+from codewhisper.dict_manager import DictionaryManager
+
+TERMS = {"backend": {"Redis": ["瑞迪斯"], "Kafka": ["卡夫卡"]}, "work_terms": {"提测": ["体测"]}}
+
+
+def test_tenant_rules_only_apply_to_that_tenant(write_dict):
+    manager = DictionaryManager(write_dict(TERMS))
+    manager.add_tenant("alice", [{"wrong": "瑞迪斯", "correct": "Redis集群"}, {"wrong": "联条", "correct": "联调"}])
+    matcher = manager.matcher
+
+    text = "瑞迪斯和卡夫卡要联条"
+    assert manager.fix_text(text, tenant="alice") == "Redis集群和Kafka要联调"
+    assert manager.fix_text(text, tenant="bob") == "Redis和Kafka要联条"
+    assert manager.fix_text(text) == "Redis和Kafka要联条"
+    # 共享字典不复制、不重建
+    assert manager.matcher is matcher
+
+    _, corrections = manager.correct_text(text, tenant="alice")
+    assert [(c["wrong"], c["correct"]) for c in corrections] == [("瑞迪斯", "Redis集群"), ("卡夫卡", "Kafka"), ("联条", "联调")]
+    assert manager.build_prompt_terms(tenant="alice").endswith("Redis集群, 联调")
+
+
+def test_tenant_rule_edits_and_removal(write_dict):
+    manager = DictionaryManager(write_dict(TERMS))
+
+    assert manager.add_tenant_rule("alice", "联条", "联调")
+    assert not manager.add_tenant_rule("alice", "联条", "联调")
+    assert manager.list_tenants() == {"alice": 1}
+    assert "联条" in manager.get_tenant("alice")
+
+    assert manager.remove_tenant_rule("alice", "联条")
+    assert not manager.remove_tenant_rule("alice", "联条")
+    assert not manager.remove_tenant_rule("bob", "联条")
+    assert manager.fix_text("联条", tenant="alice") == "联条"
+
+    manager.add_tenant_rule("alice", "瑞迪斯", "Redis集群")
+    assert manager.remove_tenant("alice")
+    assert not manager.remove_tenant("alice")
+    assert manager.get_tenant("alice") is None
+    assert manager.fix_text("瑞迪斯", tenant="alice") == "Redis"
+
+    with pytest.raises(ValueError):
+        manager.add_tenant_rule("alice", "", "Redis")
+
+
+def test_tenant_rules_respect_profiles(write_dict):
+    manager = DictionaryManager(write_dict(TERMS), profiles={"student": {"exclude": ["work_terms"]}})
+    manager.add_tenant_rule("alice", "联条", "联调", "work_terms")
+    manager.add_tenant_rule("alice", "瑞迪斯", "Redis集群", "backend")
+
+    assert manager.fix_text("瑞迪斯要联条", tenant="alice", profile="student") == "Redis集群要联条"
+    assert manager.fix_text("瑞迪斯要联条", tenant="alice") == "Redis集群要联调"
@@ -0,0 +1,42 @@
+"""
+术语检测测试：术语索引单遍扫描，英文术语要求 ASCII 边界，编辑后索引随术语表更新
+"""
+
+import pytest
+
+from codewhisper.dict_manager import DictionaryManager
+
+TERMS = {
+    "language": {"Go": ["够"], "Java": ["加瓦"], "JavaScript": ["加瓦script"], "C++": ["CPP"]},
+    "database": {"Redis": ["瑞迪斯"], "缓存击穿": ["缓存鸡穿"]},
+}
+
+
+@pytest.fixture
+def manager(write_dict):
+    return DictionaryManager(write_dict(TERMS))
+
+
+def test_ascii_terms_need_boundaries(manager):
+    assert manager.detect_terms_in_text("我在 Google 写 JavaScript") == {"JavaScript"}
+    assert manager.detect_terms_in_text("用go和java，顺便学c++") == {"Go", "Java", "C++"}
+
+
+def test_chinese_terms_match_inside_sentences(manager):
+    assert manager.detect_terms_in_text("REDIS遇到缓存击穿了") == {"Redis", "缓存击穿"}
+    assert manager.detect_terms_in_text("") == set()
+
+
+def test_batch_detection_counts_texts_not_occurrences(manager):
+    counts = manager.detect_terms_in_texts(iter(["Redis Redis", "Go 和 Redis", "没有术语"]))
+
+    assert counts == {"Redis": 2, "Go": 1}
+
+
+def test_index_follows_rule_edits(manager):
+    assert manager.detect_terms_in_text("Kafka 消息堆积") == set()
+
+    manager.add_rule("卡夫卡", "Kafka", category="middleware")
+
+    assert manager.detect_terms_in_text("Kafka 消息堆积") == {"Kafka"}
+    assert manager.get_detected_terms_from_corrections([{"wrong": "卡夫卡", "correct": "Kafka"}]) == {"Kafka"}
@@ -0,0 +1,66 @@
+"""
+术语匹配测试：自动机的大小写折叠与重叠命中，以及字典修正挑选不重叠匹配的规则
+"""
+
+from codewhisper.dict_manager import DictionaryManager
+from codewhisper.term_matcher import TermMatcher, fold_text
+
+
+def test_fold_text_keeps_length():
+    assert fold_text("MySQL") == "mysql"
+    # "İ".lower() 会变成两个字符，折叠时保留原字符，下标仍能映射回原文
+    assert len(fold_text("İstanbul Redis")) == len("İstanbul Redis")
+    assert fold_text("İstanbul Redis").endswith("redis")
+
+
+def test_matcher_reports_all_overlapping_matches():
+    matcher = TermMatcher(["he", "she", "hers", "HE"])
+
+    matches = sorted(matcher.iter_matches(fold_text("uSHERS")))
+
+    assert len(matcher) == 3  # "HE" 折叠后与 "he" 共用一个模式
+    assert matcher.pattern_id("He") == matcher.pattern_id("he")
+    assert [(start, end, matcher.key(pattern_id)) for start, end, pattern_id in matches] == [
+        (1, 4, "she"), (2, 4, "he"), (2, 6, "hers")
+    ]
+
+
+def test_variants_match_case_insensitively(write_dict):
+    manager = DictionaryManager(write_dict({"database": {"MySQL": ["my sql"]}}))
+
+    assert manager.fix_text("用 MY SQL 存") == "用 MySQL 存"
+
+
+def test_longer_match_wins_overlap(write_dict):
+    manager = DictionaryManager(write_dict({"backend": {"Boot": ["boat"], "SpringBoot": ["spring boat"]}}))
+
+    assert manager.fix_text("spring boat 启动") == "SpringBoot 启动"
+    assert manager.fix_text("boat 启动") == "Boot 启动"
+
+
+def test_short_variants_need_ascii_boundaries(write_dict):
+    manager = DictionaryManager(write_dict({"backend": {"CAT": ["cat"]}}))
+
+    assert manager.fix_text("TomCat") == "TomCat"
+    assert manager.fix_text("cats") == "cats"
+    assert manager.fix_text("用cat看调用链") == "用CAT看调用链"
+
+
+def test_same_text_match_claims_its_span(write_dict):
+    # 两条等长规则重叠："REST" 的规则在前，命中后与原文相同，但仍占住这段文字
+    manager = DictionaryManager(write_dict({
+        "concept": {"REST": ["rest"]},
+        "backend": {"ZooKeeper": ["租KPR"]},
+    }))
+
+    assert manager.fix_text("租KPRESTABLISHED") == "租KPRESTABLISHED"
+    assert manager.fix_text("租KPR 挂了") == "ZooKeeper 挂了"
+    stats = {row["variant"]: row for row in manager.get_rule_stats()}
+    assert stats["rest"]["same_text"] == 1
+    assert stats["租KPR"]["replacements"] == 1
+
+
+def test_replacements_are_not_matched_again(write_dict):
+    manager = DictionaryManager(write_dict({"database": {"Redis": ["瑞迪斯"], "Redis Cluster": ["redis"]}}))
+
+    assert manager.fix_text("瑞迪斯") == "Redis"
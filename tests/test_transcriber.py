@@ -0,0 +1,72 @@
+"""
+转录后处理测试：用假模型代替 Whisper，不加载权重
+"""
+
+import copy
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from codewhisper.request_context import RequestContext
+from codewhisper.transcriber import CodeWhisper
+
+
+class StubModel(torch.nn.Module):
+    """transcribe 直接返回给定结果的假模型"""
+
+    def __init__(self, result=None):
+        super().__init__()
+        self.proj = torch.nn.Linear(1, 1)
+        self.dims = SimpleNamespace(n_mels=80)
+        self.result = result
+        self.calls = []
+
+    def transcribe(self, audio, **kwargs):
+        self.calls.append(kwargs)
+        return copy.deepcopy(self.result)
+
+
+def speech_audio(seconds: float = 1.0) -> np.ndarray:
+    """不会被静音判断跳过的音频"""
+    rng = np.random.default_rng(0)
+    return (0.1 * rng.standard_normal(int(16000 * seconds))).astype(np.float32)
+
+
+def test_segment_offsets_follow_stripped_text():
+    segments = [
+        {"id": 0, "start": 0.0, "end": 0.5, "text": " 我用瑞迪斯"},
+        {"id": 1, "start": 0.5, "end": 1.0, "text": "做缓存"},
+    ]
+    whisper = CodeWhisper(model=StubModel({"text": " 我用瑞迪斯做缓存", "segments": segments, "language": "zh"}))
+
+    result = whisper.transcribe(speech_audio(), verbose=False, learn_user_terms=False, vad=False)
+
+    assert result["text"] == "我用Redis做缓存"
+    first, second = result["segments"]
+    assert result["text"][first["char_start"]:first["char_end"]] == first["text"].lstrip()
+    assert result["text"][second["char_start"]:second["char_end"]] == second["text"] == "做缓存"
+
+
+def test_batch_decodes_each_prompt_separately(monkeypatch):
+    whisper = pytest.importorskip("whisper")
+    calls = []
+
+    def fake_decode(model, mel, options):
+        calls.append((options.prompt, len(mel)))
+        return [
+            SimpleNamespace(text=f"{options.prompt}{k}", tokens=[], temperature=0.0, avg_logprob=-0.1,
+                            compression_ratio=1.0, no_speech_prob=0.0, language="zh")
+            for k in range(len(mel))
+        ]
+
+    monkeypatch.setattr(whisper, "decode", fake_decode)
+    cw = CodeWhisper(model=StubModel())
+    contexts = [RequestContext(prompt="甲"), RequestContext(prompt="乙"), RequestContext(prompt="甲")]
+
+    results = cw.transcribe_batch([speech_audio() for _ in contexts], contexts=contexts, learn_user_terms=False)
+
+    assert calls == [("甲", 2), ("乙", 1)]
+    assert [result["text"] for result in results] == ["甲0", "乙0", "甲1"]
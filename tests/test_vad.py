@@ -0,0 +1,21 @@
+"""
+语音活动检测测试：裁剪后的时间戳还原到原始音频
+"""
+
+import numpy as np
+
+from codewhisper.vad import TimeMap
+
+SAMPLE_RATE = 16000
+
+
+def test_segment_ends_on_a_cut_stay_before_the_pause():
+    # 保留 1.88~4.215 s 和 5.88~8.0 s，中间的停顿被剪掉
+    regions = (np.array([[1.88, 4.215], [5.88, 8.0]]) * SAMPLE_RATE).astype(np.int64)
+    time_map = TimeMap(regions, SAMPLE_RATE, 10.0)
+    seam = float(time_map.trimmed_starts[1])
+    segments = [{"start": 0.0, "end": seam}, {"start": seam, "end": seam + 2.12}]
+
+    time_map.restore_segments(segments)
+
+    assert segments == [{"start": 1.88, "end": 4.215}, {"start": 5.88, "end": 8.0}]
@@ -0,0 +1,77 @@
+"""
+多进程转录池测试：假模型随参数一起传给工作进程，不加载 Whisper 权重
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+whisper = pytest.importorskip("whisper")
+
+from codewhisper import weight_cache, worker_pool
+from codewhisper.worker_pool import TranscriberPool
+
+# 工作进程收到这个长度的音频时直接退出，模拟推理中途崩溃
+CRASH_SAMPLES = 16000 * 2
+
+
+class StubModel(torch.nn.Module):
+    """transcribe 返回音频长度的假模型"""
+
+    def __init__(self):
+        super().__init__()
+        self.proj = torch.nn.Linear(1, 1)
+
+    def transcribe(self, audio, **kwargs):
+        if len(audio) == CRASH_SAMPLES:
+            os._exit(3)
+        text = f"收到{len(audio)}个采样"
+        return {"text": text, "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": text}], "language": "zh"}
+
+
+class BrokenModel(StubModel):
+    """在工作进程里反序列化时就失败，模拟启动阶段崩溃"""
+
+    def __reduce__(self):
+        return (_raise_on_load, ())
+
+
+def _raise_on_load():
+    raise RuntimeError("模型无法加载")
+
+
+def speech_audio(samples: int) -> np.ndarray:
+    rng = np.random.default_rng(samples)
+    return (0.1 * rng.standard_normal(samples)).astype(np.float32)
+
+
+def make_pool(monkeypatch, model, workers: int = 1) -> TranscriberPool:
+    monkeypatch.setattr(weight_cache, "cache_enabled", lambda: False)
+    monkeypatch.setattr(whisper, "load_model", lambda name, device="cpu": model)
+    return TranscriberPool("tiny", workers=workers, threads_per_worker=1)
+
+
+def test_killed_worker_fails_its_request_and_restarts(monkeypatch):
+    with make_pool(monkeypatch, StubModel()) as pool:
+        crashed = pool.submit(speech_audio(CRASH_SAMPLES), vad=False)
+        queued = pool.submit(speech_audio(16000), vad=False)
+
+        with pytest.raises(RuntimeError, match="意外退出"):
+            crashed.result(timeout=60)
+        assert queued.result(timeout=60)["text"] == "收到16000个采样"
+        assert pool.map([speech_audio(8000), speech_audio(12000)], vad=False)[1]["text"] == "收到12000个采样"
+        assert pool.stats()["restarts"] == 1
+
+
+def test_worker_crashing_at_startup_is_given_up(monkeypatch):
+    monkeypatch.setattr(worker_pool, "_RESTART_BACKOFF", 0.01)
+    monkeypatch.setattr(worker_pool, "_MAX_STARTUP_FAILURES", 3)
+    with make_pool(monkeypatch, BrokenModel()) as pool:
+        future = pool.submit(speech_audio(16000), vad=False)
+
+        with pytest.raises(RuntimeError, match="无法启动"):
+            future.result(timeout=60)
+        assert pool.stats()["given_up"] == 1
+        assert pool.stats()["restarts"] == 2